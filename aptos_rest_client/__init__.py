@@ -1 +1,2 @@
 from .client import CustomRestClient
+from .pool import HTTP_POOL, HttpClientPool
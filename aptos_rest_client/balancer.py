@@ -0,0 +1,348 @@
+"""
+httpx transport spreading requests over several equivalent RPC endpoints.
+
+Requests are built against the first endpoint (the client's base_url) and
+rewritten to the endpoint with the best score: EWMA latency inflated by the
+EWMA error rate. Reads can be hedged: if the primary hasn't answered by its
+own latency percentile, the same request goes to the next best endpoint and
+the first answer wins.
+
+Each endpoint can have a token bucket capping its request rate, and failed
+attempts (transport errors, 429 and 5xx) are retried with jittered
+exponential backoff. Only reads are retried on any failure: a transaction
+submit that timed out may have been accepted, so POSTs are retried only
+when the connection couldn't be opened or the node answered 429, both of
+which mean it was never processed.
+
+Every attempt is timed into the rpc_latency_seconds histogram when
+utils.metrics.METRICS is enabled.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+from aptos_rest_client.ratelimit import TokenBucket, backoff_delay
+from utils.metrics import METRICS
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD'})
+# failures of a non-idempotent request that prove nothing reached the node
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+UNSENT_STATUSES = frozenset({429})
+
+RPC_LATENCY = METRICS.histogram(
+    'rpc_latency_seconds', 'Node request latency', ('endpoint', 'resource', 'outcome')
+)
+RPC_RETRIES = METRICS.counter('rpc_retries_total', 'Requests retried after a failed attempt', ('resource',))
+RPC_HEDGES = METRICS.counter('rpc_hedges_total', 'Reads duplicated to a second endpoint', ('resource',))
+
+
+def resource_label(path: str) -> str:
+    """
+    Low cardinality name of a request path: the resource type without its type arguments
+    for resource reads, the route with addresses and hashes replaced by {id} otherwise
+    :param path: decoded url path
+    :return:
+    """
+    api_root = path.find('/v1')
+    if api_root != -1:
+        path = path[api_root + 3:]
+
+    if '/resource/' in path:
+        return path.split('/resource/', 1)[1].split('<', 1)[0]
+
+    segments = [
+        '{id}' if segment.startswith('0x') or segment.isdigit() else segment
+        for segment in path.strip('/').split('/')
+    ]
+    return '/'.join(segments) or 'ledger_info'
+
+
+class EndpointStats:
+    __slots__ = ('url', 'latency', 'error_rate', 'requests', 'errors', 'samples', 'bucket')
+
+    def __init__(self, url: str, history_size: int = 256, bucket: TokenBucket = None):
+        self.url = httpx.URL(url)
+        self.bucket = bucket
+        self.latency = None  # EWMA seconds, None until the first answer
+        self.error_rate = 0.0  # EWMA of failures
+        self.requests = 0
+        self.errors = 0
+        self.samples = deque(maxlen=history_size)
+
+    def observe(self, latency: float, failed: bool, alpha: float):
+        self.requests += 1
+        self.errors += failed
+        self.error_rate += alpha * (failed - self.error_rate)
+        if not failed:
+            self.latency = latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+            self.samples.append(latency)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def score(self) -> float:
+        # untried endpoints go first so every one gets measured
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 10 * self.error_rate)
+
+    def as_dict(self) -> dict:
+        return {
+            'url': str(self.url),
+            'latency_ewma': self.latency,
+            'error_rate': self.error_rate,
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limit': self.bucket.stats() if self.bucket is not None else None,
+        }
+
+
+class BalancedTransport(httpx.AsyncBaseTransport):
+    def __init__(
+            self,
+            endpoints: list[str],
+            transport: httpx.AsyncBaseTransport,
+            hedge: bool = False,
+            hedge_percentile: float = 0.9,
+            hedge_min_samples: int = 20,
+            alpha: float = 0.2,
+            max_error_rate: float = 0.5,
+            explore: float = 0.05,
+            rate_limit: float = None,
+            burst: float = None,
+            max_retries: int = 3,
+            backoff_base: float = 0.2,
+            backoff_cap: float = 5.0
+    ):
+        """
+        :param endpoints: base urls of equivalent nodes, the first one is what requests are built against
+        :param transport: transport doing the actual I/O
+        :param hedge: duplicate slow GETs to a second endpoint
+        :param hedge_percentile: latency percentile of the primary after which the hedge is sent
+        :param hedge_min_samples: answers needed from an endpoint before hedging against it
+        :param alpha: EWMA smoothing factor
+        :param max_error_rate: endpoints above this are skipped while a healthier one exists
+        :param explore: share of requests sent to a random endpoint so stale scores get refreshed
+        :param rate_limit: requests per second allowed per endpoint, unlimited when None
+        :param burst: token bucket size, defaults to one second of rate_limit
+        :param max_retries: retries of a failed request, each may go to another endpoint
+        :param backoff_base: first backoff ceiling in seconds, doubled every retry
+        :param backoff_cap: longest backoff in seconds
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.endpoints = [
+            EndpointStats(url, bucket=TokenBucket(rate_limit, burst) if rate_limit else None)
+            for url in endpoints
+        ]
+        self.base = self.endpoints[0].url
+        self.transport = transport
+
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.explore = explore
+
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.retry_wait = 0.0
+
+    def ranked(self) -> list[EndpointStats]:
+        """
+        Endpoints from best to worst, unhealthy ones last.
+        Now and then a random endpoint is put first to re-measure it.
+        :return:
+        """
+        ranked = sorted(self.endpoints, key=lambda endpoint: (endpoint.error_rate > self.max_error_rate, endpoint.score()))
+        if len(ranked) > 1 and random.random() < self.explore:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _rewrite(self, request: httpx.Request, endpoint: EndpointStats) -> httpx.Request:
+        """
+        Same request aimed at another endpoint
+        :param request:
+        :param endpoint:
+        :return:
+        """
+        if endpoint.url == self.base:
+            return request
+
+        path = request.url.raw_path.decode()
+        base_path = self.base.raw_path.decode().rstrip('/')
+        if path.startswith(base_path):
+            path = path[len(base_path):]
+
+        url = endpoint.url.copy_with(raw_path=(endpoint.url.raw_path.decode().rstrip('/') + path).encode())
+        headers = request.headers.copy()
+        headers['Host'] = url.netloc.decode()
+
+        return httpx.Request(
+            method=request.method,
+            url=url,
+            headers=headers,
+            stream=request.stream,
+            extensions=request.extensions
+        )
+
+    async def send_to(self, request: httpx.Request, endpoint: EndpointStats) -> httpx.Response:
+        """
+        Sends to one endpoint and records its latency and outcome
+        :param request:
+        :param endpoint:
+        :return:
+        """
+        if endpoint.bucket is not None:
+            await endpoint.bucket.acquire()
+
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(self._rewrite(request, endpoint))
+        except Exception:
+            latency = time.perf_counter() - started
+            endpoint.observe(latency, True, self.alpha)
+            if METRICS.enabled:
+                RPC_LATENCY.observe(latency, str(endpoint.url), resource_label(request.url.path), 'error')
+            raise
+
+        latency = time.perf_counter() - started
+        endpoint.observe(latency, response.status_code in RETRYABLE_STATUSES, self.alpha)
+        if METRICS.enabled:
+            RPC_LATENCY.observe(
+                latency, str(endpoint.url), resource_label(request.url.path), str(response.status_code)
+            )
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        idempotent = request.method in IDEMPOTENT_METHODS
+        retryable_errors = httpx.TransportError if idempotent else UNSENT_ERRORS
+        retryable_statuses = RETRYABLE_STATUSES if idempotent else UNSENT_STATUSES
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._send_once(request)
+            except retryable_errors:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            else:
+                if response.status_code not in retryable_statuses or attempt >= self.max_retries:
+                    return response
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap, response)
+                await response.aclose()
+
+            self.retries += 1
+            self.retry_wait += delay
+            if METRICS.enabled:
+                RPC_RETRIES.inc(resource_label(request.url.path))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_once(self, request: httpx.Request) -> httpx.Response:
+        """
+        One attempt: best endpoint, hedged when enabled
+        :param request:
+        :return:
+        """
+        ranked = self.ranked()
+        primary = ranked[0]
+
+        if not self.hedge or request.method != 'GET' or len(ranked) < 2:
+            return await self.send_to(request, primary)
+
+        # deadline from the best endpoint with enough history, the primary may be one being re-measured
+        measured = [endpoint for endpoint in ranked if len(endpoint.samples) >= self.hedge_min_samples]
+        if not measured:
+            return await self.send_to(request, primary)
+        hedge_delay = measured[0].percentile(self.hedge_percentile)
+
+        return await self._send_hedged(request, primary, ranked[1], hedge_delay)
+
+    async def _send_hedged(
+            self,
+            request: httpx.Request,
+            primary: EndpointStats,
+            secondary: EndpointStats,
+            hedge_delay: float
+    ) -> httpx.Response:
+        """
+        Primary first, secondary too if the primary is slower than hedge_delay; first good answer wins
+        :param request:
+        :param primary:
+        :param secondary:
+        :param hedge_delay:
+        :return:
+        """
+        first = asyncio.create_task(self.send_to(request, primary))
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        if done:
+            return first.result()
+
+        self.hedges += 1
+        if METRICS.enabled:
+            RPC_HEDGES.inc(resource_label(request.url.path))
+        second = asyncio.create_task(self.send_to(request, secondary))
+        pending = {first, second}
+        response = None
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if response is None and (task.result().status_code < 500 or not pending):
+                        response = task.result()
+                        self.hedge_wins += task is second
+                    else:
+                        await task.result().aclose()
+                if response is not None:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_close_unused_response)
+
+        if response is None:
+            raise error
+        return response
+
+    def stats(self) -> dict:
+        return {
+            'endpoints': [endpoint.as_dict() for endpoint in self.endpoints],
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'retries': self.retries,
+            'retry_wait': self.retry_wait,
+        }
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _close_unused_response(task: asyncio.Task):
+    """
+    Closes the answer of a hedge that lost the race once it arrives
+    :param task:
+    :return:
+    """
+    if task.cancelled() or task.exception() is not None:
+        return
+    asyncio.ensure_future(task.result().aclose())
@@ -1,32 +1,134 @@
 import httpx
-from aptos_sdk.async_client import RestClient, ClientConfig
-from aptos_sdk.metadata import Metadata
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import RestClient, ClientConfig, ResourceNotFound, ApiError, AccountNotFound
+
+from aptos_rest_client.pool import HTTP_POOL
+
+LEDGER_VERSION_HEADER = "X-Aptos-Ledger-Version"
+CURSOR_HEADER = "X-Aptos-Cursor"
+
+
+def get_ledger_version(response: httpx.Response) -> int | None:
+    """
+    Ledger version a node answered at, taken from the response headers
+    :param response:
+    :return:
+    """
+    ledger_version = response.headers.get(LEDGER_VERSION_HEADER)
+    return int(ledger_version) if ledger_version is not None else None
 
 
 class CustomRestClient(RestClient):
     def __init__(
             self,
-            base_url: str,
+            base_url: str | list[str],
             proxies: dict = None,
-            client_config: ClientConfig = ClientConfig()
-
+            client_config: ClientConfig = ClientConfig(),
+            http2: bool = True,
+            limits: httpx.Limits = None,
+            hedge: bool = False,
+            rate_limit: float = None,
+            max_retries: int = 3,
+            transport: httpx.AsyncBaseTransport = None
     ):
-        self.base_url = base_url
-        # Default limits
-        limits = httpx.Limits()
-        # Default timeouts but do not set a pool timeout, since the idea is that jobs will wait as
-        # long as progress is being made.
-        timeout = httpx.Timeout(60.0, pool=None)
-        # Default headers
-        headers = {Metadata.APTOS_HEADER: Metadata.get_aptos_header_val()}
-        self.client = httpx.AsyncClient(
-            http2=client_config.http2,
+        """
+        :param base_url: one endpoint, or several equivalent ones to balance reads across
+        :param proxies:
+        :param client_config:
+        :param http2: multiplex requests over HTTP/2 when the server supports it
+        :param limits: connection limits of the shared pool, defaults to pool.DEFAULT_LIMITS
+        :param hedge: resend slow reads to the second best endpoint, see balancer.BalancedTransport
+        :param rate_limit: requests per second allowed per endpoint, unlimited when None
+        :param max_retries: retries of 429/5xx answers and transport errors of reads, with jittered backoff,
+            transaction submits are only retried when they never reached the node
+        :param transport: transport under the balancer instead of httpx's, see replay.py
+        """
+        endpoints = [base_url] if isinstance(base_url, str) else list(base_url)
+        # requests are built against the first endpoint, the transport routes them
+        self.base_url = endpoints[0]
+        # connections are shared by every client of the same endpoints, see HTTP_POOL
+        self._pool_key, self.client, self.transport = HTTP_POOL.acquire(
+            endpoints=endpoints,
+            proxies=proxies,
+            api_key=client_config.api_key,
+            http2=http2,
             limits=limits,
-            timeout=timeout,
-            headers=headers,
-            proxies=proxies
+            hedge=hedge,
+            rate_limit=rate_limit,
+            max_retries=max_retries,
+            transport=transport
         )
         self.client_config = client_config
         self._chain_id = None
-        if client_config.api_key:
-            self.client.headers["Authorization"] = f"Bearer {client_config.api_key}"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Releases the shared connection pool, closing it with its last user
+        :return:
+        """
+        if self._pool_key is not None:
+            await HTTP_POOL.release(self._pool_key)
+            self._pool_key = None
+
+    async def account_resource_with_version(
+            self,
+            account_address: AccountAddress,
+            resource_type: str,
+            ledger_version: int = None,
+    ) -> tuple[dict, int | None]:
+        """
+        Same as account_resource, also returning the ledger version the node answered at
+        :param account_address:
+        :param resource_type:
+        :param ledger_version:
+        :return:
+        """
+        response = await self._get(
+            endpoint=f"accounts/{account_address}/resource/{resource_type}",
+            params={"ledger_version": ledger_version},
+        )
+        if response.status_code == 404:
+            raise ResourceNotFound(resource_type, resource_type)
+        if response.status_code >= 400:
+            raise ApiError(f"{response.text} - {account_address}", response.status_code)
+        return response.json(), get_ledger_version(response)
+
+    async def account_resources_all(
+            self,
+            account_address: AccountAddress,
+            ledger_version: int = None,
+            page_size: int = 9999,
+    ) -> tuple[list[dict], int | None]:
+        """
+        Every resource of an account, following the X-Aptos-Cursor pagination.
+        All pages are read at the ledger version of the first one.
+        :param account_address:
+        :param ledger_version:
+        :param page_size:
+        :return: resources and the ledger version they were read at
+        """
+        resources = []
+        cursor = None
+        while True:
+            response = await self._get(
+                endpoint=f"accounts/{account_address}/resources",
+                params={"ledger_version": ledger_version, "limit": page_size, "start": cursor},
+            )
+            if response.status_code == 404:
+                raise AccountNotFound(f"{account_address}", account_address)
+            if response.status_code >= 400:
+                raise ApiError(f"{response.text} - {account_address}", response.status_code)
+
+            resources.extend(response.json())
+            if ledger_version is None:
+                ledger_version = get_ledger_version(response)
+
+            cursor = response.headers.get(CURSOR_HEADER)
+            if not cursor:
+                return resources, ledger_version
@@ -0,0 +1,139 @@
+import httpx
+from aptos_sdk.metadata import Metadata
+
+from aptos_rest_client.balancer import BalancedTransport
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+
+class HttpClientPool:
+    """
+    Process-wide registry of httpx.AsyncClient, one per (endpoints, proxies, api_key),
+    reference counted so the connections close when the last user releases them.
+    Every user of one client must ask for the same settings, a mismatch raises instead of
+    silently getting the first user's.
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple, tuple[httpx.AsyncClient, BalancedTransport]] = {}
+        self._settings: dict[tuple, dict] = {}
+        self._refs: dict[tuple, int] = {}
+
+    @staticmethod
+    def make_key(endpoints: list[str], proxies: dict = None, api_key: str = None) -> tuple:
+        return tuple(endpoints), tuple(sorted((proxies or {}).items())), api_key
+
+    def acquire(
+            self,
+            endpoints: list[str],
+            proxies: dict = None,
+            api_key: str = None,
+            http2: bool = True,
+            limits: httpx.Limits = None,
+            hedge: bool = False,
+            rate_limit: float = None,
+            max_retries: int = 3,
+            transport: httpx.AsyncBaseTransport = None
+    ) -> tuple[tuple, httpx.AsyncClient, BalancedTransport]:
+        """
+        Shared client for these endpoints, created on first use.
+        Later calls must pass the same http2, limits, hedge, rate_limit and max_retries, and either
+        the same transport or none to use the registered one, e.g. a replay transport set up first.
+        :param endpoints:
+        :param proxies:
+        :param api_key:
+        :param http2:
+        :param limits:
+        :param hedge:
+        :param rate_limit: requests per second per endpoint
+        :param max_retries:
+        :param transport: transport doing the I/O instead of httpx's, e.g. replay.ReplayTransport
+        :return: registry key to release with, the client and its balancing transport
+        :raises ValueError: when the shared client was created with other settings
+        """
+        key = self.make_key(endpoints, proxies, api_key)
+        settings = {
+            'http2': http2,
+            'limits': limits or DEFAULT_LIMITS,
+            'hedge': hedge,
+            'rate_limit': rate_limit,
+            'max_retries': max_retries,
+        }
+
+        entry = self._clients.get(key)
+        if entry is not None and not entry[0].is_closed:
+            shared = self._settings[key]
+            if settings != {name: value for name, value in shared.items() if name != 'transport'}:
+                raise ValueError(f"Client of {list(endpoints)} is shared with settings {shared}, asked for {settings}")
+            if transport is not None and transport is not shared['transport']:
+                raise ValueError(f"Client of {list(endpoints)} is shared with another transport")
+        else:
+            headers = {Metadata.APTOS_HEADER: Metadata.get_aptos_header_val()}
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+
+            transport = BalancedTransport(
+                endpoints=endpoints,
+                transport=transport or httpx.AsyncHTTPTransport(
+                    http2=http2,
+                    limits=limits or DEFAULT_LIMITS,
+                    proxy=_proxy_url(proxies)
+                ),
+                hedge=hedge,
+                rate_limit=rate_limit,
+                max_retries=max_retries
+            )
+            client = httpx.AsyncClient(
+                transport=transport,
+                # Default timeouts but do not set a pool timeout, since the idea is that jobs will wait as
+                # long as progress is being made.
+                timeout=httpx.Timeout(60.0, pool=None),
+                headers=headers
+            )
+            entry = self._clients[key] = (client, transport)
+            self._settings[key] = {**settings, 'transport': transport.transport}
+            self._refs[key] = 0
+
+        self._refs[key] += 1
+        return key, entry[0], entry[1]
+
+    async def release(self, key: tuple):
+        """
+        Drops one reference, closing the client with the last one
+        :param key:
+        :return:
+        """
+        if key not in self._refs:
+            return
+
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            del self._refs[key]
+            del self._settings[key]
+            await self._clients.pop(key)[0].aclose()
+
+    async def close_all(self):
+        """
+        Closes every shared client, e.g. on shutdown
+        :return:
+        """
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._settings.clear()
+        self._refs.clear()
+        for client, _ in clients:
+            await client.aclose()
+
+
+def _proxy_url(proxies: dict = None) -> str | None:
+    """
+    Single proxy of an httpx-style proxies mapping, the transport takes only one
+    :param proxies:
+    :return:
+    """
+    if not proxies:
+        return None
+    return proxies.get("all://") or proxies.get("https://") or next(iter(proxies.values()))
+
+
+HTTP_POOL = HttpClientPool()
@@ -0,0 +1,73 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` requests per second on average, bursts of up to `burst`.
+    Callers reserve a token immediately and sleep off any deficit, so waiting is FIFO.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+        self.acquired = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self) -> float:
+        """
+        Takes one token, sleeping until it is available
+        :return: seconds waited
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= 1
+        self.acquired += 1
+        if self.tokens >= 0:
+            return 0.0
+
+        wait = -self.tokens / self.rate
+        self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            'rate': self.rate,
+            'acquired': self.acquired,
+            'waits': self.waits,
+            'total_wait': self.total_wait,
+            'max_wait': self.max_wait,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float, response: httpx.Response = None) -> float:
+    """
+    Full-jitter exponential backoff, or the server's Retry-After when it sent one
+    :param attempt: 0 for the first retry
+    :param base:
+    :param cap:
+    :param response:
+    :return: seconds to sleep
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), cap)
+            except ValueError:
+                pass
+
+    return random.uniform(0, min(cap, base * 2 ** attempt))
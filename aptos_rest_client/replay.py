@@ -0,0 +1,185 @@
+"""
+Offline stand-in for an Aptos node.
+
+RecordingTransport wraps the real transport and keeps every answer with its
+latency; ReplayTransport serves those answers back with configurable latency,
+jitter and injected failures. Both sit under BalancedTransport, so retries,
+rate limits and hedging behave as they would against a live node:
+
+    recorder = RecordingTransport(httpx.AsyncHTTPTransport(http2=True))
+    client = base.rpc_client(config.RPC_URL, transport=recorder)
+    ...
+    recorder.save('fixtures.json')
+
+    client = base.rpc_client(REPLAY_URL, transport=ReplayTransport.load('fixtures.json', jitter=0.01))
+
+Modules of the same endpoints share the client registered first, built with
+the same config settings by base.rpc_client.
+
+Requests are matched on method, path below /v1 and query parameters other
+than ledger_version. When one request was recorded several times the answers
+are served in turn.
+"""
+import asyncio
+import json
+import random
+import time
+from itertools import cycle
+from pathlib import Path
+
+import httpx
+
+from aptos_rest_client.client import CURSOR_HEADER, LEDGER_VERSION_HEADER
+
+REPLAY_URL = "http://replay.invalid/v1"
+# headers worth keeping, the rest describe the original connection
+RECORDED_HEADERS = (LEDGER_VERSION_HEADER, CURSOR_HEADER, "Content-Type", "Retry-After")
+
+
+def request_key(request: httpx.Request) -> str:
+    """
+    Node-independent identity of a request, e.g. "GET /accounts/0x1/resource/...?start=abc"
+    :param request:
+    :return:
+    """
+    path = request.url.path
+    api_root = path.find("/v1")
+    if api_root != -1:
+        path = path[api_root + 3:] or "/"
+
+    params = sorted(
+        (name, value) for name, value in request.url.params.multi_items()
+        if value and name != "ledger_version"
+    )
+    query = "&".join(f"{name}={value}" for name, value in params)
+    return f"{request.method} {path}" + (f"?{query}" if query else "")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        """
+        :param transport: transport doing the actual I/O
+        """
+        self.transport = transport
+        self.interactions: list[dict] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        # body as sent, still content-encoded, so the returned response decodes it as usual
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+        latency = time.perf_counter() - started
+        await response.aclose()
+
+        decoded = httpx.Response(response.status_code, headers=response.headers, content=raw)
+        self.interactions.append({
+            "key": request_key(request),
+            "status": response.status_code,
+            "headers": {name: decoded.headers[name] for name in RECORDED_HEADERS if name in decoded.headers},
+            "body": decoded.text,
+            "latency": latency,
+        })
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=raw,
+            extensions=response.extensions
+        )
+
+    def save(self, path: str | Path, **metadata):
+        """
+        Writes the recorded answers as a fixture file
+        :param path:
+        :param metadata: extra top level fields, e.g. the account the reads were made for
+        :return:
+        """
+        with open(path, "w") as file:
+            json.dump({**metadata, "interactions": self.interactions}, file, indent=1)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(
+            self,
+            interactions: list[dict],
+            latency: float = None,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            error_status: int = 503,
+            disconnect_rate: float = 0.0,
+            seed: int = None
+    ):
+        """
+        :param interactions: recorded answers, see RecordingTransport
+        :param latency: seconds per answer, the recorded latency when None
+        :param jitter: up to this many seconds added at random to every answer
+        :param error_rate: share of requests answered with error_status instead
+        :param error_status:
+        :param disconnect_rate: share of requests failing with a transport error
+        :param seed: seed of the random source, for repeatable runs
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.disconnect_rate = disconnect_rate
+        self.random = random.Random(seed)
+
+        recorded: dict[str, list[dict]] = {}
+        for interaction in interactions:
+            recorded.setdefault(interaction["key"], []).append(interaction)
+        self._answers = {key: cycle(answers) for key, answers in recorded.items()}
+
+        self.requests = 0
+        self.misses = 0
+        self.injected_errors = 0
+
+    @classmethod
+    def load(cls, path: str | Path, **kwargs) -> "ReplayTransport":
+        with open(path) as file:
+            return cls(json.load(file)["interactions"], **kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        answers = self._answers.get(request_key(request))
+        answer = next(answers) if answers is not None else None
+
+        latency = self.latency
+        if latency is None:
+            latency = answer["latency"] if answer is not None else 0.0
+        if self.jitter:
+            latency += self.random.uniform(0, self.jitter)
+        await asyncio.sleep(latency)
+
+        roll = self.random.random()
+        if roll < self.disconnect_rate:
+            self.injected_errors += 1
+            raise httpx.ReadError("injected disconnect", request=request)
+        if roll < self.disconnect_rate + self.error_rate:
+            self.injected_errors += 1
+            return httpx.Response(self.error_status, json={"message": "injected error"}, request=request)
+
+        if answer is None:
+            self.misses += 1
+            return httpx.Response(
+                404,
+                json={"message": f"not recorded: {request_key(request)}", "error_code": "resource_not_found"},
+                request=request
+            )
+
+        return httpx.Response(
+            answer["status"],
+            headers=answer["headers"],
+            content=answer["body"].encode(),
+            request=request
+        )
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "misses": self.misses,
+            "injected_errors": self.injected_errors,
+        }
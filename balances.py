@@ -0,0 +1,151 @@
+"""
+Balances of many wallets from one /resources read per wallet.
+
+Every 0x1::coin::CoinStore<...> of a wallet comes back in its resource list,
+so one paginated read replaces a CoinStore read per (wallet, coin). The
+result is a wallet x token matrix of u64 values in a flat array('Q').
+"""
+import asyncio
+from array import array
+
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import AccountNotFound
+from loguru import logger
+
+import config
+from aptos_rest_client import CustomRestClient
+from liquidswap.pools import normalize_type, split_type_args
+
+COIN_STORE = '0x1::coin::CoinStore'
+
+
+def wallet_key(wallet: str | AccountAddress) -> str:
+    """
+    One spelling of a wallet address whatever form it was given in
+    :param wallet:
+    :return:
+    """
+    return str(wallet if isinstance(wallet, AccountAddress) else AccountAddress.from_str(wallet))
+
+
+def parse_coin_stores(resources: list[dict]) -> dict[str, int]:
+    """
+    Coin type -> balance of every CoinStore in an account's resources
+    :param resources: as returned by /accounts/{address}/resources
+    :return: coin types in canonical form, see liquidswap.pools.normalize_type
+    """
+    balances = {}
+    for resource in resources:
+        resource_type = resource['type']
+        if not resource_type.startswith(COIN_STORE):
+            continue
+        struct, args = split_type_args(normalize_type(resource_type))
+        if struct == COIN_STORE and len(args) == 1:
+            balances[args[0]] = int(resource['data']['coin']['value'])
+    return balances
+
+
+class BalanceMatrix:
+    """
+    Balances of `wallets` x `tokens`, row-major in one array('Q').
+    A wallet whose read failed has no row values: get() returns None for it.
+    """
+
+    def __init__(self, wallets: list[str], tokens: list[str]):
+        self.wallets = [wallet_key(wallet) for wallet in wallets]
+        self.tokens = list(dict.fromkeys(normalize_type(token) for token in tokens))
+        self.values = array('Q', bytes(8 * len(self.wallets) * len(self.tokens)))
+        self.failed: set[int] = set()
+        self.ledger_versions: list[int | None] = [None] * len(self.wallets)
+
+        self._wallet_index = {wallet: row for row, wallet in enumerate(self.wallets)}
+        self._token_index = {token: column for column, token in enumerate(self.tokens)}
+        # lookups with the caller's spelling skip normalizing
+        self._token_index.update({token: self._token_index[normalize_type(token)] for token in tokens})
+
+    def __len__(self):
+        return len(self.wallets)
+
+    def _column(self, token: str) -> int:
+        column = self._token_index.get(token)
+        if column is None:
+            column = self._token_index[normalize_type(token)]
+        return column
+
+    def set_row(self, wallet: str | AccountAddress, balances: dict[str, int], ledger_version: int | None = None):
+        """
+        Stores one wallet's balances, tokens it holds no CoinStore for are 0
+        :param wallet:
+        :param balances: coin type (canonical) -> balance, see parse_coin_stores
+        :param ledger_version:
+        :return:
+        """
+        row = self._wallet_index[wallet_key(wallet)]
+        offset = row * len(self.tokens)
+        for column, token in enumerate(self.tokens):
+            self.values[offset + column] = balances.get(token, 0)
+        self.failed.discard(row)
+        self.ledger_versions[row] = ledger_version
+
+    def set_failed(self, wallet: str | AccountAddress):
+        self.failed.add(self._wallet_index[wallet_key(wallet)])
+
+    def get(self, wallet: str | AccountAddress, token: str) -> int | None:
+        """
+        Balance of one wallet in one token, None when the wallet couldn't be read
+        :param wallet:
+        :param token: coin type
+        :return:
+        """
+        row = self._wallet_index[wallet_key(wallet)]
+        if row in self.failed:
+            return None
+        return self.values[row * len(self.tokens) + self._column(token)]
+
+    def row(self, wallet: str | AccountAddress) -> dict[str, int] | None:
+        """
+        Every balance of one wallet
+        :param wallet:
+        :return:
+        """
+        row = self._wallet_index[wallet_key(wallet)]
+        if row in self.failed:
+            return None
+        offset = row * len(self.tokens)
+        return dict(zip(self.tokens, self.values[offset:offset + len(self.tokens)]))
+
+
+async def scan_balances(
+        client: CustomRestClient,
+        wallets: list[str | AccountAddress],
+        tokens: list[str],
+        concurrency: int = config.BALANCE_SCAN_CONCURRENCY
+) -> BalanceMatrix:
+    """
+    Reads every wallet's resources once, at most `concurrency` at a time
+    :param client:
+    :param wallets:
+    :param tokens: coin types to keep
+    :param concurrency:
+    :return:
+    """
+    matrix = BalanceMatrix(wallets, tokens)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan(wallet: str | AccountAddress):
+        address = wallet if isinstance(wallet, AccountAddress) else AccountAddress.from_str(wallet)
+        async with semaphore:
+            try:
+                resources, ledger_version = await client.account_resources_all(address)
+            except AccountNotFound:
+                # never funded, holds nothing
+                matrix.set_row(wallet, {})
+                return
+            except Exception as e:
+                logger.error("Error scanning balances of {}: {}", wallet, e)
+                matrix.set_failed(wallet)
+                return
+        matrix.set_row(wallet, parse_coin_stores(resources), ledger_version)
+
+    await asyncio.gather(*[scan(wallet) for wallet in wallets])
+    return matrix
@@ -1,40 +1,115 @@
-from aptos_sdk.account import Account
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable
+
+import httpx
 from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import ResourceNotFound
 from loguru import logger
 
+import config
 from aptos_rest_client import CustomRestClient
+from balances import BalanceMatrix
 from contracts.base import TokenBase
+from contracts.metadata import TokenMetadataStore, get_metadata_store
+from utils.cache import AsyncTTLCache
+
+if TYPE_CHECKING:
+    from aptos_sdk.account import Account
+
+
+def rpc_client(
+        base_url: str | list[str] = None,
+        proxies: dict = None,
+        transport: httpx.AsyncBaseTransport = None
+) -> CustomRestClient:
+    """
+    Client with the RPC settings of config. Clients of the same endpoints share one connection pool
+    that must be created with the same settings, so every client of the app is built here.
+    :param base_url: defaults to config.RPC_URLS
+    :param proxies:
+    :param transport: see CustomRestClient
+    :return:
+    """
+    return CustomRestClient(
+        base_url=base_url or config.RPC_URLS,
+        proxies=proxies,
+        http2=config.HTTP2,
+        hedge=config.RPC_HEDGE,
+        rate_limit=config.RPC_RATE_LIMIT,
+        max_retries=config.RPC_MAX_RETRIES,
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+        ),
+        transport=transport
+    )
 
 
 class ModuleBase:
+    # pool reads shared by every module, keyed by (resource_address, resource type)
+    reserve_cache = AsyncTTLCache(ttl=config.RESERVE_CACHE_TTL, maxsize=config.RESERVE_CACHE_SIZE, name='reserves')
+
     def __init__(
             self,
             coin_x: TokenBase,
             coin_y: TokenBase,
-            base_url: str,
-            account: Account,
+            base_url: str | list[str],
+            account: 'Account | None',
             proxies: dict = None
     ):
-
+        """
+        :param coin_x:
+        :param coin_y:
+        :param base_url:
+        :param account: wallet whose balances are read and that signs swaps, None for quoting only
+        :param proxies:
+        """
         self.base_url = base_url
-        self.client = CustomRestClient(base_url=base_url, proxies=proxies)
+        self.client = rpc_client(base_url, proxies)
         self.account = account
 
         self.coin_x = coin_x
         self.coin_y = coin_y
 
     async def async_init(self):
-        self.initial_balance_x_wei = await self.get_wallet_token_balance(
-            wallet_address=self.account.address(),
-            token_address=self.coin_x.contract_address
-        )
-        self.initial_balance_y_wei = await self.get_wallet_token_balance(
-            wallet_address=self.account.address(),
-            token_address=self.coin_y.contract_address
+        (
+            self.initial_balance_x_wei,
+            self.initial_balance_y_wei,
+            self.token_x_decimals,
+            self.token_y_decimals
+        ) = await asyncio.gather(
+            self.get_wallet_token_balance(
+                wallet_address=self.account.address(),
+                token_address=self.coin_x.contract_address
+            ),
+            self.get_wallet_token_balance(
+                wallet_address=self.account.address(),
+                token_address=self.coin_y.contract_address
+            ),
+            self.get_token_decimals(token_obj=self.coin_x),
+            self.get_token_decimals(token_obj=self.coin_y)
         )
 
-        self.token_x_decimals = await self.get_token_decimals(token_obj=self.coin_x)
-        self.token_y_decimals = await self.get_token_decimals(token_obj=self.coin_y)
+    async def async_init_from_balances(self, balances: BalanceMatrix):
+        """
+        async_init with the wallet balances taken from a balances.scan_balances matrix, no balance RPC
+        :param balances:
+        :return:
+        """
+        self.initial_balance_x_wei = balances.get(self.account.address(), self.coin_x.contract_address)
+        self.initial_balance_y_wei = balances.get(self.account.address(), self.coin_y.contract_address)
+        await self.async_init_decimals()
+
+    async def async_init_decimals(self):
+        """
+        Decimals of both coins only, all quoting needs
+        :return:
+        """
+        self.token_x_decimals, self.token_y_decimals = await asyncio.gather(
+            self.get_token_decimals(token_obj=self.coin_x),
+            self.get_token_decimals(token_obj=self.coin_y)
+        )
 
     async def get_token_decimals(self, token_obj: TokenBase) -> int | None:
         """
@@ -45,52 +120,92 @@ class ModuleBase:
         if token_obj.symbol == "aptos":
             return 8
 
+        stored = self.token_metadata.get(token_obj.contract_address)
+        if stored is not None:
+            return stored["decimals"]
+
         token_info = await self.get_token_info(token_obj=token_obj)
         if not token_info:
             return None
 
-        return token_info["decimals"]
+        self.token_metadata.put_many({token_obj.contract_address: token_info})
+        return int(token_info["decimals"])
+
+    @property
+    def token_metadata(self) -> TokenMetadataStore:
+        return get_metadata_store(config.TOKEN_METADATA_PATH)
+
+    async def prefetch_token_metadata(self, tokens: list[TokenBase]):
+        """
+        Fetches CoinInfo of every token missing from the metadata store and stores them in one batch
+        :param tokens:
+        :return:
+        """
+        by_address = {token.contract_address: token for token in tokens if token.symbol != "aptos"}
+        missing = self.token_metadata.missing(list(by_address))
+        if not missing:
+            return
+
+        infos = await asyncio.gather(*[self.get_token_info(token_obj=by_address[address]) for address in missing])
+        self.token_metadata.put_many({address: info for address, info in zip(missing, infos) if info})
 
     async def get_wallet_token_balance(
             self,
             wallet_address: AccountAddress,
             token_address: str,
-    ) -> int:
+    ) -> int | None:
         """
         Gets wallet token balance
         :param wallet_address:
         :param token_address:
-        :return:
+        :return: 0 when the wallet has no CoinStore for the token, None when the read failed
         """
         try:
             balance = await self.client.account_resource(
                 wallet_address,
                 f"0x1::coin::CoinStore<{token_address}>",
             )
-            logger.debug(balance)
             return int(balance["data"]["coin"]["value"])
 
-        except Exception as e:
-            logger.error(e)
+        except ResourceNotFound:
             return 0
 
+        except Exception as e:
+            logger.error("Error getting {} balance of {}: {}", token_address, wallet_address, e)
+            return None
+
     async def get_token_reserve(
             self,
             resource_address: AccountAddress,
-            payload: str
-    ) -> dict | None:
+            payload: str,
+            min_ledger_version: int = None,
+            parse: Callable[[dict, int | None], Any] = None
+    ) -> Any | None:
         """
-        Gets token reserve
+        Gets token reserve, served from reserve_cache while fresh
         :param resource_address:
         :param payload:
+        :param min_ledger_version: refetch if the cached read is older than this ledger version
+        :param parse: turns the resource and its ledger version into what is returned,
+            the raw resource is returned when None
         :return:
         """
+        async def fetch():
+            resource, ledger_version = await self.client.account_resource_with_version(resource_address, payload)
+            # the resource is cached as read, every caller parses its own copy
+            return (resource, ledger_version), ledger_version
+
         try:
-            data = await self.client.account_resource(
-                resource_address,
-                payload
+            resource, ledger_version = await self.reserve_cache.get_or_fetch(
+                (str(resource_address), payload),
+                fetch,
+                min_ledger_version=min_ledger_version
             )
-            return data
+            return resource if parse is None else parse(resource, ledger_version)
+
+        except ResourceNotFound:
+            logger.debug('no resource {} at {}', payload, resource_address)
+            return None
 
         except Exception as e:
             logger.error(e)
@@ -105,9 +220,8 @@ class ModuleBase:
         if token_obj.symbol == "aptos":
             return None
 
-        coin_address = AccountAddress.from_str(token_obj.address)
-
         try:
+            coin_address = AccountAddress.from_str(token_obj.address)
             token_info = await self.client.account_resource(
                 coin_address,
                 f"0x1::coin::CoinInfo<{token_obj.contract_address}>",
@@ -115,5 +229,5 @@ class ModuleBase:
             return token_info["data"]
 
         except Exception as e:
-            logger.error(f"Error getting token info: {e}")
+            logger.error("Error getting token info: {}", e)
             return None
@@ -0,0 +1,184 @@
+"""
+End to end quoting benchmark against recorded node answers.
+
+    python -m benchmarks.bench_e2e record --output benchmarks/fixtures/e2e.json
+    python -m benchmarks.bench_e2e run benchmarks/fixtures/e2e.json --concurrency 16 --jitter 0.02
+
+`record` quotes the pairs of config.PAIRS_PATH against config.RPC_URLS and keeps
+every answer; it needs PRIVATE_KEY and a reachable node. `run` replays them
+through ReplayTransport, so only this machine is measured: it times
+async_init and get_most_profitable_amount_in_and_set_pool_type for
+`--iterations` rounds of every pair, `--concurrency` at a time, and prints a
+JSON report.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+
+import config
+from aptos_rest_client import HTTP_POOL
+from aptos_rest_client.replay import REPLAY_URL, RecordingTransport, ReplayTransport
+from base import ModuleBase, rpc_client
+from contracts.base import TokenBase, load_pairs
+from liquidswap.pools import load_pool_index
+from liquidswap.swap import LiquidSwapCurve
+from utils.cache import AsyncTTLCache
+from utils.metrics import METRICS
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {'count': len(ordered), 'p50_ms': at(0.5), 'p90_ms': at(0.9), 'p99_ms': at(0.99), 'max_ms': ordered[-1] * 1000}
+
+
+async def quote_once(account: Account, coin_x: TokenBase, coin_y: TokenBase, base_url: str, pool_index) -> tuple:
+    """
+    One pair from scratch, like pipeline.quote_pair
+    :return: seconds spent in async_init and in quoting
+    """
+    module = LiquidSwapCurve(account, base_url, coin_x=coin_x, coin_y=coin_y, pool_index=pool_index)
+
+    started = time.perf_counter()
+    await module.async_init()
+    initialized = time.perf_counter()
+
+    balance = module.initial_balance_x_wei or 10 ** module.token_x_decimals
+    amount_out = round(random.uniform(balance * config.MIN_SWAP_PERCENT_BALANCE,
+                                      balance * config.MAX_SWAP_PERCENT_BALANCE)) or 1
+    await module.get_most_profitable_amount_in_and_set_pool_type(
+        amount_out,
+        coin_x.contract_address,
+        coin_y.contract_address,
+        module.token_x_decimals,
+        module.token_y_decimals,
+    )
+    return initialized - started, time.perf_counter() - initialized
+
+
+async def record(args):
+    pairs = load_pairs(config.PAIRS_PATH)
+    account = Account.load_key(config.PRIVATE_KEY)
+    recorder = RecordingTransport(httpx.AsyncHTTPTransport(http2=config.HTTP2))
+    # keeps the recording client registered so every module below shares it
+    client = rpc_client(config.RPC_URLS, transport=recorder)
+
+    pool_index = await load_pool_index(client) if args.index else None
+    for coin_x, coin_y in pairs:
+        await quote_once(account, coin_x, coin_y, config.RPC_URLS, pool_index)
+
+    recorder.save(
+        args.output,
+        account=str(account.address()),
+        pairs=[[[token.symbol, token.contract_address] for token in pair] for pair in pairs],
+        index=args.index
+    )
+    print(f"{len(recorder.interactions)} answers recorded to {args.output}")
+
+
+async def run(args) -> dict:
+    with open(args.fixtures) as file:
+        fixtures = json.load(file)
+
+    replay = ReplayTransport(
+        fixtures['interactions'],
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        disconnect_rate=args.disconnect_rate,
+        seed=args.seed
+    )
+    # modules build their clients from config, the replay client must match them
+    config.RPC_MAX_RETRIES = args.max_retries
+    client = rpc_client(REPLAY_URL, transport=replay)
+    # reads only, no key needed
+    account = Account(AccountAddress.from_str(fixtures['account']), None)
+    pairs = [(TokenBase(*x), TokenBase(*y)) for x, y in fixtures['pairs']]
+    random.seed(args.seed)
+
+    ModuleBase.reserve_cache = AsyncTTLCache(ttl=args.cache_ttl, maxsize=config.RESERVE_CACHE_SIZE, name='reserves')
+    METRICS.enabled = args.metrics
+    pool_index = await load_pool_index(client) if fixtures.get('index') else None
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    init_latency, quote_latency, errors = [], [], []
+
+    async def limited(coin_x: TokenBase, coin_y: TokenBase):
+        async with semaphore:
+            try:
+                init_time, quote_time = await quote_once(account, coin_x, coin_y, REPLAY_URL, pool_index)
+            except Exception as e:
+                errors.append(repr(e))
+                return
+            init_latency.append(init_time)
+            quote_latency.append(quote_time)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[limited(x, y) for _ in range(args.iterations) for x, y in pairs])
+    elapsed = time.perf_counter() - started
+
+    return {
+        'quotes': len(quote_latency),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'seconds': elapsed,
+        'quotes_per_sec': len(quote_latency) / elapsed,
+        'async_init': percentiles(init_latency),
+        'quote': percentiles(quote_latency),
+        'replay': replay.stats(),
+        'transport': {key: value for key, value in client.transport.stats().items() if key != 'endpoints'},
+        'reserve_cache': {'hits': ModuleBase.reserve_cache.hits, 'misses': ModuleBase.reserve_cache.misses},
+        'metrics': METRICS.snapshot() if args.metrics else None,
+    }
+
+
+async def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recording = commands.add_parser('record', help='record node answers for the pairs of config.PAIRS_PATH')
+    recording.add_argument('--output', type=Path, default=Path(__file__).parent / 'fixtures' / 'e2e.json')
+    recording.add_argument('--index', action='store_true', help='also record the liquidswap pool index')
+
+    running = commands.add_parser('run', help='benchmark against recorded answers')
+    running.add_argument('fixtures', type=Path)
+    running.add_argument('--iterations', type=int, default=20, help='rounds over every recorded pair')
+    running.add_argument('--concurrency', type=int, default=config.PAIRS_CONCURRENCY)
+    running.add_argument('--latency', type=float, help='seconds per answer, the recorded latency by default')
+    running.add_argument('--jitter', type=float, default=0.0)
+    running.add_argument('--error-rate', type=float, default=0.0, help='share of answers replaced by a 503')
+    running.add_argument('--disconnect-rate', type=float, default=0.0)
+    running.add_argument('--max-retries', type=int, default=config.RPC_MAX_RETRIES)
+    running.add_argument('--cache-ttl', type=float, default=config.RESERVE_CACHE_TTL, help='0 disables caching')
+    running.add_argument('--seed', type=int)
+    running.add_argument('--metrics', action='store_true', help='include a utils.metrics snapshot in the report')
+
+    args = parser.parse_args(argv)
+    # fresh decimals store so the first round reads CoinInfo like a cold start
+    config.TOKEN_METADATA_PATH = str(Path(tempfile.mkdtemp()) / 'token_metadata.sqlite3')
+
+    try:
+        if args.command == 'record':
+            await record(args)
+        else:
+            print(json.dumps(await run(args), indent=2))
+    finally:
+        await HTTP_POOL.close_all()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
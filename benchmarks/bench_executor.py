@@ -0,0 +1,103 @@
+"""
+Size sweeps priced inline, in a thread pool and in a process pool.
+
+    python -m benchmarks.bench_executor --jobs 64 --sizes 2000 --workers 4
+
+Every job is one fixture pool with `--sizes` amounts. While the sweep runs
+a ticker on the event loop wakes up every millisecond; its worst overshoot
+is how long network I/O would have waited.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.bench_math import load_pools
+from utils.executor import QuoteExecutor, QuoteJob, run_job
+
+
+def build_jobs(pools: dict, jobs: int, sizes: int) -> list[QuoteJob]:
+    pool_jobs = []
+    for pool in pools.values():
+        step = max(pool['amount'] // 10, 1)
+        pool_jobs.append(QuoteJob(
+            pool['pool_type'],
+            tuple(step * (i + 1) for i in range(sizes)),
+            pool['reserve_in'],
+            pool['reserve_out'],
+            10 ** pool['decimals_in'],
+            10 ** pool['decimals_out'],
+            pool['fee']
+        ))
+    return [pool_jobs[i % len(pool_jobs)] for i in range(jobs)]
+
+
+async def ticker(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """
+    Largest delay of a `interval` sleep until stop is set
+    """
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_mode(jobs: list[QuoteJob], executor: QuoteExecutor | None) -> tuple[dict, list]:
+    if executor is not None:
+        # workers start outside the timed run
+        await executor.quote(jobs[0])
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(ticker(stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    if executor is None:
+        results = [run_job(job) for job in jobs]
+    else:
+        results = await executor.quote_many(jobs)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    quotes = sum(len(job.amounts) for job in jobs)
+    return {
+        'seconds': elapsed,
+        'quotes_per_sec': quotes / elapsed,
+        'max_loop_lag_ms': await lag * 1000,
+    }, results
+
+
+async def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=64, help='pool states to sweep')
+    parser.add_argument('--sizes', type=int, default=2000, help='amounts per pool state')
+    parser.add_argument('--workers', type=int, help='defaults to the number of cores')
+    parser.add_argument('--jobs-per-task', type=int, default=8)
+    parser.add_argument('--only', choices=['inline', 'thread', 'process'], action='append')
+    args = parser.parse_args(argv)
+
+    jobs = build_jobs(load_pools(), args.jobs, args.sizes)
+    report = {}
+    reference = None
+    for mode in args.only or ['inline', 'thread', 'process']:
+        executor = None if mode == 'inline' else QuoteExecutor(mode, args.workers, args.jobs_per_task)
+        try:
+            report[mode], results = await run_mode(jobs, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if reference is None:
+            reference = results
+        elif results != reference:
+            print(f"{mode} quotes differ from {next(iter(report))}", file=sys.stderr)
+            return 1
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,163 @@
+"""
+Recording and replay throughput of liquidswap.history on a synthetic history.
+
+    python -m benchmarks.bench_history --rows 1000000 --sizes 8
+    python -m benchmarks.bench_history --rows 1000000 --path /tmp/history --keep
+
+The APT/USDC fixture pools random-walk their reserves, one read of one pool
+per row, and are recorded through HistoryRecorder. The history is then
+replayed for `--sizes` swap sizes between MIN_SWAP_PERCENT_BALANCE and
+MAX_SWAP_PERCENT_BALANCE of `--balance`, and `--check` replayed ledger
+versions are compared with the scalar integer math.
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import config
+from benchmarks.bench_math import load_pools
+from liquidswap.history import HistoryRecorder, ReserveHistory
+from liquidswap.pools import PoolState
+from utils.int_math import get_amount_out
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+
+# (pool_version, pool_type) -> fixture pool, all oriented from APT except the stable one
+FIXTURE_POOLS = {
+    ('v0', 'Uncorrelated'): 'apt_usdc_uncorrelated',
+    ('v0.5', 'Uncorrelated'): 'apt_usdc_uncorrelated_thin',
+    ('v0.5', 'Stable'): 'usdc_apt_stable',
+}
+
+
+def record(path: Path, rows: int, seed: int) -> float:
+    """
+    Writes `rows` random-walk reads of the fixture pools
+    :param path:
+    :param rows:
+    :param seed:
+    :return: seconds spent in HistoryRecorder
+    """
+    fixtures = load_pools()
+    generator = random.Random(seed)
+    states = []
+    for (pool_version, pool_type), name in FIXTURE_POOLS.items():
+        pool = fixtures[name]
+        coins = (USDC, APT) if name.startswith('usdc') else (APT, USDC)
+        states.append([
+            PoolState(pool_version, pool_type, pool['reserve_in'], pool['reserve_out'], pool['fee']), *coins
+        ])
+
+    recorder = HistoryRecorder(path)
+    ledger_version = 1_000_000
+    elapsed = 0.0
+    for _ in range(rows):
+        ledger_version += generator.randint(1, 5)
+        entry = states[generator.randrange(len(states))]
+        state = entry[0]
+        # a swap moves reserves in opposite directions
+        trade = generator.gauss(0, 0.001)
+        state = state._replace(
+            reserve_in=max(int(state.reserve_in * (1 + trade)), 1),
+            reserve_out=max(int(state.reserve_out * (1 - trade)), 1),
+            ledger_version=ledger_version
+        )
+        entry[0] = state
+
+        started = time.perf_counter()
+        recorder.record(state, entry[1], entry[2])
+        elapsed += time.perf_counter() - started
+
+    started = time.perf_counter()
+    recorder.close()
+    return elapsed + time.perf_counter() - started
+
+
+def check(history: ReserveHistory, chunk, amounts: list[int], samples: int, seed: int) -> int:
+    """
+    Replayed quotes that differ from int_math at `samples` random ledger versions of chunk
+    :return: mismatches
+    """
+    generator = random.Random(seed)
+    rows = {key: history.pool_rows(history.pair_pools(APT, USDC)[key][0]) for key in chunk.pools}
+    flipped = {key: history.pair_pools(APT, USDC)[key][1] for key in chunk.pools}
+    fixtures = load_pools()
+    scales = {APT: 10 ** 8, USDC: 10 ** 6}
+
+    mismatches = 0
+    for _ in range(samples):
+        event = generator.randrange(len(chunk.ledger_versions))
+        ledger_version = chunk.ledger_versions[event]
+        for position, key in enumerate(chunk.pools):
+            pool_rows = rows[key]
+            latest = np.searchsorted(pool_rows['ledger_version'], ledger_version, side='right') - 1
+            reserve_x, reserve_y = int(pool_rows['reserve_x'][latest]), int(pool_rows['reserve_y'][latest])
+            reserve_in, reserve_out = (reserve_y, reserve_x) if flipped[key] else (reserve_x, reserve_y)
+            fee = fixtures[FIXTURE_POOLS[key]]['fee']
+            for size, amount in enumerate(amounts):
+                expected = -1 if latest < 0 else get_amount_out(
+                    key[1], amount, reserve_in, reserve_out, scales[APT], scales[USDC], fee
+                )
+                mismatches += expected != chunk.amounts_in[event, position, size]
+    return int(mismatches)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sizes', type=int, default=8, help='swap sizes replayed at every ledger version')
+    parser.add_argument('--balance', type=int, default=10_000 * 10 ** 8, help='raw APT balance the sizes are taken of')
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    parser.add_argument('--check', type=int, default=200, help='ledger versions compared with the scalar math')
+    parser.add_argument('--path', type=Path, help='history directory, a temporary one by default')
+    parser.add_argument('--keep', action='store_true', help="don't delete the history afterwards")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = args.path or Path(tempfile.mkdtemp(prefix='history-'))
+    try:
+        record_seconds = record(path, args.rows, args.seed)
+
+        history = ReserveHistory(path)
+        amounts = [
+            round(args.balance * share)
+            for share in np.linspace(config.MIN_SWAP_PERCENT_BALANCE, config.MAX_SWAP_PERCENT_BALANCE, args.sizes)
+        ]
+        started = time.perf_counter()
+        ledger_versions = 0
+        selected = np.zeros(len(FIXTURE_POOLS), dtype=np.int64)
+        first = None
+        for chunk in history.replay(APT, USDC, amounts, 10 ** 8, 10 ** 6, chunk_size=args.chunk_size):
+            first = first or chunk
+            ledger_versions += len(chunk.ledger_versions)
+            selected += np.bincount(chunk.best[chunk.best >= 0], minlength=len(chunk.pools))
+        replay_seconds = time.perf_counter() - started
+
+        report = {
+            'rows': len(history),
+            'bytes': sum(file.stat().st_size for file in path.iterdir()),
+            'record_rows_per_sec': args.rows / record_seconds,
+            'replay_seconds': replay_seconds,
+            'replay_ledger_versions_per_sec': ledger_versions / replay_seconds,
+            'replay_quotes_per_sec': ledger_versions * len(amounts) * len(FIXTURE_POOLS) / replay_seconds,
+            'selected': {'/'.join(key): int(count) for key, count in zip(first.pools, selected)},
+            'mismatches': check(history, first, amounts, args.check, args.seed),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Benchmarks of the curve math with a regression gate.
+
+    python -m benchmarks.bench_math --output bench.json
+    python -m benchmarks.bench_math --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_math --baseline benchmarks/baseline.json --tolerance 0.2
+
+Every case is timed in blocks of calls; ops/sec is over all calls and p50/p99
+are per-call times over blocks. With --baseline the run fails (exit code 1)
+when a case got slower than the baseline by more than the tolerance.
+
+benchmarks/baseline.json is committed and was measured on the machine named
+in it. Timings only compare on the same hardware: on any other machine,
+save a baseline from the base commit first and gate the change against
+that, which is what CI does:
+
+    git checkout main && python -m benchmarks.bench_math --save-baseline /tmp/baseline.json
+    git checkout - && python -m benchmarks.bench_math --baseline /tmp/baseline.json
+
+The fixture pools are synthetic, none was read from a node:
+apt_usdc_uncorrelated and usdc_apt_stable take the reserves of the
+utils/math.py examples, apt_stapt_stable and apt_usdc_uncorrelated_thin
+are made-up reserves of realistic magnitude.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable
+
+from utils import int_math, lut
+from utils import math as decimal_math
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'pools.json'
+BATCH_SIZE = 1000
+
+
+def load_pools(path: Path = FIXTURES) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def time_case(function: Callable[[], object], calls_per_call: int, blocks: int, block_size: int) -> dict:
+    """
+    Times `function` in `blocks` blocks of `block_size` calls
+    :param function:
+    :param calls_per_call: quotes computed by one call, BATCH_SIZE for batch cases
+    :param blocks:
+    :param block_size:
+    :return:
+    """
+    function()
+
+    per_call = []
+    total = 0.0
+    for _ in range(blocks):
+        started = time.perf_counter()
+        for _ in range(block_size):
+            function()
+        elapsed = time.perf_counter() - started
+        total += elapsed
+        per_call.append(elapsed / (block_size * calls_per_call))
+
+    per_call.sort()
+    return {
+        'ops_per_sec': blocks * block_size * calls_per_call / total,
+        'p50_us': per_call[len(per_call) // 2] * 1e6,
+        'p99_us': per_call[min(int(len(per_call) * 0.99), len(per_call) - 1)] * 1e6,
+    }
+
+
+def build_cases(pools: dict) -> dict[str, tuple[Callable[[], object], int]]:
+    """
+    Name -> (callable, quotes per call) for every fixture pool
+    :param pools:
+    :return:
+    """
+    cases = {}
+    for name, pool in pools.items():
+        cases.update(_pool_cases(name, pool))
+
+    burn = (Decimal(1925882931508), Decimal(2305894823455), Decimal(2108502286080), Decimal(111117))
+    cases['decimal.calc_output_burn_liquidity'] = (lambda: decimal_math.calc_output_burn_liquidity(*burn), 1)
+    return cases
+
+
+def _pool_cases(name: str, pool: dict) -> dict[str, tuple[Callable[[], object], int]]:
+    pool_type, fee, amount = pool['pool_type'], pool['fee'], pool['amount']
+    reserve_in, reserve_out = pool['reserve_in'], pool['reserve_out']
+    scale_in, scale_out = 10 ** pool['decimals_in'], 10 ** pool['decimals_out']
+    dec = [Decimal(value) for value in (amount, reserve_in, reserve_out, scale_in, scale_out, fee)]
+
+    cases = {}
+    if pool_type == 'Uncorrelated':
+        cases[f'int.get_coins_out_with_fees[{name}]'] = (
+            lambda: int_math.get_coins_out_with_fees(amount, reserve_in, reserve_out, fee), 1
+        )
+        cases[f'decimal.get_coins_out_with_fees[{name}]'] = (
+            lambda: decimal_math.get_coins_out_with_fees(dec[0], dec[1], dec[2], dec[5]), 1
+        )
+    else:
+        xy = int_math.lp_value(reserve_in, scale_in, reserve_out, scale_out)
+        x0 = (reserve_in + amount) * int_math.ONE_E_8 // scale_in
+        y = reserve_out * int_math.ONE_E_8 // scale_out
+
+        cases[f'int.get_coins_out_with_fees_stable[{name}]'] = (
+            lambda: int_math.get_coins_out_with_fees_stable(amount, reserve_in, reserve_out, scale_in, scale_out, fee),
+            1
+        )
+        cases[f'decimal.get_coins_out_with_fees_stable[{name}]'] = (
+            lambda: decimal_math.get_coins_out_with_fees_stable(*dec), 1
+        )
+        cases[f'int.get_y[{name}]'] = (lambda: int_math.get_y(x0, xy, y), 1)
+        cases[f'int.coin_in[{name}]'] = (
+            lambda: int_math.coin_in(amount, scale_out, scale_in, reserve_out, reserve_in), 1
+        )
+
+    table = lut.PriceImpactTable(pool_type, reserve_in, reserve_out, scale_in, scale_out, fee)
+    cases[f'lut.quote[{name}]'] = (lambda: table.quote(amount), 1)
+
+    try:
+        import numpy as np
+        from utils import batch
+    except ImportError:
+        return cases
+
+    amounts = np.linspace(amount // 10, amount * 10, BATCH_SIZE).astype(np.int64)
+    cases[f'batch.get_amounts_out[{name}]'] = (
+        lambda: batch.get_amounts_out(pool_type, amounts, reserve_in, reserve_out, scale_in, scale_out, fee),
+        BATCH_SIZE
+    )
+    return cases
+
+
+def run(cases: dict, blocks: int, block_size: int, only: str = None) -> dict:
+    results = {}
+    for name, (function, calls_per_call) in cases.items():
+        if only and only not in name:
+            continue
+        # batch cases do a thousand quotes per call, keep their wall time comparable
+        size = block_size if calls_per_call == 1 else max(1, block_size // 50)
+        results[name] = time_case(function, calls_per_call, blocks, size)
+    return results
+
+
+def machine() -> str:
+    """
+    Platform and cores the timings were taken on
+    """
+    return f"{platform.platform()} {platform.machine()} {os.cpu_count()} cores"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Cases whose ops/sec fell more than `tolerance` below the baseline
+    :param results:
+    :param baseline:
+    :param tolerance: allowed relative slowdown, 0.2 is 20%
+    :return: human readable regressions
+    """
+    regressions = []
+    for name, expected in baseline.get('results', {}).items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        ratio = actual['ops_per_sec'] / expected['ops_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{name}: {actual['ops_per_sec']:.0f} ops/s vs baseline {expected['ops_per_sec']:.0f} ({ratio:.0%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES)
+    parser.add_argument('--blocks', type=int, default=50)
+    parser.add_argument('--block-size', type=int, default=200)
+    parser.add_argument('--only', help='run only cases whose name contains this')
+    parser.add_argument('--output', type=Path, help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', type=Path, help='fail on regressions against this report')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', type=Path, help='write the report as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run(build_cases(load_pools(args.fixtures)), args.blocks, args.block_size, args.only)
+    report = {
+        'python': sys.version.split()[0],
+        'machine': machine(),
+        'blocks': args.blocks,
+        'block_size': args.block_size,
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.save_baseline:
+        args.save_baseline.write_text(text)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get('machine') != report['machine']:
+            print(f"WARNING baseline measured on {baseline.get('machine')}, not {report['machine']}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Cold-start time of the entry points, each run in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --fixtures benchmarks/fixtures/e2e.json
+    python -m benchmarks.bench_startup --save-baseline benchmarks/startup_baseline.json
+    python -m benchmarks.bench_startup --baseline benchmarks/startup_baseline.json --tolerance 0.2
+    python -m benchmarks.bench_startup --importtime 15
+
+With --fixtures, `quote_replay` also times a whole `quote.py` run against
+answers recorded by `bench_e2e record`. With --baseline the run fails (exit
+code 1) when a case's median got slower than the baseline by more than the
+tolerance. --importtime lists the slowest imports of the quote path.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# what quote.py imports once its arguments are parsed
+QUOTE_IMPORTS = "import config, aptos_rest_client, contracts.base, liquidswap.pools, liquidswap.swap"
+
+REPLAY_QUOTE = """
+import sys
+from aptos_rest_client.replay import REPLAY_URL, ReplayTransport
+from base import rpc_client
+import quote
+rpc_client(REPLAY_URL, transport=ReplayTransport.load(sys.argv[1]))
+sys.exit(quote.main(['--amount', '100000000', '--rpc', REPLAY_URL]))
+"""
+
+
+def build_cases(fixtures: Path = None) -> dict[str, list[str]]:
+    cases = {
+        'python': [sys.executable, '-c', 'pass'],
+        'import_main': [sys.executable, '-c', 'import main'],
+        'quote_help': [sys.executable, 'quote.py', '--help'],
+        'quote_imports': [sys.executable, '-c', QUOTE_IMPORTS],
+    }
+    if fixtures is not None:
+        cases['quote_replay'] = [sys.executable, '-c', REPLAY_QUOTE, str(fixtures.resolve())]
+    return cases
+
+
+def time_command(command: list[str], runs: int, env: dict) -> dict:
+    """
+    Wall time of `runs` runs of command
+    :param command:
+    :param runs:
+    :param env:
+    :return:
+    """
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True)
+        times.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f"{command} failed: {result.stderr.decode()[-500:]}")
+
+    return {
+        'min_ms': min(times) * 1000,
+        'median_ms': statistics.median(times) * 1000,
+        'max_ms': max(times) * 1000,
+    }
+
+
+def slowest_imports(statement: str, env: dict, top: int) -> list[tuple[str, float]]:
+    """
+    Modules of statement with the largest cumulative import time, from python -X importtime
+    :param statement:
+    :param env:
+    :param top:
+    :return: (module, ms)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: -item[1])[:top]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Cases whose median start time rose more than `tolerance` above the baseline
+    :param results:
+    :param baseline:
+    :param tolerance: allowed relative slowdown, 0.2 is 20%
+    :return: human readable regressions
+    """
+    regressions = []
+    for name, expected in baseline.get('results', {}).items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        ratio = actual['median_ms'] / expected['median_ms']
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {actual['median_ms']:.0f} ms vs baseline {expected['median_ms']:.0f} ms ({ratio:.0%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--fixtures', type=Path, help='bench_e2e recording to time a whole quote.py run with')
+    parser.add_argument('--importtime', type=int, metavar='TOP', help='list the TOP slowest imports of quote.py')
+    parser.add_argument('--output', type=Path, help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', type=Path, help='fail on regressions against this report')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', type=Path, help='write the report as the new baseline')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            'PYTHONPATH': str(ROOT),
+            'DEBUG_MODE': '0',
+            # decimals come from the recording, not from a metadata store of earlier runs
+            'TOKEN_METADATA_PATH': str(Path(directory) / 'token_metadata.sqlite3'),
+        }
+        # first runs fill the bytecode caches, every case is timed warm on disk
+        for command in build_cases(args.fixtures).values():
+            subprocess.run(command, cwd=ROOT, env=env, capture_output=True)
+
+        results = {
+            name: time_command(command, args.runs, env) for name, command in build_cases(args.fixtures).items()
+        }
+        report = {'python': sys.version.split()[0], 'runs': args.runs, 'results': results}
+        if args.importtime:
+            report['slowest_imports'] = slowest_imports(QUOTE_IMPORTS, env, args.importtime)
+
+    text = json.dumps(report, indent=2)
+    if args.save_baseline:
+        args.save_baseline.write_text(text)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Swap submission throughput against an in-process mock of the node's
+transaction endpoints.
+
+    python -m benchmarks.bench_submit --swaps 200 --latency 0.05 --block-time 0.25
+    python -m benchmarks.bench_submit --swaps 200 --drop-rate 0.02 --expiration 2
+
+Compares TransactionPipeline (local sequence numbers, background
+confirmation) with submitting and waiting for each swap in turn. The mock
+verifies every signature, commits transactions in sequence-number order one
+block time after submission, and can drop a share of them so they expire
+and leave a sequence gap.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from aptos_sdk.account import Account
+
+from aptos_rest_client import CustomRestClient, HTTP_POOL
+from liquidswap.config import POOLS_INFO
+from liquidswap.execution import TransactionPipeline, swap_template
+from tests.mock_chain import APT, USDC, MockChainTransport
+
+MOCK_URL = "http://mock-chain.invalid/v1"
+
+
+async def run_pipelined(client: CustomRestClient, account: Account, swaps: int, confirm_interval: float,
+                        expiration: int) -> dict:
+    pipeline = TransactionPipeline(client, account, max_in_flight=swaps, confirm_interval=confirm_interval,
+                                   expiration_ttl=expiration)
+    template = swap_template('v0.5', POOLS_INFO['v0.5']['router_address'], 'swap', APT, USDC, 'Uncorrelated')
+
+    started = time.perf_counter()
+    submitted = await asyncio.gather(*[pipeline.submit(template.payload(1000 + i, 1)) for i in range(swaps)])
+    submit_time = time.perf_counter() - started
+    results = await asyncio.gather(*[item.result for item in submitted], return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    await pipeline.close()
+
+    return {
+        'seconds': elapsed,
+        'submit_seconds': submit_time,
+        'swaps_per_sec': swaps / elapsed,
+        'landed': sum(1 for result in results if not isinstance(result, BaseException) and result.success),
+        **pipeline.stats(),
+    }
+
+
+async def run_serial(client: CustomRestClient, account: Account, swaps: int, confirm_interval: float) -> dict:
+    template = swap_template('v0.5', POOLS_INFO['v0.5']['router_address'], 'swap', APT, USDC, 'Uncorrelated')
+
+    started = time.perf_counter()
+    landed = 0
+    for i in range(swaps):
+        signed = await client.create_bcs_signed_transaction(account, template.payload(1000 + i, 1))
+        txn_hash = await client.submit_bcs_transaction(signed)
+        while await client.transaction_pending(txn_hash):
+            await asyncio.sleep(confirm_interval)
+        landed += 1
+    elapsed = time.perf_counter() - started
+    return {'seconds': elapsed, 'swaps_per_sec': swaps / elapsed, 'landed': landed}
+
+
+async def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--swaps', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per node round trip')
+    parser.add_argument('--block-time', type=float, default=0.25, help='seconds from submission to commit')
+    parser.add_argument('--confirm-interval', type=float, default=0.1)
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='share of submissions that never land')
+    parser.add_argument('--expiration', type=int, default=600, help='transaction expiration in seconds')
+    parser.add_argument('--serial', action='store_true', help='also run submit-and-wait one by one')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    report = {}
+    try:
+        transport = MockChainTransport(args.latency, args.block_time, args.drop_rate, args.seed)
+        client = CustomRestClient(base_url=MOCK_URL, transport=transport, max_retries=0)
+        report['pipelined'] = await run_pipelined(
+            client, Account.generate(), args.swaps, args.confirm_interval, args.expiration
+        )
+
+        if args.serial:
+            transport = MockChainTransport(args.latency, args.block_time, seed=args.seed)
+            # another url, so the shared client pool gives it its own transport
+            client = CustomRestClient(base_url=MOCK_URL.replace("mock-chain", "mock-chain-serial"),
+                                      transport=transport, max_retries=0)
+            report['serial'] = await run_serial(client, Account.generate(), args.swaps, args.confirm_interval)
+    finally:
+        await HTTP_POOL.close_all()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -1,10 +1,19 @@
 import os
 import sys
+from pathlib import Path
 
-from dotenv import load_dotenv
 from loguru import logger
 
-load_dotenv()
+# python-dotenv takes ~10 ms to import, skip it unless load_dotenv has a .env to find:
+# next to this file, in the working directory or above either
+if any(
+        (directory / '.env').is_file()
+        for start in (Path(__file__).resolve().parent, Path.cwd())
+        for directory in (start, *start.parents)
+):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 DEBUG_MODE = os.getenv("DEBUG_MODE", '1') in ['1', 'true']
 
@@ -16,7 +25,44 @@ else:
 
 
 RPC_URL: str = "https://rpc.ankr.com/http/aptos/v1"
+# equivalent endpoints reads are balanced across, RPC_URL alone by default
+RPC_URLS: list[str] = [url for url in os.getenv("RPC_URLS", RPC_URL).split(",") if url]
+RPC_HEDGE = os.getenv("RPC_HEDGE", '0') in ['1', 'true']
+# requests per second allowed per endpoint, unlimited when empty
+RPC_RATE_LIMIT = float(os.getenv("RPC_RATE_LIMIT")) if os.getenv("RPC_RATE_LIMIT") else None
+RPC_MAX_RETRIES = 3
 MIN_SWAP_PERCENT_BALANCE = 0.1
 MAX_SWAP_PERCENT_BALANCE = 0.2
+PAIRS_CONCURRENCY = 8
+# tokens and pairs quoted by main.py and quote.py, next to this file unless set so cron jobs find it from any directory
+PAIRS_PATH = os.getenv("PAIRS_PATH") or str(Path(__file__).parent / "pairs.json")
+# wallets whose resources are read at once by balances.scan_balances
+BALANCE_SCAN_CONCURRENCY = 16
+
+HTTP2 = True
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 30.0
+
+TOKEN_METADATA_PATH = os.getenv("TOKEN_METADATA_PATH", "token_metadata.sqlite3")
+
+RESERVE_CACHE_TTL = 2.0
+RESERVE_CACHE_SIZE = 1024
+
+# 'thread' or 'process' to price quotes in a pool off the event loop, inline when empty, see utils/executor.py
+QUOTE_EXECUTOR = os.getenv("QUOTE_EXECUTOR") or None
+# defaults to the number of cores
+QUOTE_WORKERS = int(os.getenv("QUOTE_WORKERS")) if os.getenv("QUOTE_WORKERS") else None
+QUOTE_JOBS_PER_TASK = 8
+# select pools on price-impact tables, see utils/lut.py, only close contenders are quoted exactly
+QUOTE_APPROXIMATE = os.getenv("QUOTE_APPROXIMATE", '0') in ['1', 'true']
+
+# directory every pool state read is appended to, see liquidswap/history.py, nothing is recorded when empty
+HISTORY_PATH = os.getenv("HISTORY_PATH") or None
+
+# record RPC, cache, solver and quote metrics, see utils/metrics.py
+METRICS_ENABLED = os.getenv("METRICS", '0') in ['1', 'true']
+# snapshot written on exit, Prometheus text for *.prom and JSON otherwise
+METRICS_PATH = os.getenv("METRICS_PATH")
 
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
@@ -1,3 +1,53 @@
+import json
+from functools import lru_cache
+
+
+def _bcs_string(value: str) -> bytes:
+    """
+    BCS encoding of a string: ULEB128 length followed by the utf-8 bytes
+    :param value:
+    :return:
+    """
+    data = value.encode()
+    length = len(data)
+    prefix = bytearray()
+    while True:
+        byte = length & 0x7f
+        length >>= 7
+        if length:
+            prefix.append(byte | 0x80)
+        else:
+            prefix.append(byte)
+            return bytes(prefix) + data
+
+
+@lru_cache(maxsize=None)
+def coin_sort_key(contract_address: str) -> tuple[bytes, bytes, bytes]:
+    """
+    Key ordering coin types like liquidswap::coin_helper::compare: struct name first,
+    then module name, then address, each compared as BCS bytes
+    :param contract_address: e.g. 0x1::aptos_coin::AptosCoin
+    :return:
+    """
+    address, module_name, struct_name = contract_address.split("::", 2)
+    address_bytes = bytes.fromhex(address.removeprefix("0x").zfill(64))
+    return _bcs_string(struct_name), _bcs_string(module_name), address_bytes
+
+
+def is_sorted(coin_x: str, coin_y: str) -> bool:
+    """
+    Whether Liquidswap stores the pair as LiquidityPool<coin_x, coin_y, ...>
+    :param coin_x:
+    :param coin_y:
+    :return:
+    """
+    key_x = coin_sort_key(coin_x)
+    key_y = coin_sort_key(coin_y)
+    if key_x == key_y:
+        raise ValueError(f"Can't order a coin with itself: {coin_x}")
+    return key_x < key_y
+
+
 class TokenBase:
     def __init__(
             self,
@@ -19,6 +69,38 @@ class TokenBase:
         self.coin_gecko_id = gecko_id
 
 
+def _read_pairs_file(path: str) -> tuple[dict[str, 'TokenBase'], list[list[str]]]:
+    with open(path) as file:
+        data = json.load(file)
+    tokens = {symbol: TokenBase(symbol, contract_address) for symbol, contract_address in data['tokens'].items()}
+    return tokens, data.get('pairs', [])
+
+
+def load_tokens(path: str) -> dict[str, 'TokenBase']:
+    """
+    Tokens of a pairs file by symbol
+    :param path: JSON with "tokens": {symbol: coin type} and "pairs": [[symbol_x, symbol_y], ...]
+    :return:
+    """
+    return _read_pairs_file(path)[0]
+
+
+def load_pairs(path: str) -> list[tuple['TokenBase', 'TokenBase']]:
+    """
+    Pairs of a pairs file, see load_tokens
+    :param path:
+    :return:
+    """
+    tokens, symbol_pairs = _read_pairs_file(path)
+
+    pairs = []
+    for symbol_x, symbol_y in symbol_pairs:
+        if symbol_x not in tokens or symbol_y not in tokens:
+            raise ValueError(f"Pair {symbol_x}/{symbol_y} of {path} uses a token missing from its tokens")
+        pairs.append((tokens[symbol_x], tokens[symbol_y]))
+    return pairs
+
+
 class ChainBase:
     def __init__(
             self,
@@ -0,0 +1,79 @@
+import sqlite3
+from functools import lru_cache
+
+
+class TokenMetadataStore:
+    """
+    On-disk cache of 0x1::coin::CoinInfo fields that never change (name, symbol, decimals),
+    keyed by the coin type string. The whole table is read into memory on open.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS coin_info ("
+            "coin_type TEXT PRIMARY KEY, name TEXT, symbol TEXT, decimals INTEGER NOT NULL)"
+        )
+        self._connection.commit()
+
+        self._memory: dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """
+        Reads every stored coin into memory
+        :return:
+        """
+        rows = self._connection.execute("SELECT coin_type, name, symbol, decimals FROM coin_info")
+        self._memory = {
+            coin_type: {'name': name, 'symbol': symbol, 'decimals': decimals}
+            for coin_type, name, symbol, decimals in rows
+        }
+
+    def get(self, coin_type: str) -> dict | None:
+        """
+        Stored CoinInfo fields of a coin type
+        :param coin_type:
+        :return:
+        """
+        return self._memory.get(coin_type)
+
+    def missing(self, coin_types: list[str]) -> list[str]:
+        """
+        Coin types not stored yet
+        :param coin_types:
+        :return:
+        """
+        return [coin_type for coin_type in dict.fromkeys(coin_types) if coin_type not in self._memory]
+
+    def put_many(self, infos: dict[str, dict]):
+        """
+        Stores CoinInfo data of many coins in one transaction
+        :param infos: coin type -> CoinInfo data as returned by the node
+        :return:
+        """
+        rows = [
+            (coin_type, info.get('name'), info.get('symbol'), int(info['decimals']))
+            for coin_type, info in infos.items()
+        ]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO coin_info (coin_type, name, symbol, decimals) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        for coin_type, name, symbol, decimals in rows:
+            self._memory[coin_type] = {'name': name, 'symbol': symbol, 'decimals': decimals}
+
+    def close(self):
+        self._connection.close()
+
+
+@lru_cache(maxsize=None)
+def get_metadata_store(path: str) -> TokenMetadataStore:
+    """
+    Process-wide store for a path, opened on first use
+    :param path:
+    :return:
+    """
+    return TokenMetadataStore(path)
@@ -0,0 +1,415 @@
+"""
+Pipelined swap submission.
+
+Sequence numbers are handed out locally by a SequenceManager, so many swaps
+of one wallet can be built, signed and submitted back to back without a
+round trip each. A TransactionPipeline tracks the submitted hashes and
+confirms them in the background with transaction_by_hash; when one expires
+without landing, every later one of the wallet is stuck behind the gap, so
+they are failed together and the sequence number is read again from chain.
+A resync never goes below the sequence numbers still pending, and a submit
+answered with a sequence error is first looked up by hash: the node may
+have accepted an earlier attempt whose answer was lost. A submit failing
+any other way gives its sequence number back for the next one to use.
+
+Router payloads come from SwapTemplates built once per pool and direction;
+only the two u64 amounts are serialized per swap.
+"""
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import ApiError
+from aptos_sdk.bcs import Serializer
+from aptos_sdk.transactions import EntryFunction, ModuleId, RawTransaction, SignedTransaction, TransactionPayload
+from aptos_sdk.type_tag import StructTag, TypeTag
+from loguru import logger
+
+from aptos_rest_client import CustomRestClient
+
+# router module of each Liquidswap version
+SWAP_MODULES = {
+    'v0': 'scripts_v2',
+    'v0.5': 'scripts',
+}
+
+
+class SwapTemplate:
+    """
+    Entry function of one router swap with its module and type arguments
+    prebuilt: <function><coin_in, coin_out, curve>(u64, u64)
+    """
+
+    def __init__(self, router_address: AccountAddress, module: str, function: str, coin_in: str, coin_out: str,
+                 pool_type: str):
+        self.module = ModuleId(router_address, module)
+        self.function = function
+        self.ty_args = [
+            TypeTag(StructTag.from_str(coin_in)),
+            TypeTag(StructTag.from_str(coin_out)),
+            TypeTag(StructTag.from_str(f"{router_address}::curves::{pool_type}")),
+        ]
+
+    def payload(self, first: int, second: int) -> TransactionPayload:
+        """
+        :param first: swap: amount sent, swap_into: most that may be sent
+        :param second: swap: least to receive, swap_into: amount received
+        :return:
+        """
+        return TransactionPayload(EntryFunction(self.module, self.function, self.ty_args, [_u64(first), _u64(second)]))
+
+
+def swap_template(pool_version: str, router_address: AccountAddress | str, function: str, coin_in: str, coin_out: str,
+                  pool_type: str) -> SwapTemplate:
+    """
+    Shared template of a router swap
+    :param pool_version: 'v0' or 'v0.5'
+    :param router_address:
+    :param function: 'swap' (exact in) or 'swap_into' (exact out)
+    :param coin_in: coin type sent
+    :param coin_out: coin type received
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :return:
+    """
+    # AccountAddress isn't hashable, templates are cached by its string form
+    return _swap_template(pool_version, str(router_address), function, coin_in, coin_out, pool_type)
+
+
+@lru_cache(maxsize=1024)
+def _swap_template(pool_version: str, router_address: str, function: str, coin_in: str, coin_out: str,
+                   pool_type: str) -> SwapTemplate:
+    return SwapTemplate(
+        AccountAddress.from_str(router_address), SWAP_MODULES[pool_version], function, coin_in, coin_out, pool_type
+    )
+
+
+# sha3-256 of the domain separator of Transaction hashes
+TRANSACTION_SALT = hashlib.sha3_256(b"APTOS::Transaction").digest()
+
+
+def transaction_hash(signed: SignedTransaction) -> str:
+    """
+    Hash the node will give a signed transaction, known before it is submitted
+    :param signed:
+    :return:
+    """
+    # 0 is the UserTransaction variant of Transaction
+    return "0x" + hashlib.sha3_256(TRANSACTION_SALT + b"\x00" + signed.bytes()).hexdigest()
+
+
+def _u64(value: int) -> bytes:
+    serializer = Serializer()
+    serializer.u64(value)
+    return serializer.output()
+
+
+class SequenceManager:
+    """
+    Next sequence number of one account, read from chain once and then counted locally
+    """
+
+    def __init__(self, client: CustomRestClient, address: AccountAddress):
+        self.client = client
+        self.address = address
+        self._next: int | None = None
+        # handed out below _next but never sent, given out again before _next
+        self._released: set[int] = set()
+        self._lock = asyncio.Lock()
+        self.resyncs = 0
+
+    async def next(self) -> int:
+        async with self._lock:
+            if self._released:
+                sequence_number = min(self._released)
+                self._released.discard(sequence_number)
+                return sequence_number
+            if self._next is None:
+                self._next = await self.client.account_sequence_number(self.address)
+            sequence_number = self._next
+            self._next += 1
+            return sequence_number
+
+    def release(self, sequence_number: int):
+        """
+        Takes back a sequence number whose transaction didn't reach the node, so it leaves no gap:
+        the count steps back when it was the last one handed out, otherwise the next call reuses it
+        :param sequence_number:
+        :return:
+        """
+        if self._next is None or sequence_number >= self._next:
+            return
+        self._released.add(sequence_number)
+        while self._next - 1 in self._released:
+            self._next -= 1
+            self._released.discard(self._next)
+
+    async def resync(self, floor: int = 0) -> int:
+        """
+        Drops the local count and reads the on-chain sequence number
+        :param floor: lowest next sequence number, one past those still pending in the mempool
+        :return:
+        """
+        async with self._lock:
+            self._next = max(await self.client.account_sequence_number(self.address), floor)
+            self._released.clear()
+            self.resyncs += 1
+            logger.debug('{} sequence number resynced to {}', self.address, self._next)
+            return self._next
+
+
+class TransactionResult(NamedTuple):
+    hash: str
+    sequence_number: int
+    success: bool
+    vm_status: str
+    version: int | None
+
+
+class SubmittedTransaction(NamedTuple):
+    hash: str
+    sequence_number: int
+    expiration: int
+    # resolves to a TransactionResult once committed, or fails when the transaction was dropped
+    result: asyncio.Future
+
+
+class TransactionPipeline:
+    def __init__(
+            self,
+            client: CustomRestClient,
+            account: Account,
+            max_in_flight: int = 32,
+            confirm_interval: float = 0.5,
+            max_gas_amount: int = None,
+            gas_unit_price: int = None,
+            expiration_ttl: int = None
+    ):
+        """
+        :param client:
+        :param account: signer of every transaction
+        :param max_in_flight: submitted but unconfirmed transactions allowed at once
+        :param confirm_interval: seconds between confirmation rounds
+        :param max_gas_amount: defaults to the client config
+        :param gas_unit_price: defaults to the client config
+        :param expiration_ttl: seconds a transaction stays valid, defaults to the client config
+        """
+        self.client = client
+        self.account = account
+        self.sequence = SequenceManager(client, account.address())
+        self.confirm_interval = confirm_interval
+        self.max_gas_amount = max_gas_amount or client.client_config.max_gas_amount
+        self.gas_unit_price = gas_unit_price or client.client_config.gas_unit_price
+        self.expiration_ttl = expiration_ttl or client.client_config.expiration_ttl
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._pending: dict[str, SubmittedTransaction] = {}
+        # sequence numbers handed out whose submit hasn't returned yet
+        self._submitting: set[int] = set()
+        self._confirmer: asyncio.Task | None = None
+
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def submit(self, payload: TransactionPayload) -> SubmittedTransaction:
+        """
+        Signs and submits with the next local sequence number, returning once the node accepted it.
+        Await `.result` of the returned value for the outcome.
+        :param payload:
+        :return:
+        """
+        await self._slots.acquire()
+        try:
+            submitted = await self._submit(payload)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._pending[submitted.hash] = submitted
+        if self._confirmer is None or self._confirmer.done():
+            self._confirmer = asyncio.create_task(self._confirm_loop())
+        return submitted
+
+    def _sequence_floor(self, excluding: int = None) -> int:
+        """
+        One past the highest sequence number still pending or being submitted
+        :param excluding: sequence number of a submit that failed
+        :return:
+        """
+        in_use = {submitted.sequence_number for submitted in self._pending.values()} | self._submitting
+        in_use.discard(excluding)
+        return max(in_use, default=-1) + 1
+
+    async def _submit(self, payload: TransactionPayload, resynced: bool = False) -> SubmittedTransaction:
+        sequence_number = await self.sequence.next()
+        self._submitting.add(sequence_number)
+        try:
+            expiration = int(time.time()) + self.expiration_ttl
+            raw_transaction = RawTransaction(
+                self.account.address(),
+                sequence_number,
+                payload,
+                self.max_gas_amount,
+                self.gas_unit_price,
+                expiration,
+                await self.client.chain_id(),
+            )
+            signed = SignedTransaction(raw_transaction, self.account.sign_transaction(raw_transaction))
+
+            try:
+                txn_hash = await self.client.submit_bcs_transaction(signed)
+            except ApiError as e:
+                if 'SEQUENCE_NUMBER' not in str(e):
+                    raise
+                # an attempt whose answer was lost may have landed, sending the payload again would swap twice
+                txn_hash = transaction_hash(signed)
+                if await self._transaction_status(txn_hash) is None:
+                    if resynced:
+                        raise
+                    # our count drifted, e.g. the wallet was used elsewhere
+                    await self.sequence.resync(self._sequence_floor(excluding=sequence_number))
+                    txn_hash = None
+                else:
+                    logger.debug('{} was accepted before its sequence error', txn_hash)
+        except BaseException:
+            # refused or lost on the way: the next submit takes the number instead of leaving a gap,
+            # should this one have landed after all, the reuse gets a sequence error and resyncs
+            self.sequence.release(sequence_number)
+            raise
+        finally:
+            self._submitting.discard(sequence_number)
+
+        if txn_hash is None:
+            return await self._submit(payload, resynced=True)
+
+        self.submitted += 1
+        logger.debug('submitted {} with sequence number {}', txn_hash, sequence_number)
+        return SubmittedTransaction(txn_hash, sequence_number, expiration, asyncio.get_running_loop().create_future())
+
+    async def _confirm_loop(self):
+        while self._pending:
+            await asyncio.sleep(self.confirm_interval)
+            await self.confirm_pending()
+
+    async def confirm_pending(self):
+        """
+        One confirmation round over every pending transaction
+        :return:
+        """
+        pending = sorted(self._pending.values(), key=lambda submitted: submitted.sequence_number)
+        answers = await asyncio.gather(
+            *[self._transaction_status(submitted.hash) for submitted in pending], return_exceptions=True
+        )
+
+        now = time.time()
+        gap = None
+        for submitted, answer in zip(pending, answers):
+            if isinstance(answer, Exception):
+                logger.debug('status of {} unavailable: {}', submitted.hash, answer)
+                continue
+
+            if answer is None or answer.get('type') == 'pending_transaction':
+                if answer is None and now > submitted.expiration:
+                    gap = submitted.sequence_number if gap is None else min(gap, submitted.sequence_number)
+                continue
+
+            success = bool(answer.get('success'))
+            self.committed += success
+            self.failed += not success
+            self._finish(submitted, result=TransactionResult(
+                hash=submitted.hash,
+                sequence_number=submitted.sequence_number,
+                success=success,
+                vm_status=answer.get('vm_status', ''),
+                version=int(answer['version']) if 'version' in answer else None
+            ))
+
+        if gap is not None:
+            await self._drop_from(gap)
+
+    async def _transaction_status(self, txn_hash: str) -> dict | None:
+        """
+        Transaction as the node knows it, None while it is unknown (404)
+        :param txn_hash:
+        :return:
+        """
+        try:
+            return await self.client.transaction_by_hash(txn_hash)
+        except ApiError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def _drop_from(self, sequence_number: int):
+        """
+        Fails every pending transaction from sequence_number on, they can't land past the gap, and resyncs
+        :param sequence_number:
+        :return:
+        """
+        stuck = [submitted for submitted in self._pending.values() if submitted.sequence_number >= sequence_number]
+        logger.warning('sequence number {} expired, dropping {} transactions', sequence_number, len(stuck))
+        for submitted in stuck:
+            self.dropped += 1
+            self._finish(submitted, error=TimeoutError(f"{submitted.hash} expired behind sequence gap {sequence_number}"))
+        await self.sequence.resync(self._sequence_floor())
+
+    def _finish(self, submitted: SubmittedTransaction, result: TransactionResult = None, error: Exception = None):
+        if self._pending.pop(submitted.hash, None) is None:
+            return
+        self._slots.release()
+        if submitted.result.done():
+            return
+        if error is not None:
+            submitted.result.set_exception(error)
+            # mark retrieved so callers that don't await results aren't reported by the loop
+            submitted.result.exception()
+        else:
+            submitted.result.set_result(result)
+
+    async def drain(self) -> list[TransactionResult | BaseException]:
+        """
+        Waits for every pending transaction
+        :return:
+        """
+        return await asyncio.gather(
+            *[submitted.result for submitted in list(self._pending.values())], return_exceptions=True
+        )
+
+    async def close(self):
+        if self._confirmer is not None:
+            self._confirmer.cancel()
+            try:
+                await self._confirmer
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._pending),
+            'submitted': self.submitted,
+            'committed': self.committed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'resyncs': self.sequence.resyncs,
+        }
+
+
+_pipelines: dict[str, TransactionPipeline] = {}
+
+
+def get_pipeline(client: CustomRestClient, account: Account) -> TransactionPipeline:
+    """
+    Process-wide pipeline of an account, so every module swapping from one wallet shares its sequence numbers
+    :param client: only used by the call that creates the pipeline
+    :param account:
+    :return:
+    """
+    key = str(account.address())
+    if key not in _pipelines:
+        _pipelines[key] = TransactionPipeline(client, account)
+    return _pipelines[key]
@@ -0,0 +1,366 @@
+"""
+Columnar history of pool reserves and offline replay of pool selection.
+
+A history is a directory with one raw little-endian file per column and a
+JSON sidecar:
+
+    ledger_version.bin  int64
+    recorded_at.bin     float64, unix time of the read
+    pool_id.bin         uint32, position in the sidecar's pools
+    reserve_x.bin       uint64, reserves in the pool's own coin order
+    reserve_y.bin       uint64
+    fee.bin             uint32
+    meta.json           {"columns": {name: dtype}, "pools": [[pool_version, pool_type, coin_x, coin_y], ...]}
+
+HistoryRecorder appends every pool state read, skipping reads identical to
+the previous row of the same pool. Rows are buffered and written
+``flush_rows`` at a time. The row count is the length of the shortest
+column, so a write cut short loses at most its own rows.
+
+ReserveHistory memory-maps the columns. Its replay runs the selection of
+LiquidSwapCurve.get_most_profitable_amount_in_and_set_pool_type at every
+recorded ledger version: each pool is priced as of its latest row and the
+pool giving the most coin_y is selected. Quotes go through utils.batch, a
+whole chunk of ledger versions times swap sizes per call.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from liquidswap.config import POOLS_INFO
+from liquidswap.pools import PoolIndex, PoolState, normalize_type
+from utils.batch import INT64_MAX, get_amounts_out
+
+COLUMNS = {
+    'ledger_version': '<i8',
+    'recorded_at': '<f8',
+    'pool_id': '<u4',
+    'reserve_x': '<u8',
+    'reserve_y': '<u8',
+    'fee': '<u4',
+}
+META_FILE = 'meta.json'
+
+
+class HistoryPool(NamedTuple):
+    pool_version: str | None
+    pool_type: str
+    coin_x: str  # in the pool's order, canonical form
+    coin_y: str
+
+
+class ReplayChunk(NamedTuple):
+    pools: tuple[tuple[str, str], ...]  # (pool_version, pool_type) of the pool axis
+    ledger_versions: np.ndarray  # (n,)
+    # (n, pools, sizes) coin_y received per pool and swap size,
+    # -1 where the pool has no state yet or the swap would abort, see utils.batch.ABORTED
+    amounts_in: np.ndarray
+    best: np.ndarray  # (n, sizes) pool selected, -1 when none has a state
+
+
+def _read_meta(path: Path) -> dict:
+    with open(path / META_FILE) as file:
+        return json.load(file)
+
+
+def _row_count(path: Path, columns: dict) -> int:
+    """
+    Rows present in every column file
+    :param path:
+    :param columns: name -> dtype
+    :return:
+    """
+    sizes = []
+    for name, dtype in columns.items():
+        file = path / f"{name}.bin"
+        sizes.append(file.stat().st_size // np.dtype(dtype).itemsize if file.exists() else 0)
+    return min(sizes)
+
+
+class HistoryRecorder:
+    def __init__(self, path: str | Path, flush_rows: int = 4096):
+        """
+        Opens the history at path for appending, creates it when missing
+        :param path: history directory
+        :param flush_rows: rows buffered before they are written
+        """
+        self.path = Path(path)
+        self.flush_rows = flush_rows
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.pools: list[HistoryPool] = []
+        if (self.path / META_FILE).exists():
+            meta = _read_meta(self.path)
+            if meta['columns'] != COLUMNS:
+                raise ValueError(f"{self.path} has columns {meta['columns']}, expected {COLUMNS}")
+            self.pools = [HistoryPool(*pool) for pool in meta['pools']]
+
+        # drop rows a previous writer didn't finish, every column must stay aligned
+        self.rows = _row_count(self.path, COLUMNS)
+        for name, dtype in COLUMNS.items():
+            with open(self.path / f"{name}.bin", 'ab') as file:
+                file.truncate(self.rows * np.dtype(dtype).itemsize)
+
+        self.pool_ids = {pool: pool_id for pool_id, pool in enumerate(self.pools)}
+        self.buffer: dict[str, list] = {name: [] for name in COLUMNS}
+        # pool_id -> (ledger_version, reserve_x, reserve_y, fee) of its latest row, on disk or buffered
+        self.last: dict[int, tuple[int, int, int, int]] = self._last_rows()
+        self.meta_dirty = False
+        self.skipped = 0
+
+    def __len__(self):
+        return self.rows + len(self.buffer['pool_id'])
+
+    def _last_rows(self) -> dict[int, tuple[int, int, int, int]]:
+        """
+        Latest row of every pool already on disk, so a reopened recorder doesn't repeat them
+        :return:
+        """
+        if not self.rows:
+            return {}
+
+        columns = {
+            name: np.memmap(self.path / f"{name}.bin", dtype=COLUMNS[name], mode='r', shape=(self.rows,))
+            for name in ('pool_id', 'ledger_version', 'reserve_x', 'reserve_y', 'fee')
+        }
+        # first occurrence in the reversed column is the last row of the pool
+        pool_ids, reversed_rows = np.unique(columns['pool_id'][::-1], return_index=True)
+        rows = self.rows - 1 - reversed_rows
+        return {
+            int(pool_id): (
+                int(columns['ledger_version'][row]),
+                int(columns['reserve_x'][row]),
+                int(columns['reserve_y'][row]),
+                int(columns['fee'][row]),
+            )
+            for pool_id, row in zip(pool_ids, rows)
+        }
+
+    def _pool_id(self, pool: HistoryPool) -> int:
+        pool_id = self.pool_ids.get(pool)
+        if pool_id is None:
+            pool_id = self.pool_ids[pool] = len(self.pools)
+            self.pools.append(pool)
+            self.meta_dirty = True
+        return pool_id
+
+    def record(self, state: PoolState, coin_in: str, coin_out: str, recorded_at: float = None) -> bool:
+        """
+        Appends one pool state
+        :param state: as returned by LiquidSwapCurve.get_token_pair_reserve
+        :param coin_in: coin the state is oriented from
+        :param coin_out:
+        :param recorded_at: defaults to now
+        :return: whether a row was added, reads without a ledger version or repeating the last row aren't
+        """
+        if state.ledger_version is None:
+            self.skipped += 1
+            return False
+
+        if state.flipped:
+            coin_x, coin_y, reserve_x, reserve_y = coin_out, coin_in, state.reserve_out, state.reserve_in
+        else:
+            coin_x, coin_y, reserve_x, reserve_y = coin_in, coin_out, state.reserve_in, state.reserve_out
+
+        pool_id = self._pool_id(HistoryPool(
+            state.pool_version, state.pool_type, normalize_type(coin_x), normalize_type(coin_y)
+        ))
+        row = (state.ledger_version, reserve_x, reserve_y, state.fee)
+        if self.last.get(pool_id) == row:
+            self.skipped += 1
+            return False
+        self.last[pool_id] = row
+
+        buffer = self.buffer
+        buffer['ledger_version'].append(state.ledger_version)
+        buffer['recorded_at'].append(time.time() if recorded_at is None else recorded_at)
+        buffer['pool_id'].append(pool_id)
+        buffer['reserve_x'].append(reserve_x)
+        buffer['reserve_y'].append(reserve_y)
+        buffer['fee'].append(state.fee)
+
+        if len(buffer['pool_id']) >= self.flush_rows:
+            self.flush()
+        return True
+
+    def record_index(self, index: PoolIndex, recorded_at: float = None) -> int:
+        """
+        Appends every pool of a preloaded index
+        :param index:
+        :param recorded_at: defaults to now
+        :return: rows added
+        """
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        return sum(
+            self.record(state, coin_x, coin_y, recorded_at) for (_, coin_x, coin_y, _), state in index.pools.items()
+        )
+
+    def flush(self):
+        rows = len(self.buffer['pool_id'])
+        if self.meta_dirty:
+            # pools first: rows written next may refer to the new ones
+            meta = {'columns': COLUMNS, 'pools': [list(pool) for pool in self.pools]}
+            temporary = self.path / f"{META_FILE}.tmp"
+            temporary.write_text(json.dumps(meta))
+            os.replace(temporary, self.path / META_FILE)
+            self.meta_dirty = False
+
+        if not rows:
+            return
+
+        for name, dtype in COLUMNS.items():
+            with open(self.path / f"{name}.bin", 'ab') as file:
+                np.asarray(self.buffer[name], dtype=dtype).tofile(file)
+            self.buffer[name].clear()
+
+        self.rows += rows
+        logger.debug('history: {} rows written to {}, {} in total', rows, self.path, self.rows)
+
+    def close(self):
+        self.flush()
+
+    def stats(self) -> dict:
+        return {'rows': len(self), 'pools': len(self.pools), 'skipped': self.skipped}
+
+
+class ReserveHistory:
+    def __init__(self, path: str | Path):
+        """
+        Read-only view of a history written by HistoryRecorder, columns are memory-mapped
+        :param path: history directory
+        """
+        self.path = Path(path)
+        meta = _read_meta(self.path)
+        self.pools = [HistoryPool(*pool) for pool in meta['pools']]
+
+        self.rows = _row_count(self.path, meta['columns'])
+        self.columns: dict[str, np.ndarray] = {}
+        for name, dtype in meta['columns'].items():
+            if self.rows:
+                self.columns[name] = np.memmap(self.path / f"{name}.bin", dtype=dtype, mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def pair_pools(self, coin_x: str, coin_y: str) -> dict[tuple[str, str], tuple[int, bool]]:
+        """
+        Recorded pools of a pair
+        :param coin_x:
+        :param coin_y:
+        :return: (pool_version, pool_type) -> (pool_id, whether coin_x is the pool's coin_y)
+        """
+        coin_x, coin_y = normalize_type(coin_x), normalize_type(coin_y)
+        pools = {}
+        for pool_id, pool in enumerate(self.pools):
+            if (pool.coin_x, pool.coin_y) == (coin_x, coin_y):
+                pools[(pool.pool_version, pool.pool_type)] = (pool_id, False)
+            elif (pool.coin_x, pool.coin_y) == (coin_y, coin_x):
+                pools[(pool.pool_version, pool.pool_type)] = (pool_id, True)
+        return pools
+
+    def pool_rows(self, pool_id: int) -> dict[str, np.ndarray]:
+        """
+        Every row of one pool, ordered by ledger version
+        :param pool_id:
+        :return: column name -> values
+        """
+        rows = np.flatnonzero(self.columns['pool_id'] == pool_id)
+        rows = rows[np.argsort(self.columns['ledger_version'][rows], kind='stable')]
+        return {name: np.asarray(column[rows]) for name, column in self.columns.items()}
+
+    def replay(
+            self,
+            coin_x: str,
+            coin_y: str,
+            amounts_out: list[int],
+            scale_x: int,
+            scale_y: int,
+            pools: list[tuple[str, str]] = None,
+            start: int = None,
+            end: int = None,
+            chunk_size: int = 65536
+    ) -> Iterator[ReplayChunk]:
+        """
+        Pool selection for swapping each of amounts_out of coin_x, at every ledger version a pool of the pair changed
+        :param coin_x: coin sent
+        :param coin_y: coin received
+        :param amounts_out: swap sizes, raw units of coin_x
+        :param scale_x: 10 ** decimals of coin_x
+        :param scale_y: 10 ** decimals of coin_y
+        :param pools: (pool_version, pool_type) to choose from, in order of preference on ties,
+            every recorded pool of the pair by default, in POOLS_INFO order like LiquidSwapCurve
+        :param start: first ledger version replayed, pools are still priced from earlier rows
+        :param end: last ledger version replayed
+        :param chunk_size: ledger versions quoted per batch call
+        :return:
+        """
+        recorded = self.pair_pools(coin_x, coin_y)
+        if pools is None:
+            known = [(pool_version, pool_type) for pool_version, info in POOLS_INFO.items() for pool_type in info['types']]
+            pools = [key for key in known if key in recorded] + [key for key in recorded if key not in known]
+        keys = tuple(key for key in pools if key in recorded)
+        amounts = np.asarray(amounts_out, dtype=np.int64)
+
+        timelines = []
+        for key in keys:
+            pool_id, flipped = recorded[key]
+            rows = self.pool_rows(pool_id)
+            reserve_in, reserve_out = (rows['reserve_y'], rows['reserve_x']) if flipped else \
+                (rows['reserve_x'], rows['reserve_y'])
+            timelines.append((key[1], rows['ledger_version'], reserve_in, reserve_out, rows['fee']))
+
+        if not timelines:
+            return
+
+        events = np.unique(np.concatenate([timeline[1] for timeline in timelines]))
+        if start is not None:
+            events = events[events >= start]
+        if end is not None:
+            events = events[events <= end]
+
+        for offset in range(0, len(events), chunk_size):
+            ledger_versions = events[offset:offset + chunk_size]
+            amounts_in = np.full((len(ledger_versions), len(keys), len(amounts)), -1, dtype=np.int64)
+
+            for position, (pool_type, versions, reserve_in, reserve_out, fee) in enumerate(timelines):
+                # latest row of the pool at or before every ledger version
+                latest = np.searchsorted(versions, ledger_versions, side='right') - 1
+                lanes = np.flatnonzero(latest >= 0)
+                lanes = lanes[(reserve_in[latest[lanes]] > 0) & (reserve_out[latest[lanes]] > 0)]
+                if not lanes.size:
+                    continue
+
+                # a pool keeps its state over the ledger versions other pools changed at, quote each row once
+                rows, lane_rows = np.unique(latest[lanes], return_inverse=True)
+                quotes = get_amounts_out(
+                    pool_type,
+                    amounts[None, :],
+                    _as_int(reserve_in[rows])[:, None],
+                    _as_int(reserve_out[rows])[:, None],
+                    scale_x,
+                    scale_y,
+                    fee[rows].astype(np.int64)[:, None]
+                )
+                amounts_in[lanes, position] = quotes[lane_rows]
+
+            best = np.argmax(amounts_in, axis=1)
+            best[amounts_in.max(axis=1) < 0] = -1
+            yield ReplayChunk(keys, ledger_versions, amounts_in, best)
+
+
+def _as_int(values: np.ndarray) -> np.ndarray:
+    """
+    uint64 reserves as int64 for utils.batch, as python ints if any doesn't fit
+    :param values:
+    :return:
+    """
+    if values.size and int(values.max()) > INT64_MAX:
+        return values.astype(object)
+    return values.astype(np.int64)
@@ -0,0 +1,241 @@
+import asyncio
+import re
+from typing import NamedTuple
+
+from aptos_sdk.account_address import AccountAddress
+from loguru import logger
+
+from aptos_rest_client import CustomRestClient
+from liquidswap.config import POOLS_INFO
+
+ADDRESS_RE = re.compile(r'0x0*([0-9a-fA-F]+)')
+
+
+def normalize_type(type_tag: str) -> str:
+    """
+    Canonical form of a Move type string: no spaces, lowercase addresses without leading zeros
+    :param type_tag:
+    :return:
+    """
+    return ADDRESS_RE.sub(lambda match: '0x' + match.group(1).lower(), type_tag.replace(' ', ''))
+
+
+def expand_type(type_tag: str) -> str:
+    """
+    Inverse of normalize_type for addresses: pads them back to 64 hex chars, special addresses such as 0x1 stay short
+    :param type_tag:
+    :return:
+    """
+    return ADDRESS_RE.sub(lambda match: str(AccountAddress.from_str_relaxed(match.group(0))), type_tag)
+
+
+def split_type_args(type_tag: str) -> tuple[str, list[str]]:
+    """
+    Splits 'a::b::C<X, Y<Z>>' into ('a::b::C', ['X', 'Y<Z>'])
+    :param type_tag:
+    :return:
+    """
+    start = type_tag.find('<')
+    if start == -1:
+        return type_tag, []
+
+    args = []
+    depth = 0
+    arg_start = start + 1
+    for position in range(start + 1, len(type_tag) - 1):
+        char = type_tag[position]
+        if char == '<':
+            depth += 1
+        elif char == '>':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(type_tag[arg_start:position].strip())
+            arg_start = position + 1
+    args.append(type_tag[arg_start:-1].strip())
+
+    return type_tag[:start], args
+
+
+class PoolState(NamedTuple):
+    """
+    Reserves and fee of one pool as read at one ledger version, oriented coin_in -> coin_out.
+    Values, never updated in place: every quote prices with the read it made.
+    """
+    pool_version: str | None
+    pool_type: str
+    reserve_in: int
+    reserve_out: int
+    fee: int
+    ledger_version: int | None = None
+    flipped: bool = False  # coin_in is the pool's coin_y
+    scale_in: int | None = None  # 10 ** decimals, only needed by stable pools
+    scale_out: int | None = None
+
+    @classmethod
+    def from_resource(
+            cls,
+            resource: dict,
+            pool_type: str,
+            pool_version: str | None = None,
+            ledger_version: int | None = None
+    ) -> 'PoolState':
+        """
+        State of a LiquidityPool resource, oriented coin_x -> coin_y
+        :param resource: as returned by /accounts/{address}/resource
+        :param pool_type: 'Stable' or 'Uncorrelated'
+        :param pool_version:
+        :param ledger_version:
+        :return:
+        """
+        data = resource['data']
+        return cls(
+            pool_version,
+            pool_type,
+            int(data['coin_x_reserve']['value']),
+            int(data['coin_y_reserve']['value']),
+            int(data['fee']),
+            ledger_version
+        )
+
+    def flip(self) -> 'PoolState':
+        """
+        Same pool oriented the other way
+        :return:
+        """
+        return self._replace(
+            reserve_in=self.reserve_out,
+            reserve_out=self.reserve_in,
+            flipped=not self.flipped,
+            scale_in=self.scale_out,
+            scale_out=self.scale_in
+        )
+
+    def with_scales(self, scale_in: int, scale_out: int) -> 'PoolState':
+        return self._replace(scale_in=scale_in, scale_out=scale_out)
+
+
+def pool_version_of(resource_address: AccountAddress | str, pools_info: dict = None) -> str | None:
+    """
+    Liquidswap version whose pools are held by resource_address
+    :param resource_address:
+    :param pools_info: defaults to liquidswap.config.POOLS_INFO
+    :return:
+    """
+    pools_info = POOLS_INFO if pools_info is None else pools_info
+    account = normalize_type(str(resource_address))
+    for pool_version, pool_info in pools_info.items():
+        if normalize_type(str(pool_info['resource_address'])) == account:
+            return pool_version
+    return None
+
+
+class PoolIndex:
+    """
+    In-memory index of every Liquidswap pool held by the resource accounts,
+    keyed by (resource_address, coin_x, coin_y, curve) in canonical form
+    """
+
+    def __init__(self):
+        # states oriented coin_x -> coin_y of the stored pool
+        self.pools: dict[tuple[str, str, str, str], PoolState] = {}
+        self.ledger_versions: dict[str, int | None] = {}
+
+    def __len__(self):
+        return len(self.pools)
+
+    def add_resources(
+            self,
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            resources: list[dict],
+            ledger_version: int | None = None,
+            pool_version: str | None = None
+    ) -> int:
+        """
+        Indexes every LiquidityPool resource of one resource account
+        :param resource_address:
+        :param router_address:
+        :param resources: as returned by /accounts/{address}/resources
+        :param ledger_version:
+        :param pool_version: defaults to the POOLS_INFO version of resource_address
+        :return: number of pools added
+        """
+        account = normalize_type(str(resource_address))
+        pool_struct = normalize_type(f"{router_address}::liquidity_pool::LiquidityPool")
+        if pool_version is None:
+            pool_version = pool_version_of(resource_address)
+
+        added = 0
+        for resource in resources:
+            struct, args = split_type_args(normalize_type(resource["type"]))
+            if struct != pool_struct or len(args) != 3:
+                continue
+
+            coin_x, coin_y, curve = args
+            pool_type = curve.rsplit('::', 1)[-1]
+            self.pools[(account, coin_x, coin_y, pool_type)] = PoolState.from_resource(
+                resource, pool_type, pool_version, ledger_version
+            )
+            added += 1
+
+        self.ledger_versions[account] = ledger_version
+        return added
+
+    def is_loaded(self, resource_address: AccountAddress) -> bool:
+        """
+        Whether the resources of this account were indexed
+        :param resource_address:
+        :return:
+        """
+        return normalize_type(str(resource_address)) in self.ledger_versions
+
+    def get(
+            self,
+            resource_address: AccountAddress,
+            coin_x: str,
+            coin_y: str,
+            pool_type: str
+    ) -> PoolState | None:
+        """
+        State of the pool stored as LiquidityPool<coin_x, coin_y, pool_type>, if any
+        :param resource_address:
+        :param coin_x:
+        :param coin_y:
+        :param pool_type: 'Stable' or 'Uncorrelated'
+        :return:
+        """
+        return self.pools.get(
+            (normalize_type(str(resource_address)), normalize_type(coin_x), normalize_type(coin_y), pool_type)
+        )
+
+
+async def load_pool_index(client: CustomRestClient, pools_info: dict = None) -> PoolIndex:
+    """
+    Builds a PoolIndex with one paginated /resources read per resource account
+    :param client:
+    :param pools_info: defaults to liquidswap.config.POOLS_INFO
+    :return:
+    """
+    pools_info = POOLS_INFO if pools_info is None else pools_info
+    index = PoolIndex()
+
+    results = await asyncio.gather(
+        *[client.account_resources_all(pool_info['resource_address']) for pool_info in pools_info.values()],
+        return_exceptions=True
+    )
+    for (pool_version, pool_info), result in zip(pools_info.items(), results):
+        if isinstance(result, Exception):
+            logger.error("Error loading {} pools: {}", pool_version, result)
+            continue
+
+        resources, ledger_version = result
+        added = index.add_resources(
+            resource_address=pool_info['resource_address'],
+            router_address=pool_info['router_address'],
+            resources=resources,
+            ledger_version=ledger_version,
+            pool_version=pool_version
+        )
+        logger.debug('{} pools loaded: {} at ledger version {}', pool_version, added, ledger_version)
+
+    return index
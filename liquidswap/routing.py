@@ -0,0 +1,232 @@
+"""
+Multi-hop routing over every indexed Liquidswap pool.
+
+A RouteGraph is a snapshot of a PoolIndex: each pool becomes two directed
+edges, one per swap direction, and routes of up to three hops are searched
+depth first with the integer curve math. The search prunes:
+
+* hops that would take more than ``max_reserve_share`` of a pool's input
+  reserve, the pool is too thin to route that size through it;
+* coins with no pool into the target when two hops are left;
+* coins already on the path.
+
+Only the last hop keeps just the best of parallel pools; earlier ones try
+each of them, since the larger amount of the best one can be cut off by a
+thin pool further on.
+
+Per-hop quotes are memoised by (edge, amount) for the life of the graph, so
+routes sharing a prefix, and repeated searches on the same snapshot, reuse
+them. Build a new graph when the index is reloaded.
+"""
+from typing import NamedTuple
+
+from liquidswap.config import POOLS_INFO
+from liquidswap.pools import PoolIndex, normalize_type
+from utils.int_math import get_amount_out
+
+APTOS_COIN = '0x1::aptos_coin::AptosCoin'
+
+
+class PoolEdge(NamedTuple):
+    pool_version: str
+    pool_type: str
+    coin_in: str
+    coin_out: str
+    reserve_in: int
+    reserve_out: int
+    scale_in: int | None  # 10 ** decimals, only needed by stable pools
+    scale_out: int | None
+    fee: int
+
+
+class Route(NamedTuple):
+    path: tuple[str, ...]  # coin types from the one sent to the one received
+    edges: tuple[PoolEdge, ...]
+    amounts: tuple[int, ...]  # amount held before the first and after every hop
+
+    @property
+    def amount_out(self) -> int:
+        """
+        Amount sent into the first pool
+        """
+        return self.amounts[0]
+
+    @property
+    def amount_in(self) -> int:
+        """
+        Amount received from the last pool
+        """
+        return self.amounts[-1]
+
+
+class RouteGraph:
+    def __init__(self, edges: list[PoolEdge], max_reserve_share: float = 0.3):
+        """
+        :param edges: directed pool edges, see from_index
+        :param max_reserve_share: largest share of a pool's input reserve a hop may swap
+        """
+        self.max_reserve_share = max_reserve_share
+        # coin_in -> coin_out -> parallel pools
+        self.adjacency: dict[str, dict[str, list[PoolEdge]]] = {}
+        for edge in edges:
+            self.adjacency.setdefault(edge.coin_in, {}).setdefault(edge.coin_out, []).append(edge)
+
+        self._quotes: dict[tuple[PoolEdge, int], int] = {}
+        self.quotes_computed = 0
+        self.quotes_reused = 0
+
+    @classmethod
+    def from_index(
+            cls,
+            pool_index: PoolIndex,
+            decimals: dict[str, int],
+            pools_info: dict = None,
+            max_reserve_share: float = 0.3
+    ) -> 'RouteGraph':
+        """
+        Graph of every non-empty pool of the index.
+        Stable pools of coins without known decimals are left out, their curve needs the scales.
+        :param pool_index:
+        :param decimals: coin type -> decimals
+        :param pools_info: defaults to liquidswap.config.POOLS_INFO
+        :param max_reserve_share:
+        :return:
+        """
+        pools_info = POOLS_INFO if pools_info is None else pools_info
+        versions = {normalize_type(str(info['resource_address'])): version for version, info in pools_info.items()}
+        decimals = {normalize_type(coin): value for coin, value in decimals.items()}
+        decimals.setdefault(APTOS_COIN, 8)
+
+        edges = []
+        for (account, coin_x, coin_y, pool_type), state in pool_index.pools.items():
+            pool_version = versions.get(account)
+            if pool_version is None:
+                continue
+
+            reserve_x, reserve_y = state.reserve_in, state.reserve_out
+            if not reserve_x or not reserve_y:
+                continue
+
+            scale_x = 10 ** decimals[coin_x] if coin_x in decimals else None
+            scale_y = 10 ** decimals[coin_y] if coin_y in decimals else None
+            if pool_type == 'Stable' and (scale_x is None or scale_y is None):
+                continue
+
+            fee = state.fee
+            edges.append(PoolEdge(pool_version, pool_type, coin_x, coin_y, reserve_x, reserve_y, scale_x, scale_y, fee))
+            edges.append(PoolEdge(pool_version, pool_type, coin_y, coin_x, reserve_y, reserve_x, scale_y, scale_x, fee))
+
+        return cls(edges, max_reserve_share=max_reserve_share)
+
+    def coins(self) -> set[str]:
+        return set(self.adjacency) | {coin for neighbours in self.adjacency.values() for coin in neighbours}
+
+    def quote(self, edge: PoolEdge, amount: int) -> int | None:
+        """
+        Output of one hop, memoised; None when the pool is too thin for the amount
+        :param edge:
+        :param amount:
+        :return:
+        """
+        if amount > edge.reserve_in * self.max_reserve_share:
+            return None
+
+        key = (edge, amount)
+        output = self._quotes.get(key)
+        if output is not None:
+            self.quotes_reused += 1
+            return output
+
+        try:
+            output = get_amount_out(
+                edge.pool_type, amount, edge.reserve_in, edge.reserve_out, edge.scale_in, edge.scale_out, edge.fee
+            )
+        except (OverflowError, ZeroDivisionError):
+            output = 0
+
+        self.quotes_computed += 1
+        self._quotes[key] = output
+        return output
+
+    def best_hop(self, coin_in: str, coin_out: str, amount: int) -> tuple[PoolEdge, int] | None:
+        """
+        Best of the parallel pools from coin_in to coin_out for this amount
+        :param coin_in:
+        :param coin_out:
+        :param amount:
+        :return: the pool and its output
+        """
+        best = None
+        for edge in self.adjacency.get(coin_in, {}).get(coin_out, ()):
+            output = self.quote(edge, amount)
+            if output and (best is None or output > best[1]):
+                best = (edge, output)
+        return best
+
+    def find_routes(self, coin_from: str, coin_to: str, amount: int, max_hops: int = 3) -> list[Route]:
+        """
+        Every surviving route of 1 to max_hops hops, best first
+        :param coin_from: coin type sent
+        :param coin_to: coin type received
+        :param amount: amount of coin_from sent
+        :param max_hops:
+        :return:
+        """
+        coin_from, coin_to = normalize_type(coin_from), normalize_type(coin_to)
+        # coins one hop away from coin_to, the only ones worth entering with two hops left
+        into_target = {coin for coin, neighbours in self.adjacency.items() if coin_to in neighbours}
+        routes = []
+
+        def extend(path: list[str], edges: list[PoolEdge], amounts: list[int]):
+            coin = path[-1]
+            hops_left = max_hops - len(edges)
+
+            if hops_left == 1:
+                # last hop, only pools into coin_to matter
+                neighbours = (coin_to,) if coin_to in self.adjacency.get(coin, {}) else ()
+            else:
+                neighbours = self.adjacency.get(coin, {})
+
+            for neighbour in neighbours:
+                if neighbour in path:
+                    continue
+                if hops_left == 2 and neighbour != coin_to and neighbour not in into_target:
+                    continue
+                if neighbour == coin_to:
+                    hop = self.best_hop(coin, neighbour, amounts[-1])
+                    if hop is not None:
+                        edge, output = hop
+                        routes.append(Route(tuple(path + [neighbour]), tuple(edges + [edge]), tuple(amounts + [output])))
+                    continue
+
+                # a bigger amount can be cut off by a thin pool further on, so every parallel pool is tried
+                for edge in self.adjacency[coin][neighbour]:
+                    output = self.quote(edge, amounts[-1])
+                    if output:
+                        extend(path + [neighbour], edges + [edge], amounts + [output])
+
+        if amount > 0 and coin_from != coin_to:
+            extend([coin_from], [], [amount])
+
+        routes.sort(key=lambda route: (-route.amount_in, len(route.edges)))
+        return routes
+
+    def find_best_route(self, coin_from: str, coin_to: str, amount: int, max_hops: int = 3) -> Route | None:
+        """
+        Route giving the most coin_to for amount of coin_from
+        :param coin_from:
+        :param coin_to:
+        :param amount:
+        :param max_hops:
+        :return:
+        """
+        routes = self.find_routes(coin_from, coin_to, amount, max_hops)
+        return routes[0] if routes else None
+
+    def stats(self) -> dict:
+        return {
+            'coins': len(self.coins()),
+            'edges': sum(len(edges) for neighbours in self.adjacency.values() for edges in neighbours.values()),
+            'quotes_computed': self.quotes_computed,
+            'quotes_reused': self.quotes_reused,
+        }
@@ -1,25 +1,63 @@
 import asyncio
-from typing import Literal
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Literal, NamedTuple
 
-from aptos_sdk.account import Account
 from aptos_sdk.account_address import AccountAddress
 from loguru import logger
 
 from base import ModuleBase
-from contracts.base import TokenBase
+from contracts.base import TokenBase, is_sorted
 from liquidswap.config import POOLS_INFO
-from utils.math import get_coins_out_with_fees_stable, d, get_coins_out_with_fees
+from liquidswap.pools import PoolIndex, PoolState, expand_type, load_pool_index, pool_version_of
+from liquidswap.routing import APTOS_COIN, Route, RouteGraph
+from utils.int_math import get_coins_out_with_fees_stable, get_coins_out_with_fees
+from utils.metrics import METRICS
+from utils.solver import StableCurveSolver
+from utils import inverse
+from utils.inverse import InverseQuote
+
+# liquidswap.history, utils.executor, utils.split and utils.lut are imported where they are used:
+# history and executor pull numpy in, a plain quote needs none of them
+if TYPE_CHECKING:
+    from aptos_sdk.account import Account
+
+    from liquidswap.history import HistoryRecorder
+    from utils.executor import QuoteExecutor
+    from utils.split import SplitQuote
+
+QUOTE_LATENCY = METRICS.histogram(
+    'quote_latency_seconds', 'Reserve read plus quote of one pool', ('pool_version', 'pool_type')
+)
+
+
+class QuoteUpdate(NamedTuple):
+    ledger_version: int
+    # amount_out -> ((pool_version, pool_type), amount_in), only entries whose best pool or amount changed
+    changes: dict[int, tuple[tuple[str, str], int] | None]
 
 
 class LiquidSwapCurve(ModuleBase):
     def __init__(
             self,
-            account: Account,
-            base_url: str,
+            account: 'Account | None',
+            base_url: str | list[str],
             coin_x: TokenBase,
             coin_y: TokenBase,
-            proxies: dict = None
+            proxies: dict = None,
+            pool_index: PoolIndex = None,
+            quote_executor: 'QuoteExecutor' = None,
+            history_recorder: 'HistoryRecorder' = None
     ):
+        """
+        :param account: None for quoting only
+        :param base_url:
+        :param coin_x:
+        :param coin_y:
+        :param proxies:
+        :param pool_index: serve pool reads from this snapshot instead of the node
+        :param quote_executor: price quotes in its workers instead of on the event loop
+        :param history_recorder: append every pool state read to this history
+        """
         super().__init__(
             coin_x=coin_x,
             coin_y=coin_y,
@@ -29,109 +67,488 @@ class LiquidSwapCurve(ModuleBase):
         )
 
         self.account = account
+        self.pool_index = pool_index
+        self.quote_executor = quote_executor
+        self.history_recorder = history_recorder
 
         self.router_address = None
-        self.resource_data = None
         self.pool_type = None
+        self.pool_version = None
+        self.solvers: dict[tuple[str, str], StableCurveSolver] = {}
+        self.route_graph: RouteGraph | None = None
+
+    def get_solver(self, resource_address: AccountAddress, coin_in_address: str) -> StableCurveSolver:
+        """
+        get_y solver of a stable pool, one per swap direction, recording its iterations.
+        It solves cold: live quotes must match the contract, utils.batch and history replays
+        whatever was quoted before. The split search warm-starts solvers of its own, see utils.split.
+        :param resource_address:
+        :param coin_in_address:
+        :return:
+        """
+        key = (str(resource_address), coin_in_address)
+        if key not in self.solvers:
+            self.solvers[key] = StableCurveSolver(warm_start=False)
+        return self.solvers[key]
+
+    def solver_stats(self) -> dict:
+        """
+        get_y iteration telemetry of every stable pool quoted so far
+        :return:
+        """
+        return {key: solver.stats() for key, solver in self.solvers.items()}
+
+    def get_indexed_token_pair_reserve(
+            self,
+            pool_type: str,
+            resource_address: AccountAddress
+    ) -> PoolState | None:
+        """
+        get_token_pair_reserve served from the preloaded pool index, no RPC
+        :param pool_type:
+        :param resource_address:
+        :return:
+        """
+        coin_x = self.coin_x.contract_address
+        coin_y = self.coin_y.contract_address
+
+        state = self.pool_index.get(resource_address, coin_x, coin_y, pool_type)
+        if state is not None:
+            return state
+
+        state = self.pool_index.get(resource_address, coin_y, coin_x, pool_type)
+        if state is not None:
+            return state.flip()
+
+        logger.debug('no {} pool for {}/{} in {}', pool_type, self.coin_x.symbol, self.coin_y.symbol, resource_address)
+        return None
 
     async def get_token_pair_reserve(
             self,
             pool_type: str,
             resource_address: AccountAddress,
-            router_address: AccountAddress
-    ) -> dict | None:
+            router_address: AccountAddress,
+            min_ledger_version: int = None
+    ) -> PoolState | None:
+        """
+        State of one pool oriented coin_x -> coin_y
+        :param pool_type:
+        :param resource_address:
+        :param router_address:
+        :param min_ledger_version: read at this ledger version or later
+        :return:
+        """
+        # the index is a one-off snapshot, reads that must be recent go to the node
+        if self.pool_index is not None and self.pool_index.is_loaded(resource_address) and min_ledger_version is None:
+            state = self.get_indexed_token_pair_reserve(pool_type=pool_type, resource_address=resource_address)
+        else:
+            state = await self._read_token_pair_reserve(pool_type, resource_address, router_address, min_ledger_version)
+
+        if state is not None and self.history_recorder is not None:
+            self.history_recorder.record(state, self.coin_x.contract_address, self.coin_y.contract_address)
+        return state
+
+    async def _read_token_pair_reserve(
+            self,
+            pool_type: str,
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            min_ledger_version: int = None
+    ) -> PoolState | None:
+        """
+        get_token_pair_reserve read from the node
+        """
+        coin_x = self.coin_x.contract_address
+        coin_y = self.coin_y.contract_address
+        pair_sorted = is_sorted(coin_x, coin_y)
+        pool_x, pool_y = (coin_x, coin_y) if pair_sorted else (coin_y, coin_x)
+
         res_payload = f"{router_address}::liquidity_pool::LiquidityPool" \
-                      f"<{self.coin_x.contract_address}, {self.coin_y.contract_address}, " \
+                      f"<{pool_x}, {pool_y}, " \
                       f"{router_address}::curves::{pool_type}>"
 
-        resource_data = await self.get_token_reserve(
+        pool_version = pool_version_of(resource_address)
+        state: PoolState = await self.get_token_reserve(
             resource_address=resource_address,
-            payload=res_payload
+            payload=res_payload,
+            min_ledger_version=min_ledger_version,
+            parse=lambda resource, ledger_version: PoolState.from_resource(
+                resource, pool_type, pool_version, ledger_version
+            )
         )
+        if state is None:
+            return None
 
-        if resource_data is not None:
-            self.resource_data = resource_data
+        return state if pair_sorted else state.flip()
 
-            reserve_x = resource_data["data"]["coin_x_reserve"]["value"]
-            reserve_y = resource_data["data"]["coin_y_reserve"]["value"]
+    async def get_amount_in(
+            self,
+            pool_type: Literal['Stable', 'Uncorrelated'],
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            amount_out: int,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> int | None:
+        state = await self.get_token_pair_reserve(
+            pool_type=pool_type,
+            resource_address=resource_address,
+            router_address=router_address
+        )
+        if state is None:
+            return None
 
-            return {
-                self.coin_x.contract_address: reserve_x,
-                self.coin_y.contract_address: reserve_y
-            }
+        if self.quote_executor is not None:
+            from utils.executor import QuoteJob
 
-        else:
+            job = QuoteJob.from_state(state.with_scales(10 ** coin_x_decimals, 10 ** coin_y_decimals), [amount_out])
+            amounts_in = await self.quote_executor.quote(job)
+            return None if amounts_in is None else amounts_in[0]
+
+        try:
+            match pool_type:
+                case 'Stable':
+                    amount_in = get_coins_out_with_fees_stable(
+                        coin_in=amount_out,
+                        reserve_in=state.reserve_in,
+                        reserve_out=state.reserve_out,
+                        scale_in=10 ** coin_x_decimals,
+                        scale_out=10 ** coin_y_decimals,
+                        fee=state.fee,
+                        solver=self.get_solver(resource_address, coin_x_address).get_y
+                    )
+                case 'Uncorrelated':
+                    amount_in = get_coins_out_with_fees(
+                        coin_in_val=amount_out,
+                        reserve_in=state.reserve_in,
+                        reserve_out=state.reserve_out,
+                        fee=state.fee
+                    )
+                case _:
+                    amount_in = None
+        except (OverflowError, ZeroDivisionError) as e:
+            # the contract would abort this swap, skip the pool like run_job skips the amount
+            logger.debug("{} pool at {} can't quote {}: {}", pool_type, resource_address, amount_out, e)
+            return None
+
+        return amount_in
 
-            res_payload = f"{router_address}::liquidity_pool::LiquidityPool" \
-                          f"<{self.coin_y.contract_address}, {self.coin_x.contract_address}, " \
-                          f"{router_address}::curves::{pool_type}>"
+    async def get_amounts_in(
+            self,
+            pool_type: Literal['Stable', 'Uncorrelated'],
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            amounts_out: list[int],
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> list[int | None] | None:
+        """
+        Same as get_amount_in for many amounts against one pool fetch, None for amounts the pool can't fill
+        """
+        state = await self.get_token_pair_reserve(
+            pool_type=pool_type,
+            resource_address=resource_address,
+            router_address=router_address
+        )
+        if state is None:
+            return None
+
+        from utils.executor import QuoteJob, run_job
+
+        job = QuoteJob.from_state(state.with_scales(10 ** coin_x_decimals, 10 ** coin_y_decimals), amounts_out)
+        if self.quote_executor is not None:
+            return await self.quote_executor.quote(job)
+        return run_job(job)
 
-            reversed_data = await self.get_token_reserve(
-                resource_address=resource_address,
-                payload=res_payload
+    async def sweep_amounts_in(
+            self,
+            amounts_out: list[int],
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> dict[tuple[str, str], list[int | None] | None]:
+        """
+        get_amounts_in of every pool in POOLS_INFO: pools are read concurrently,
+        then one quote job per pool state goes to the quote executor, or runs inline without one
+        :param amounts_out:
+        :param coin_x_address:
+        :param coin_y_address:
+        :param coin_x_decimals:
+        :param coin_y_decimals:
+        :return: (pool_version, pool_type) -> amount_in per amount_out, None for missing pools
+            and for amounts a pool can't fill
+        """
+        keys = [
+            (pool_version, pool_type)
+            for pool_version, pool_info in POOLS_INFO.items()
+            for pool_type in pool_info['types']
+        ]
+        snapshots = await asyncio.gather(*[
+            self.get_pool_snapshot(
+                pool_type=pool_type,
+                resource_address=POOLS_INFO[pool_version]['resource_address'],
+                router_address=POOLS_INFO[pool_version]['router_address'],
+                coin_x_address=coin_x_address,
+                coin_y_address=coin_y_address,
+                coin_x_decimals=coin_x_decimals,
+                coin_y_decimals=coin_y_decimals
             )
-            if reversed_data is None:
-                logger.error(f"Error getting token pair reserve (reverse), {pool_type} pool")
-                return None
+            for pool_version, pool_type in keys
+        ])
+
+        from utils.executor import QuoteJob, run_job
 
-            self.resource_data = reversed_data
-            reserve_x = reversed_data["data"]["coin_x_reserve"]["value"]
-            reserve_y = reversed_data["data"]["coin_y_reserve"]["value"]
+        found = [(key, snapshot) for key, snapshot in zip(keys, snapshots) if snapshot is not None]
+        jobs = [QuoteJob.from_state(snapshot, amounts_out) for _, snapshot in found]
+        if self.quote_executor is not None:
+            results = await self.quote_executor.quote_many(jobs)
+        else:
+            results = [run_job(job) for job in jobs]
 
-            return {
-                self.coin_x.contract_address: reserve_y,
-                self.coin_y.contract_address: reserve_x
-            }
+        quotes = dict.fromkeys(keys)
+        quotes.update({key: result for (key, _), result in zip(found, results)})
+        return quotes
 
-    async def get_amount_in(
+    async def get_exact_out_amount_in(
             self,
             pool_type: Literal['Stable', 'Uncorrelated'],
             resource_address: AccountAddress,
             router_address: AccountAddress,
-            amount_out: int,
+            coin_out: int,
             coin_x_address: str,
             coin_y_address: str,
             coin_x_decimals: int,
             coin_y_decimals: int
-    ) -> int | None:
-        tokens_reserve: dict = await self.get_token_pair_reserve(
+    ) -> InverseQuote | None:
+        """
+        Inverse of get_amount_in: the least coin_x to send so that at least coin_out of coin_y is received
+        :param coin_out: coin_y to receive
+        :return: InverseQuote, its amount_in is the coin_x to send
+        """
+        quotes = await self.get_exact_out_amounts_in(
+            pool_type=pool_type,
+            resource_address=resource_address,
+            router_address=router_address,
+            coins_out=[coin_out],
+            coin_x_address=coin_x_address,
+            coin_y_address=coin_y_address,
+            coin_x_decimals=coin_x_decimals,
+            coin_y_decimals=coin_y_decimals
+        )
+        return None if quotes is None else quotes[0]
+
+    async def get_exact_out_amounts_in(
+            self,
+            pool_type: Literal['Stable', 'Uncorrelated'],
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            coins_out: list[int],
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> list[InverseQuote] | None:
+        """
+        Same as get_exact_out_amount_in for many targets against one pool fetch
+        """
+        state = await self.get_token_pair_reserve(
             pool_type=pool_type,
             resource_address=resource_address,
             router_address=router_address
         )
-        logger.debug('resource_data: {}', self.resource_data)
-        if tokens_reserve is None:
+        if state is None:
             return None
 
-        reserve_x = int(tokens_reserve[coin_x_address])
-        reserve_y = int(tokens_reserve[coin_y_address])
+        return inverse.get_amounts_in(
+            pool_type,
+            coins_out,
+            reserve_in=state.reserve_in,
+            reserve_out=state.reserve_out,
+            scale_in=10 ** coin_x_decimals,
+            scale_out=10 ** coin_y_decimals,
+            fee=state.fee
+        )
 
-        if reserve_x is None or reserve_y is None:
+    async def get_cheapest_exact_out_and_set_pool_type(
+            self,
+            coin_out: int,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> int | None:
+        """
+        Exact-out counterpart of get_most_profitable_amount_in_and_set_pool_type:
+        picks the pool needing the least coin_x to receive coin_out of coin_y
+        :param coin_out: coin_y to receive
+        :return: coin_x to send on the selected pool, None when no pool can pay coin_out
+        """
+        tasks = []
+        for pool_version, pool_info in POOLS_INFO.items():
+            for pool_type in pool_info['types']:
+                task = asyncio.create_task(
+                    self.get_exact_out_amount_in(
+                        pool_type=pool_type,
+                        resource_address=pool_info['resource_address'],
+                        router_address=pool_info['router_address'],
+                        coin_out=coin_out,
+                        coin_x_address=coin_x_address,
+                        coin_y_address=coin_y_address,
+                        coin_x_decimals=coin_x_decimals,
+                        coin_y_decimals=coin_y_decimals
+                    )
+                )
+                tasks.append((pool_version, pool_type, task))
+
+        pool_data = {}
+        for pool_version, pool_type, task in tasks:
+            quote = await task
+            logger.debug('pool_version: {} pool_type: {} quote: {}', pool_version, pool_type, quote)
+            if quote is not None and quote.amount_in is not None:
+                pool_data[(pool_version, pool_type)] = quote.amount_in
+
+        if not pool_data:
             return None
 
-        pool_fee = int(self.resource_data["data"]["fee"])
-
-        match pool_type:
-            case 'Stable':
-                amount_in = int(get_coins_out_with_fees_stable(
-                    coin_in=d(amount_out),
-                    reserve_in=d(reserve_x),
-                    reserve_out=d(reserve_y),
-                    scale_in=d(pow(10, coin_x_decimals)),
-                    scale_out=d(pow(10, coin_y_decimals)),
-                    fee=d(pool_fee)
-                ))
-            case 'Uncorrelated':
-                amount_in = int(get_coins_out_with_fees(
-                    coin_in_val=d(amount_out),
-                    reserve_in=d(reserve_x),
-                    reserve_out=d(reserve_y),
-                    fee=d(pool_fee)
-                ))
-            case _:
-                amount_in = None
+        cheapest_pool = min(pool_data, key=pool_data.get)
+        self.pool_version, self.pool_type = cheapest_pool
+        self.router_address = POOLS_INFO[self.pool_version]['router_address']
 
-        return amount_in
+        return pool_data[cheapest_pool]
+
+    async def get_pool_snapshot(
+            self,
+            pool_type: Literal['Stable', 'Uncorrelated'],
+            resource_address: AccountAddress,
+            router_address: AccountAddress,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int,
+            min_ledger_version: int = None
+    ) -> PoolState | None:
+        """
+        State of one pool oriented coin_x -> coin_y, with the scales of both coins
+        """
+        state = await self.get_token_pair_reserve(
+            pool_type=pool_type,
+            resource_address=resource_address,
+            router_address=router_address,
+            min_ledger_version=min_ledger_version
+        )
+        if state is None:
+            return None
+
+        return state.with_scales(10 ** coin_x_decimals, 10 ** coin_y_decimals)
+
+    async def get_split_amount_in(
+            self,
+            amount_out: int,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int,
+            approximate: bool = False
+    ) -> tuple[list[tuple[str, str]], 'SplitQuote']:
+        """
+        Splits amount_out of coin_x over every pool in POOLS_INFO.
+        Returns the (pool_version, pool_type) of every allocation slot and the split itself.
+        With approximate, the allocation is searched on price-impact tables of the pools, see utils.lut.
+        """
+        keys = []
+        tasks = []
+        for pool_version, pool_info in POOLS_INFO.items():
+            for pool_type in pool_info['types']:
+                keys.append((pool_version, pool_type))
+                tasks.append(
+                    self.get_pool_snapshot(
+                        pool_type=pool_type,
+                        resource_address=pool_info['resource_address'],
+                        router_address=pool_info['router_address'],
+                        coin_x_address=coin_x_address,
+                        coin_y_address=coin_y_address,
+                        coin_x_decimals=coin_x_decimals,
+                        coin_y_decimals=coin_y_decimals
+                    )
+                )
+
+        snapshots = await asyncio.gather(*tasks)
+        pools = [(key, snapshot) for key, snapshot in zip(keys, snapshots) if snapshot is not None]
+
+        from utils.split import split_amount
+
+        split = split_amount(amount_out, [snapshot for _, snapshot in pools], approximate=approximate)
+        logger.debug('split: {}', split)
+
+        return [key for key, _ in pools], split
+
+    async def get_route_graph(self, refresh: bool = False) -> RouteGraph:
+        """
+        Routing graph of the pool index, loading the index and the decimals of stable pool coins on first use
+        :param refresh: reload the pool index and rebuild the graph
+        :return:
+        """
+        if self.route_graph is not None and not refresh:
+            return self.route_graph
+
+        if self.pool_index is None or refresh:
+            self.pool_index = await load_pool_index(self.client)
+
+        stable_coins = {
+            coin
+            for _, coin_x, coin_y, pool_type in self.pool_index.pools
+            if pool_type == 'Stable'
+            for coin in (coin_x, coin_y)
+            # TokenBase needs a plain address::module::Name coin type
+            if coin != APTOS_COIN and '<' not in coin
+        }
+        # the index strips leading address zeros, AccountAddress.from_str wants them back
+        full_types = {coin: expand_type(coin) for coin in stable_coins}
+        await self.prefetch_token_metadata([
+            TokenBase(coin.rsplit('::', 1)[-1], full_type) for coin, full_type in full_types.items()
+        ])
+
+        decimals = {}
+        for coin, full_type in full_types.items():
+            stored = self.token_metadata.get(full_type)
+            if stored is not None:
+                decimals[coin] = stored['decimals']
+
+        self.route_graph = RouteGraph.from_index(self.pool_index, decimals)
+        logger.debug('route graph: {}', self.route_graph.stats())
+        return self.route_graph
+
+    async def get_best_route(self, amount_out: int, max_hops: int = 3, refresh: bool = False) -> Route | None:
+        """
+        Best route of 1 to max_hops hops swapping amount_out of coin_x into coin_y,
+        possibly through other coins such as APT
+        :param amount_out: amount of coin_x sent
+        :param max_hops:
+        :param refresh: reload the pool index first
+        :return: None when no pool path has enough liquidity
+        """
+        graph = await self.get_route_graph(refresh=refresh)
+        route = graph.find_best_route(self.coin_x.contract_address, self.coin_y.contract_address, amount_out, max_hops)
+        logger.debug('best route: {}', route)
+        return route
+
+    async def _timed_amount_in(self, pool_version: str, pool_type: Literal['Stable', 'Uncorrelated'], **kwargs):
+        """
+        get_amount_in, timed into QUOTE_LATENCY when metrics are enabled
+        """
+        if not METRICS.enabled:
+            return await self.get_amount_in(pool_type=pool_type, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return await self.get_amount_in(pool_type=pool_type, **kwargs)
+        finally:
+            QUOTE_LATENCY.observe(time.perf_counter() - started, pool_version, pool_type)
 
     async def get_most_profitable_amount_in_and_set_pool_type(
             self,
@@ -139,8 +556,29 @@ class LiquidSwapCurve(ModuleBase):
             coin_x_address: str,
             coin_y_address: str,
             coin_x_decimals: int,
-            coin_y_decimals: int
+            coin_y_decimals: int,
+            approximate: bool = False
     ):
+        """
+        Quotes amount_out on every pool in POOLS_INFO and selects the one giving the most coin_y
+        :param amount_out:
+        :param coin_x_address:
+        :param coin_y_address:
+        :param coin_x_decimals:
+        :param coin_y_decimals:
+        :param approximate: rank pools on their price-impact tables, see utils.lut, only pools whose
+            error bounds overlap the best one are quoted exactly. The amount returned stays exact.
+        :return: amount_in of the selected pool
+        """
+        if approximate:
+            selected = await self._select_pool_from_tables(
+                amount_out, coin_x_address, coin_y_address, coin_x_decimals, coin_y_decimals
+            )
+            if selected is not None:
+                (self.pool_version, self.pool_type), amount_in = selected
+                self.router_address = POOLS_INFO[self.pool_version]['router_address']
+                return amount_in
+
         pool_data = {}
         tasks = []
 
@@ -149,7 +587,8 @@ class LiquidSwapCurve(ModuleBase):
                 resource_address = pool_info['resource_address']
                 router_address = pool_info['router_address']
                 task = asyncio.create_task(
-                    self.get_amount_in(
+                    self._timed_amount_in(
+                        pool_version=pool_version,
                         pool_type=pool_type,
                         resource_address=resource_address,
                         router_address=router_address,
@@ -164,7 +603,7 @@ class LiquidSwapCurve(ModuleBase):
 
         for pool_version, pool_type, task in tasks:
             amount_in = await task
-            logger.debug(f'pool_version: {pool_version} pool_type: {pool_type} amount_in: {amount_in}')
+            logger.debug('pool_version: {} pool_type: {} amount_in: {}', pool_version, pool_type, amount_in)
             if amount_in is not None:
                 pool_data[(pool_version, pool_type)] = amount_in
 
@@ -173,7 +612,197 @@ class LiquidSwapCurve(ModuleBase):
         logger.debug('most_profitable_pool: {}', most_profitable_pool)
         most_profitable_amount_in = pool_data[most_profitable_pool]
 
-        pool_version, self.pool_type = most_profitable_pool
-        self.router_address = POOLS_INFO[pool_version]['router_address']
+        self.pool_version, self.pool_type = most_profitable_pool
+        self.router_address = POOLS_INFO[self.pool_version]['router_address']
 
         return most_profitable_amount_in
+
+    async def _select_pool_from_tables(
+            self,
+            amount_out: int,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> tuple[tuple[str, str], int] | None:
+        """
+        Best pool for amount_out by utils.lut.select_best
+        :return: (pool_version, pool_type) and its exact amount_in, None when no pool or a quote overflows
+        """
+        keys = [
+            (pool_version, pool_type)
+            for pool_version, pool_info in POOLS_INFO.items()
+            for pool_type in pool_info['types']
+        ]
+        snapshots = await asyncio.gather(*[
+            self.get_pool_snapshot(
+                pool_type=pool_type,
+                resource_address=POOLS_INFO[pool_version]['resource_address'],
+                router_address=POOLS_INFO[pool_version]['router_address'],
+                coin_x_address=coin_x_address,
+                coin_y_address=coin_y_address,
+                coin_x_decimals=coin_x_decimals,
+                coin_y_decimals=coin_y_decimals
+            )
+            for pool_version, pool_type in keys
+        ])
+        found = [(key, snapshot) for key, snapshot in zip(keys, snapshots) if snapshot is not None]
+        if not found:
+            return None
+
+        from utils.lut import select_best, table_for
+
+        tables = [
+            table_for(state.pool_type, state.reserve_in, state.reserve_out, state.scale_in, state.scale_out, state.fee)
+            for _, state in found
+        ]
+        try:
+            best, amount_in, exact_quotes = select_best(tables, amount_out)
+        except (OverflowError, ZeroDivisionError) as e:
+            # the exact path skips the pool that can't fill the amount
+            logger.debug("Table selection of {} failed, quoting every pool: {!r}", amount_out, e)
+            return None
+
+        logger.debug('pool selected from tables: {} amount_in: {} exact quotes: {}', found[best][0], amount_in,
+                     exact_quotes)
+        return found[best][0], amount_in
+
+    def get_swap_template(self, function: Literal['swap', 'swap_into']):
+        """
+        Router payload template of the selected pool, coin_x in and coin_y out
+        :param function: 'swap' sends an exact amount, 'swap_into' receives an exact amount
+        :return: liquidswap.execution.SwapTemplate
+        """
+        # execution pulls in the signing stack, quoting doesn't need it
+        from liquidswap.execution import swap_template
+
+        if self.pool_version is None:
+            raise ValueError("No pool selected, call get_most_profitable_amount_in_and_set_pool_type first")
+
+        return swap_template(
+            self.pool_version,
+            self.router_address,
+            function,
+            self.coin_x.contract_address,
+            self.coin_y.contract_address,
+            self.pool_type
+        )
+
+    async def submit_swap(self, amount_out: int, min_amount_in: int):
+        """
+        Submits a swap of exactly amount_out of coin_x on the selected pool through the account's pipeline,
+        without waiting for it to land
+        :param amount_out: coin_x sent
+        :param min_amount_in: least coin_y accepted
+        :return: liquidswap.execution.SubmittedTransaction, await its result for the outcome
+        """
+        from liquidswap.execution import get_pipeline
+
+        payload = self.get_swap_template('swap').payload(amount_out, min_amount_in)
+        return await get_pipeline(self.client, self.account).submit(payload)
+
+    async def submit_swap_into(self, max_amount_out: int, amount_in: int):
+        """
+        Submits a swap receiving exactly amount_in of coin_y, see submit_swap
+        :param max_amount_out: most coin_x that may be sent
+        :param amount_in: coin_y received
+        :return: liquidswap.execution.SubmittedTransaction
+        """
+        from liquidswap.execution import get_pipeline
+
+        payload = self.get_swap_template('swap_into').payload(max_amount_out, amount_in)
+        return await get_pipeline(self.client, self.account).submit(payload)
+
+    async def watch(
+            self,
+            amounts_out: list[int],
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int,
+            interval: float = 1.0
+    ) -> AsyncIterator[QuoteUpdate]:
+        """
+        Polls the pools, one resource read each: the ledger version moves with every block so it says
+        nothing about these pools, and the pool reads are what tells whether they changed.
+        Quotes are recomputed only for pools whose reserves or fee changed and an update is
+        yielded only when the best pool or amount_in of some amount_out changed.
+        :param amounts_out:
+        :param coin_x_address:
+        :param coin_y_address:
+        :param coin_x_decimals:
+        :param coin_y_decimals:
+        :param interval: seconds between polls
+        :return:
+        """
+        from utils.executor import QuoteJob, run_job
+
+        pools = [
+            ((pool_version, pool_type), pool_info)
+            for pool_version, pool_info in POOLS_INFO.items()
+            for pool_type in pool_info['types']
+        ]
+        states = {}
+        quotes = {}
+        best = {}
+        # (pool_version, pool_type) -> ledger version of its last read
+        read_at = {}
+
+        while True:
+            # past the last read: a fresh node read, not the pool index snapshot or a cached read
+            snapshots = await asyncio.gather(*[
+                self.get_pool_snapshot(
+                    pool_type=key[1],
+                    resource_address=pool_info['resource_address'],
+                    router_address=pool_info['router_address'],
+                    coin_x_address=coin_x_address,
+                    coin_y_address=coin_y_address,
+                    coin_x_decimals=coin_x_decimals,
+                    coin_y_decimals=coin_y_decimals,
+                    min_ledger_version=read_at.get(key, -1) + 1
+                )
+                for key, pool_info in pools
+            ])
+
+            changed = False
+            stale = []
+            for (key, _), snapshot in zip(pools, snapshots):
+                if snapshot is not None and snapshot.ledger_version is not None:
+                    read_at[key] = snapshot.ledger_version
+                state = None if snapshot is None else (snapshot.reserve_in, snapshot.reserve_out, snapshot.fee)
+                if key in states and states[key] == state:
+                    continue
+
+                changed = True
+                states[key] = state
+                quotes[key] = None
+                if snapshot is not None:
+                    stale.append((key, QuoteJob.from_state(snapshot, amounts_out)))
+
+            if stale:
+                jobs = [job for _, job in stale]
+                if self.quote_executor is not None:
+                    results = await self.quote_executor.quote_many(jobs)
+                else:
+                    results = [run_job(job) for job in jobs]
+                quotes.update({key: result for (key, _), result in zip(stale, results)})
+
+            if changed:
+                new_best = {}
+                for position, amount_out in enumerate(amounts_out):
+                    candidates = {
+                        key: quote[position]
+                        for key, quote in quotes.items() if quote is not None and quote[position] is not None
+                    }
+                    if candidates:
+                        key = max(candidates, key=candidates.get)
+                        new_best[amount_out] = (key, candidates[key])
+                    else:
+                        new_best[amount_out] = None
+
+                changes = {amount_out: value for amount_out, value in new_best.items() if best.get(amount_out) != value}
+                best = new_best
+                if changes:
+                    yield QuoteUpdate(max(read_at.values(), default=0), changes)
+
+            await asyncio.sleep(interval)
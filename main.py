@@ -1,58 +1,65 @@
 import asyncio
-import random
 
 from aptos_sdk.account import Account
 from loguru import logger
 
 import config
-from contracts.base import TokenBase
-from liquidswap.swap import LiquidSwapCurve
-
-PAIRS = [
-    (
-        ('aptos', '0x1::aptos_coin::AptosCoin'),
-        ('usdc', '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC')
-    ),
-    (
-        ('aptos', '0x1::aptos_coin::AptosCoin'),
-        ('stAPT', '0xd11107bdf0d6d7040c6c0bfbdecb6545191fdf13e8d8d259952f53e1713f61b5::staked_coin::StakedAptos')
-    )
-]
+from aptos_rest_client import HTTP_POOL
+from balances import scan_balances
+from base import rpc_client
+from contracts.base import load_pairs
+from liquidswap.history import HistoryRecorder
+from liquidswap.pools import load_pool_index
+from pipeline import quote_pairs
+from utils.executor import QuoteExecutor
+from utils.metrics import METRICS
 
 
-async def main():
+async def main(quote_executor: QuoteExecutor = None, history_recorder: HistoryRecorder = None):
     account = Account.load_key(config.PRIVATE_KEY)
-    for pair in PAIRS:
-        x, y = pair
-        coin_x = TokenBase(x[0], x[1])
-        coin_y = TokenBase(y[0], y[1])
-
-        module = LiquidSwapCurve(account, config.RPC_URL, coin_x=coin_x, coin_y=coin_y)
-        await module.async_init()
-
-        logger.success('coin_x: {} initial balance: {}', coin_x.symbol, module.initial_balance_x_wei)
-        logger.success('coin_x: {} decimals: {}', coin_x.symbol, module.token_x_decimals)
-
-        logger.success('coin_y: {} initial balance: {}', coin_y.symbol, module.initial_balance_y_wei)
-        logger.success('coin_y: {} decimals: {}', coin_y.symbol, module.token_y_decimals)
-
-        min_amount_out = module.initial_balance_x_wei * config.MIN_SWAP_PERCENT_BALANCE
-        max_amount_out = module.initial_balance_x_wei * config.MAX_SWAP_PERCENT_BALANCE
-        amount_out = round(random.uniform(min_amount_out, max_amount_out))
-        logger.info('amount_out {}', amount_out)
-
-        amount_in = await module.get_most_profitable_amount_in_and_set_pool_type(
-            amount_out,
-            coin_x.contract_address,
-            coin_y.contract_address,
-            module.token_x_decimals,
-            module.token_y_decimals,
-        )
+    client = rpc_client(config.RPC_URLS)
+    pairs = load_pairs(config.PAIRS_PATH)
+
+    # every balance of the wallet in one resources read instead of two reads per pair
+    pool_index, balances = await asyncio.gather(
+        load_pool_index(client),
+        scan_balances(client, [account.address()], [token.contract_address for pair in pairs for token in pair])
+    )
+    if history_recorder is not None:
+        history_recorder.record_index(pool_index)
+
+    async for quote in quote_pairs(
+            account, pairs, base_url=config.RPC_URLS, pool_index=pool_index, balances=balances,
+            quote_executor=quote_executor, history_recorder=history_recorder
+    ):
+        if quote.error is not None:
+            logger.error('pair: {} failed after {:.3f}s: {}', quote.pair, quote.latency, quote.error)
+            continue
+
         logger.success(
-            'amount_in: {}, selected pool: {}, router_address: {}', amount_in, module.pool_type, module.router_address
+            'pair: {} amount_out: {} amount_in: {}, selected pool: {}, latency: {:.3f}s',
+            quote.pair, quote.amount_out, quote.amount_in, quote.pool, quote.latency
         )
 
 
+async def run():
+    METRICS.enabled = config.METRICS_ENABLED
+    quote_executor = None
+    if config.QUOTE_EXECUTOR is not None:
+        quote_executor = QuoteExecutor(config.QUOTE_EXECUTOR, config.QUOTE_WORKERS, config.QUOTE_JOBS_PER_TASK)
+    history_recorder = HistoryRecorder(config.HISTORY_PATH) if config.HISTORY_PATH is not None else None
+    try:
+        await main(quote_executor, history_recorder)
+    finally:
+        await HTTP_POOL.close_all()
+        if history_recorder is not None:
+            history_recorder.close()
+        if quote_executor is not None:
+            quote_executor.shutdown()
+        if METRICS.enabled and config.METRICS_PATH:
+            METRICS.write(config.METRICS_PATH)
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(run())
 
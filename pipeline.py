@@ -0,0 +1,136 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, NamedTuple
+
+from aptos_sdk.account import Account
+from loguru import logger
+
+import config
+from balances import BalanceMatrix
+from base import ModuleBase
+from contracts.base import TokenBase
+from liquidswap.history import HistoryRecorder
+from liquidswap.pools import PoolIndex
+from liquidswap.swap import LiquidSwapCurve
+from utils.executor import QuoteExecutor
+
+
+class PairQuote(NamedTuple):
+    pair: tuple[str, str]  # (coin_x symbol, coin_y symbol)
+    pool: tuple[str, str] | None  # (pool_version, pool_type) selected
+    amount_out: int | None
+    amount_in: int | None
+    latency: float  # seconds from start of the pair to its quote
+    error: str | None = None
+
+
+async def quote_pair(
+        account: Account,
+        coin_x: TokenBase,
+        coin_y: TokenBase,
+        base_url: str | list[str] = config.RPC_URLS,
+        pool_index: PoolIndex = None,
+        balances: BalanceMatrix = None,
+        quote_executor: QuoteExecutor = None,
+        history_recorder: HistoryRecorder = None
+) -> PairQuote:
+    """
+    Initializes one pair, picks a random swap size from the wallet balance and quotes it on every pool
+    :param account:
+    :param coin_x:
+    :param coin_y:
+    :param base_url:
+    :param pool_index:
+    :param balances: wallet balances from balances.scan_balances, read per pair when None
+    :param quote_executor: price quotes off the event loop, inline when None
+    :param history_recorder: append the pool states read to this history
+    :return:
+    """
+    started = time.perf_counter()
+    pair = (coin_x.symbol, coin_y.symbol)
+
+    try:
+        module = LiquidSwapCurve(
+            account, base_url, coin_x=coin_x, coin_y=coin_y, pool_index=pool_index, quote_executor=quote_executor,
+            history_recorder=history_recorder
+        )
+        if balances is not None:
+            await module.async_init_from_balances(balances)
+        else:
+            await module.async_init()
+
+        logger.debug('{}: balances {} / {}, decimals {} / {}', pair, module.initial_balance_x_wei,
+                     module.initial_balance_y_wei, module.token_x_decimals, module.token_y_decimals)
+
+        if module.initial_balance_x_wei is None:
+            raise ValueError(f"{coin_x.symbol} balance unavailable")
+
+        min_amount_out = module.initial_balance_x_wei * config.MIN_SWAP_PERCENT_BALANCE
+        max_amount_out = module.initial_balance_x_wei * config.MAX_SWAP_PERCENT_BALANCE
+        amount_out = round(random.uniform(min_amount_out, max_amount_out))
+
+        amount_in = await module.get_most_profitable_amount_in_and_set_pool_type(
+            amount_out,
+            coin_x.contract_address,
+            coin_y.contract_address,
+            module.token_x_decimals,
+            module.token_y_decimals,
+            approximate=config.QUOTE_APPROXIMATE
+        )
+    except Exception as e:
+        logger.error("Error quoting {}: {}", pair, e)
+        return PairQuote(pair, None, None, None, time.perf_counter() - started, str(e))
+
+    return PairQuote(
+        pair=pair,
+        pool=(module.pool_version, module.pool_type),
+        amount_out=amount_out,
+        amount_in=amount_in,
+        latency=time.perf_counter() - started
+    )
+
+
+async def quote_pairs(
+        account: Account,
+        pairs: list[tuple[TokenBase, TokenBase]],
+        base_url: str | list[str] = config.RPC_URLS,
+        pool_index: PoolIndex = None,
+        concurrency: int = config.PAIRS_CONCURRENCY,
+        balances: BalanceMatrix = None,
+        quote_executor: QuoteExecutor = None,
+        history_recorder: HistoryRecorder = None
+) -> AsyncIterator[PairQuote]:
+    """
+    Quotes every pair concurrently, at most `concurrency` at a time, yielding results as they complete
+    :param account:
+    :param pairs:
+    :param base_url:
+    :param pool_index:
+    :param concurrency:
+    :param balances: see quote_pair
+    :param quote_executor: see quote_pair
+    :param history_recorder: see quote_pair
+    :return:
+    """
+    if pairs:
+        # fill missing decimals for every token in one batch before the pairs start
+        loader = ModuleBase(coin_x=pairs[0][0], coin_y=pairs[0][1], base_url=base_url, account=account)
+        await loader.prefetch_token_metadata([token for pair in pairs for token in pair])
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(coin_x: TokenBase, coin_y: TokenBase) -> PairQuote:
+        async with semaphore:
+            return await quote_pair(
+                account, coin_x, coin_y, base_url=base_url, pool_index=pool_index, balances=balances,
+                quote_executor=quote_executor, history_recorder=history_recorder
+            )
+
+    tasks = [asyncio.create_task(limited(coin_x, coin_y)) for coin_x, coin_y in pairs]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,175 @@
+"""
+Quote-only command line: best Liquidswap pool for swap sizes, no wallet needed.
+
+    python quote.py aptos/usdc --amount 100000000 --amount 500000000
+    python quote.py --amount 100000000                 # every pair of the pairs file
+    python quote.py --file orders.jsonl                # {"pair": "aptos/usdc", "amounts": [100000000]} per line
+
+Amounts are raw units of the coin sent. One JSON line per (pair, amount) is
+printed to stdout:
+
+    {"pair": "aptos/usdc", "amount_out": 100000000, "amount_in": 651230, "pool": ["v0.5", "Uncorrelated"],
+     "quotes": {"v0/Uncorrelated": 650960, ...}, "latency": 0.21}
+
+Arguments are parsed before anything heavy is imported and no private key
+is loaded, so --help and bad input return right away.
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pairs', nargs='*', help='symbol_x/symbol_y of the pairs file, all its pairs when omitted')
+    parser.add_argument('--amount', type=int, action='append', default=[], help='raw amount of coin_x sent')
+    parser.add_argument('--file', help="JSON lines of {\"pair\": ..., \"amounts\": [...]}, '-' for stdin")
+    parser.add_argument('--pairs-file', help='tokens and pairs, defaults to config.PAIRS_PATH')
+    parser.add_argument('--rpc', action='append', help='node url, repeat to balance over several')
+    parser.add_argument('--index', action='store_true', help='load every pool at once, cheaper for many pairs')
+    parser.add_argument('--verbose', action='store_true', help='keep debug logs on stderr')
+    args = parser.parse_args(argv)
+
+    if args.file is None and not args.amount:
+        parser.error('give --amount or --file')
+    if args.file is not None and (args.pairs or args.amount):
+        parser.error('--file replaces pairs and --amount')
+    if any(amount <= 0 for amount in args.amount):
+        parser.error('amounts must be positive')
+    return args
+
+
+def read_orders(args: argparse.Namespace) -> list[tuple[str, list[int]]]:
+    """
+    (pair, amounts) to quote, from the command line or --file
+    :param args:
+    :return: pairs as 'symbol_x/symbol_y', None for every pair of the pairs file
+    """
+    if args.file is None:
+        return [(pair, args.amount) for pair in args.pairs] or [(None, args.amount)]
+
+    file = sys.stdin if args.file == '-' else open(args.file)
+    with file:
+        orders = []
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                order = json.loads(line)
+                orders.append((order['pair'], [int(amount) for amount in order['amounts']]))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{args.file}:{line_number}: expected {{\"pair\": ..., \"amounts\": [...]}}, {e!r}")
+        return orders
+
+
+def emit(record: dict):
+    print(json.dumps(record), flush=True)
+
+
+async def quote(args: argparse.Namespace) -> int:
+    # imported here so argument errors and --help don't pay for the client and math
+    import asyncio
+
+    from loguru import logger
+
+    import config
+    from aptos_rest_client import HTTP_POOL
+    from base import rpc_client
+    from contracts.base import load_pairs, load_tokens
+    from liquidswap.pools import load_pool_index
+    from liquidswap.swap import LiquidSwapCurve
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    pairs_path = args.pairs_file or config.PAIRS_PATH
+    base_url = args.rpc or config.RPC_URLS
+    # a missing or malformed file is reported like any other failure, cron only sees stdout and the exit code
+    try:
+        tokens = load_tokens(pairs_path)
+        orders = read_orders(args)
+        all_pairs = load_pairs(pairs_path) if any(pair is None for pair, _ in orders) else []
+    except (OSError, ValueError, KeyError) as e:
+        emit({'error': f"{type(e).__name__}: {e}"})
+        return 2
+
+    jobs = []
+    for pair, amounts in orders:
+        if pair is None:
+            jobs.extend(((coin_x, coin_y), amounts) for coin_x, coin_y in all_pairs)
+            continue
+
+        symbol_x, _, symbol_y = pair.partition('/')
+        if symbol_x not in tokens or symbol_y not in tokens:
+            emit({'pair': pair, 'error': f"unknown token, known: {sorted(tokens)}"})
+            return 2
+        jobs.append(((tokens[symbol_x], tokens[symbol_y]), amounts))
+
+    failed = False
+    try:
+        pool_index = await load_pool_index(rpc_client(base_url)) if args.index else None
+        semaphore = asyncio.Semaphore(config.PAIRS_CONCURRENCY)
+
+        async def quote_pair(coin_x, coin_y, amounts: list[int]) -> list[dict]:
+            pair = f"{coin_x.symbol}/{coin_y.symbol}"
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    module = LiquidSwapCurve(None, base_url, coin_x=coin_x, coin_y=coin_y, pool_index=pool_index)
+                    await module.async_init_decimals()
+                    if module.token_x_decimals is None or module.token_y_decimals is None:
+                        raise ValueError("decimals unavailable")
+
+                    quotes = await module.sweep_amounts_in(
+                        amounts,
+                        coin_x.contract_address,
+                        coin_y.contract_address,
+                        module.token_x_decimals,
+                        module.token_y_decimals
+                    )
+                except Exception as e:
+                    return [{'pair': pair, 'amount_out': amount, 'error': str(e)} for amount in amounts]
+
+            latency = time.perf_counter() - started
+            records = []
+            for position, amount in enumerate(amounts):
+                by_pool = {
+                    key: result[position]
+                    for key, result in quotes.items() if result is not None and result[position] is not None
+                }
+                if not by_pool:
+                    records.append({'pair': pair, 'amount_out': amount, 'error': 'no pool', 'latency': latency})
+                    continue
+
+                best = max(by_pool, key=by_pool.get)
+                records.append({
+                    'pair': pair,
+                    'amount_out': amount,
+                    'amount_in': by_pool[best],
+                    'pool': list(best),
+                    'quotes': {'/'.join(key): value for key, value in by_pool.items()},
+                    'latency': latency,
+                })
+            return records
+
+        tasks = [asyncio.create_task(quote_pair(coin_x, coin_y, amounts)) for (coin_x, coin_y), amounts in jobs]
+        for task in asyncio.as_completed(tasks):
+            for record in await task:
+                failed |= 'error' in record
+                emit(record)
+    finally:
+        await HTTP_POOL.close_all()
+
+    return 1 if failed else 0
+
+
+def main(argv: list[str] = None) -> int:
+    import asyncio
+
+    return asyncio.run(quote(parse_args(argv)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
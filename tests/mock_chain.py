@@ -0,0 +1,95 @@
+"""
+In-process mock of the node's transaction endpoints, shared by the execution tests and benchmarks.bench_submit
+"""
+import asyncio
+import random
+import time
+
+import httpx
+from aptos_sdk.bcs import Deserializer
+from aptos_sdk.transactions import SignedTransaction
+
+from liquidswap.execution import transaction_hash
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+
+
+class MockChainTransport(httpx.AsyncBaseTransport):
+    """
+    /v1, /accounts/{address}, POST /transactions and /transactions/by_hash/{hash} of one chain
+    """
+
+    def __init__(self, latency: float, block_time: float, drop_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.block_time = block_time
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+
+        self.sequence_numbers: dict[str, int] = {}  # committed per sender
+        self.mempool: dict[str, tuple[str, int, float, int]] = {}  # hash -> sender, sequence, submitted at, expiry
+        self.committed: dict[str, dict] = {}
+        self.version = 1000
+
+    def json(self, status: int, body) -> httpx.Response:
+        return httpx.Response(status, json=body, headers={"X-Aptos-Ledger-Version": str(self.version)})
+
+    def advance(self):
+        """
+        Commits every mempool transaction that is old enough and next in its sender's sequence
+        """
+        now = time.monotonic()
+        progress = True
+        while progress:
+            progress = False
+            for txn_hash, (sender, sequence_number, submitted_at, expiration) in list(self.mempool.items()):
+                if time.time() > expiration:
+                    del self.mempool[txn_hash]
+                    continue
+                if sequence_number != self.sequence_numbers.get(sender, 0) or now - submitted_at < self.block_time:
+                    continue
+                del self.mempool[txn_hash]
+                self.sequence_numbers[sender] = sequence_number + 1
+                self.version += 1
+                self.committed[txn_hash] = {
+                    "type": "user_transaction", "hash": txn_hash, "version": str(self.version),
+                    "success": True, "vm_status": "Executed successfully", "sequence_number": str(sequence_number),
+                }
+                progress = True
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        self.advance()
+        path = request.url.path.split("/v1", 1)[-1].rstrip("/")
+
+        if path == "":
+            return self.json(200, {"chain_id": 4, "ledger_version": str(self.version)})
+
+        if request.method == "POST" and path == "/transactions":
+            body = await request.aread()
+            signed = SignedTransaction.deserialize(Deserializer(body))
+            if not signed.verify():
+                return self.json(400, {"message": "INVALID_SIGNATURE"})
+            raw = signed.transaction
+            sender = str(raw.sender)
+            if raw.sequence_number < self.sequence_numbers.get(sender, 0):
+                return self.json(400, {"message": "SEQUENCE_NUMBER_TOO_OLD", "vm_error_code": 3})
+            txn_hash = transaction_hash(signed)
+            if self.random.random() >= self.drop_rate:
+                self.mempool[txn_hash] = (sender, raw.sequence_number, time.monotonic(), raw.expiration_timestamps_secs)
+            return self.json(202, {"hash": txn_hash})
+
+        if path.startswith("/transactions/by_hash/"):
+            txn_hash = path.rsplit("/", 1)[-1]
+            if txn_hash in self.committed:
+                return self.json(200, self.committed[txn_hash])
+            if txn_hash in self.mempool:
+                return self.json(200, {"type": "pending_transaction", "hash": txn_hash})
+            return self.json(404, {"message": "transaction not found", "error_code": "transaction_not_found"})
+
+        if path.startswith("/accounts/"):
+            sender = path.split("/")[2]
+            return self.json(200, {"sequence_number": str(self.sequence_numbers.get(sender, 0)),
+                                   "authentication_key": sender})
+
+        return self.json(404, {"message": f"not mocked: {path}"})
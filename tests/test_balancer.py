@@ -0,0 +1,201 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aptos_rest_client.balancer import BalancedTransport
+from aptos_rest_client.pool import HttpClientPool
+
+
+class StandInNode(httpx.AsyncBaseTransport):
+    """
+    Local stand-in for RPC nodes, keyed by host: each answers after its delay, or fails as scripted
+    """
+
+    def __init__(self, delays: dict[str, float], failures: dict[str, list] = None):
+        """
+        :param delays: host -> seconds before answering
+        :param failures: host -> exceptions to raise or statuses to answer, one per request, before answering 200
+        """
+        self.delays = delays
+        self.failures = {host: list(script) for host, script in (failures or {}).items()}
+        self.requests: list[tuple[str, str]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests.append((request.method, host))
+        await asyncio.sleep(self.delays.get(host, 0))
+
+        script = self.failures.get(host)
+        if script:
+            failure = script.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(failure, json={'host': host})
+        return httpx.Response(200, json={'host': host})
+
+
+def send(transport: BalancedTransport, method: str = 'GET') -> httpx.Response:
+    async def run():
+        request = httpx.Request(method, 'http://a.invalid/v1/transactions')
+        return await transport.handle_async_request(request)
+    return asyncio.run(run())
+
+
+def balanced(node: StandInNode, hosts: list[str], **kwargs) -> BalancedTransport:
+    kwargs.setdefault('explore', 0.0)
+    kwargs.setdefault('backoff_base', 0.001)
+    return BalancedTransport([f'http://{host}/v1' for host in hosts], node, **kwargs)
+
+
+def test_get_is_retried_after_read_timeout():
+    node = StandInNode({}, {'a.invalid': [httpx.ReadTimeout('slow')]})
+    response = send(balanced(node, ['a.invalid']))
+
+    assert response.status_code == 200
+    assert len(node.requests) == 2
+
+
+def test_post_is_not_retried_after_read_timeout():
+    node = StandInNode({}, {'a.invalid': [httpx.ReadTimeout('slow')]})
+    with pytest.raises(httpx.ReadTimeout):
+        send(balanced(node, ['a.invalid']), 'POST')
+    assert len(node.requests) == 1
+
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504])
+def test_post_is_not_retried_after_server_error(status):
+    node = StandInNode({}, {'a.invalid': [status]})
+    response = send(balanced(node, ['a.invalid']), 'POST')
+
+    assert response.status_code == status
+    assert len(node.requests) == 1
+
+
+@pytest.mark.parametrize('failure', [httpx.ConnectError('refused'), httpx.ConnectTimeout('unreachable'), 429])
+def test_post_is_retried_when_it_never_reached_the_node(failure):
+    node = StandInNode({}, {'a.invalid': [failure]})
+    response = send(balanced(node, ['a.invalid']), 'POST')
+
+    assert response.status_code == 200
+    assert len(node.requests) == 2
+
+
+def send_many(transport: BalancedTransport, count: int, method: str = 'GET') -> list[httpx.Response]:
+    async def run():
+        responses = []
+        for _ in range(count):
+            responses.append(await transport.handle_async_request(httpx.Request(method, 'http://a.invalid/v1')))
+        return responses
+    return asyncio.run(run())
+
+
+def test_fastest_endpoint_ranks_first():
+    node = StandInNode({'a.invalid': 0.02, 'b.invalid': 0.001, 'c.invalid': 0.01})
+    transport = balanced(node, ['a.invalid', 'b.invalid', 'c.invalid'])
+    send_many(transport, 20)
+
+    assert [endpoint.url.host for endpoint in transport.ranked()] == ['b.invalid', 'c.invalid', 'a.invalid']
+    # each endpoint is measured once, then the fastest takes the rest
+    assert [host for _, host in node.requests].count('b.invalid') == 18
+
+
+def test_failing_endpoint_is_demoted():
+    node = StandInNode({'a.invalid': 0.001, 'b.invalid': 0.01}, {'a.invalid': [503] * 10})
+    transport = balanced(node, ['a.invalid', 'b.invalid'], max_retries=0)
+    send_many(transport, 10)
+
+    a, b = transport.endpoints
+    assert a.error_rate > transport.max_error_rate
+    assert transport.ranked()[0] is b
+
+
+def test_slow_read_is_hedged_after_the_deadline():
+    node = StandInNode({'a.invalid': 0.001, 'b.invalid': 0.005})
+    transport = balanced(node, ['a.invalid', 'b.invalid'], hedge=True, hedge_min_samples=5)
+    send_many(transport, 10)
+
+    # a stalls: the hedge goes to b once a is slower than its own p90
+    node.delays['a.invalid'] = 1.0
+    response = send(transport)
+
+    assert response.json() == {'host': 'b.invalid'}
+    assert transport.hedges == 1 and transport.hedge_wins == 1
+    assert node.requests[-2:] == [('GET', 'a.invalid'), ('GET', 'b.invalid')]
+
+
+def test_writes_are_not_hedged():
+    # far enough apart that scheduling noise can't rank b first
+    node = StandInNode({'a.invalid': 0.001, 'b.invalid': 0.03})
+    transport = balanced(node, ['a.invalid', 'b.invalid'], hedge=True, hedge_min_samples=5)
+    send_many(transport, 10)
+
+    node.delays['a.invalid'] = 0.05
+    send(transport, 'POST')
+    assert transport.hedges == 0
+    assert node.requests[-1] == ('POST', 'a.invalid')
+
+
+def test_clients_of_the_same_endpoints_share_one_pool():
+    pool = HttpClientPool()
+    node = StandInNode({})
+
+    async def run():
+        key, client, _ = pool.acquire(['http://a.invalid/v1'], transport=node)
+        same_key, same_client, _ = pool.acquire(['http://a.invalid/v1'])
+        assert same_key == key and same_client is client
+
+        await pool.release(key)
+        assert not client.is_closed
+        await pool.release(key)
+        assert client.is_closed
+
+    asyncio.run(run())
+
+
+def test_client_with_other_settings_is_refused():
+    pool = HttpClientPool()
+    pool.acquire(['http://a.invalid/v1'], transport=StandInNode({}))
+
+    with pytest.raises(ValueError):
+        pool.acquire(['http://a.invalid/v1'], hedge=True)
+    with pytest.raises(ValueError):
+        pool.acquire(['http://a.invalid/v1'], transport=StandInNode({}))
+    asyncio.run(pool.close_all())
+
+
+def entry_point_transports(monkeypatch, url: str, **settings) -> tuple[BalancedTransport, BalancedTransport]:
+    """
+    Transport of the client main.py and quote.py build, and the one a module of the same endpoint gets
+    """
+    import config
+    from base import ModuleBase, rpc_client
+    from contracts.base import TokenBase
+
+    for name, value in settings.items():
+        monkeypatch.setattr(config, name, value)
+
+    async def run():
+        client = rpc_client(url)
+        module = ModuleBase(TokenBase('a', '0x1::a::A'), TokenBase('b', '0x1::b::B'), url, None)
+        try:
+            return client.transport, module.client.transport
+        finally:
+            await client.close()
+            await module.client.close()
+
+    return asyncio.run(run())
+
+
+def test_config_rate_limit_reaches_entry_point_clients(monkeypatch):
+    shared, module = entry_point_transports(monkeypatch, 'http://rate-limit.invalid/v1', RPC_RATE_LIMIT=5.0)
+
+    assert module is shared
+    assert all(endpoint.bucket is not None for endpoint in shared.endpoints)
+
+
+def test_config_hedge_reaches_entry_point_clients(monkeypatch):
+    shared, module = entry_point_transports(monkeypatch, 'http://hedge.invalid/v1', RPC_HEDGE=True)
+
+    assert module is shared
+    assert shared.hedge
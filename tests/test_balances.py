@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+from aptos_sdk.account_address import AccountAddress
+
+from aptos_rest_client import CustomRestClient
+from balances import BalanceMatrix, parse_coin_stores, scan_balances, wallet_key
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+# padded address, as some nodes spell it
+USDC_PADDED = '0x0f22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+STAPT = '0xd11107bdf0d6d7040c6c0bfbdecb6545191fdf13e8d8d259952f53e1713f61b5::staked_coin::StakedAptos'
+
+FUNDED = '0x' + 'a' * 64
+UNFUNDED = '0x' + 'b' * 64
+BROKEN = '0x' + 'c' * 64
+
+
+def coin_store(coin_type: str, value: int) -> dict:
+    return {'type': f'0x1::coin::CoinStore<{coin_type}>', 'data': {'coin': {'value': str(value)}, 'frozen': False}}
+
+
+def test_parse_coin_stores_keeps_coin_stores_only():
+    resources = [
+        coin_store(APT, 150),
+        coin_store(USDC_PADDED, 7),
+        {'type': '0x1::coin::CoinInfo<0x1::aptos_coin::AptosCoin>', 'data': {'decimals': 8}},
+        {'type': '0x1::account::Account', 'data': {'sequence_number': '3'}},
+    ]
+    assert parse_coin_stores(resources) == {APT: 150, USDC: 7}
+
+
+def test_matrix_rows_and_failed_wallets():
+    matrix = BalanceMatrix([FUNDED, UNFUNDED, BROKEN], [APT, USDC, APT])
+    matrix.set_row(FUNDED, {APT: 2 ** 64 - 1, USDC: 5}, ledger_version=9)
+    matrix.set_row(UNFUNDED, {})
+    matrix.set_failed(BROKEN)
+
+    assert len(matrix) == 3 and matrix.tokens == [APT, USDC]
+    assert matrix.get(FUNDED, APT) == 2 ** 64 - 1
+    # any spelling of a wallet or a coin type
+    assert matrix.get(AccountAddress.from_str(FUNDED), USDC_PADDED) == 5
+    assert matrix.row(UNFUNDED) == {APT: 0, USDC: 0}
+    assert matrix.get(BROKEN, APT) is None and matrix.row(BROKEN) is None
+    assert matrix.ledger_versions == [9, None, None]
+
+    # a later successful read clears the failure
+    matrix.set_row(BROKEN, {USDC: 1})
+    assert matrix.row(BROKEN) == {APT: 0, USDC: 1}
+
+
+class WalletsNode(httpx.AsyncBaseTransport):
+    """
+    /accounts/{address}/resources of FUNDED, 404 for UNFUNDED and 500 for BROKEN
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        address = request.url.path.split('/accounts/', 1)[1].split('/', 1)[0]
+        if address == wallet_key(FUNDED):
+            resources = [coin_store(APT, 10 ** 8), coin_store(STAPT, 3)]
+            return httpx.Response(200, json=resources, headers={'X-Aptos-Ledger-Version': '77'})
+        if address == wallet_key(UNFUNDED):
+            return httpx.Response(404, json={'error_code': 'account_not_found'})
+        return httpx.Response(500, json={'message': 'internal error'})
+
+
+def test_scan_reads_each_wallet_once():
+    async def run():
+        url = 'http://wallets.invalid/v1'
+        async with CustomRestClient(url, transport=WalletsNode(), max_retries=0) as client:
+            return await scan_balances(client, [FUNDED, UNFUNDED, BROKEN], [APT, USDC])
+
+    matrix = asyncio.run(run())
+    assert matrix.row(FUNDED) == {APT: 10 ** 8, USDC: 0}
+    # never funded holds nothing, a failed read is unknown
+    assert matrix.row(UNFUNDED) == {APT: 0, USDC: 0}
+    assert matrix.row(BROKEN) is None
+    assert matrix.ledger_versions[0] == 77
@@ -0,0 +1,106 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from utils.batch import ABORTED, get_amounts_out
+from utils.executor import QuoteExecutor, QuoteJob, run_job
+from utils.int_math import U64_MAX, U128_MAX, get_amount_out
+
+POOL_TYPES = ['Uncorrelated', 'Stable']
+
+
+def scalar_outputs(pool_type, amounts, reserve_in, reserve_out, scale_in, scale_out, fee):
+    return [get_amount_out(pool_type, amount, reserve_in, reserve_out, scale_in, scale_out, fee) for amount in amounts]
+
+
+@pytest.mark.parametrize('pool_type', POOL_TYPES)
+def test_random_pools_match_int_math(pool_type):
+    generator = random.Random(1)
+    for _ in range(200):
+        scale_in, scale_out = 10 ** generator.choice([6, 8]), 10 ** generator.choice([6, 8])
+        reserve_in, reserve_out = generator.randrange(10 ** 6, 10 ** 16), generator.randrange(10 ** 6, 10 ** 16)
+        fee = generator.randrange(1, 100)
+        amounts = [generator.randrange(1, reserve_in) for _ in range(4)]
+
+        expected = scalar_outputs(pool_type, amounts, reserve_in, reserve_out, scale_in, scale_out, fee)
+        batch = get_amounts_out(pool_type, amounts, reserve_in, reserve_out, scale_in, scale_out, fee)
+        assert [int(amount) for amount in batch] == expected
+
+
+@pytest.mark.parametrize('pool_type', POOL_TYPES)
+@pytest.mark.parametrize('reserve', [2 ** 63 - 1, 2 ** 63 + 10 ** 12, U64_MAX // 2 + 10 ** 15])
+def test_reserves_past_int64_match_int_math(pool_type, reserve):
+    amounts = (10 ** 8, 10 ** 15)
+    expected = scalar_outputs(pool_type, amounts, reserve, reserve - 10 ** 12, 10 ** 8, 10 ** 8, 30)
+
+    job = QuoteJob(pool_type, amounts, reserve, reserve - 10 ** 12, 10 ** 8, 10 ** 8, 30)
+    assert run_job(job) == expected
+    # numpy stores such reserves as uint64
+    reserves = np.array([reserve, reserve], dtype=np.uint64)
+    batch = get_amounts_out(pool_type, list(amounts), reserves, reserves - np.uint64(10 ** 12), 10 ** 8, 10 ** 8, 30)
+    assert [int(amount) for amount in batch] == expected
+
+
+def test_python_ints_spanning_int64_and_uint64_stay_exact():
+    amounts = [10 ** 8, U64_MAX // 4]
+    reserve = [U64_MAX // 2, U64_MAX // 2]
+    expected = scalar_outputs('Uncorrelated', amounts, U64_MAX // 2, U64_MAX // 2, None, None, 30)
+    assert [int(amount) for amount in get_amounts_out('Uncorrelated', amounts, reserve, reserve, 1, 1, 30)] == expected
+
+
+def test_floats_are_refused():
+    with pytest.raises(TypeError):
+        get_amounts_out('Uncorrelated', [1.5e8], 10 ** 12, 10 ** 12, 1, 1, 30)
+
+
+def scalar_or_aborted(pool_type, amount, *pool) -> int:
+    try:
+        return get_amount_out(pool_type, amount, *pool)
+    except (OverflowError, ZeroDivisionError):
+        return ABORTED
+
+
+# (pool_type, amounts, reserve_in, reserve_out, scale_in, scale_out, fee), each with lanes the contract aborts
+OVERFLOW_POOLS = [
+    # output past u64
+    ('Uncorrelated', [10 ** 8, U64_MAX // 2, U64_MAX], 1, 2 ** 80, None, None, 30),
+    # empty pool
+    ('Uncorrelated', [0, 1], 0, 10 ** 12, None, None, 30),
+    # amount times the fee multiplier past u128
+    ('Stable', [10 ** 8, U128_MAX // 9995 + 1], 10 ** 12, 10 ** 12, 10 ** 8, 10 ** 8, 5),
+    # lp value past u256
+    ('Stable', [10 ** 8], 2 ** 64 - 1, 2 ** 64 - 1, 1, 1, 5),
+    # output past u64 on a skewed stable pool
+    ('Stable', [10 ** 8, U64_MAX], 10 ** 6, U64_MAX, 10 ** 6, 10 ** 8, 5),
+]
+
+
+@pytest.mark.parametrize('pool', OVERFLOW_POOLS)
+def test_lanes_the_contract_aborts_are_marked(pool):
+    pool_type, amounts, *rest = pool
+    expected = [scalar_or_aborted(pool_type, amount, *rest) for amount in amounts]
+    assert ABORTED in expected
+
+    assert [int(amount) for amount in get_amounts_out(pool_type, amounts, *rest)] == expected
+
+
+@pytest.mark.parametrize('pool', OVERFLOW_POOLS)
+def test_executor_quotes_match_inline_at_the_overflow_boundary(pool):
+    pool_type, amounts, *rest = pool
+    job = QuoteJob(pool_type, tuple(amounts), *rest)
+    expected = [scalar_or_aborted(pool_type, amount, *rest) for amount in amounts]
+    expected = [None if amount_out == ABORTED else amount_out for amount_out in expected]
+
+    executor = QuoteExecutor('thread', max_workers=1)
+    try:
+        assert run_job(job) == expected
+        assert asyncio.run(executor.quote(job)) == expected
+    finally:
+        executor.shutdown()
+
+
+def test_executor_drops_outputs_past_u64():
+    job = QuoteJob('Uncorrelated', (U64_MAX // 2,), 1, 2 ** 80, None, None, 30)
+    assert run_job(job) == [None]
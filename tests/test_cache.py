@@ -0,0 +1,113 @@
+import asyncio
+
+from utils.cache import AsyncTTLCache
+
+
+class Node:
+    """
+    Fetches answering with the number of the read, ledger version 10 + that number, after `release`
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.release = asyncio.Event()
+
+    async def fetch(self):
+        self.reads += 1
+        read = self.reads
+        await self.release.wait()
+        return read, 10 + read
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def run():
+        cache, node = AsyncTTLCache(ttl=60, maxsize=8), Node()
+        tasks = [asyncio.create_task(cache.get_or_fetch('pool', node.fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        node.release.set()
+        return await asyncio.gather(*tasks), node.reads
+
+    assert asyncio.run(run()) == ([1, 1, 1], 1)
+
+
+def test_followers_survive_the_leader_being_cancelled():
+    async def run():
+        cache, node = AsyncTTLCache(ttl=60, maxsize=8), Node()
+        leader = asyncio.create_task(cache.get_or_fetch('pool', node.fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.get_or_fetch('pool', node.fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        node.release.set()
+        return leader.cancelled(), await asyncio.gather(*followers), node.reads
+
+    cancelled, values, reads = asyncio.run(run())
+    assert cancelled
+    # one follower fetched again for both
+    assert values == [2, 2] and reads == 2
+
+
+def test_newer_ledger_version_does_not_join_an_older_fetch():
+    async def run():
+        cache, node = AsyncTTLCache(ttl=60, maxsize=8), Node()
+        old = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=5))
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=12))
+        same = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=12))
+        older = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=3))
+        await asyncio.sleep(0)
+        node.release.set()
+        return await asyncio.gather(old, newer, same, older), node.reads
+
+    values, reads = asyncio.run(run())
+    # the version 12 callers share the second read, the version 3 one joins it as the newest fetch of the key
+    assert values == [1, 2, 2, 2] and reads == 2
+
+
+class SlowFirstNode:
+    """
+    The first read answers last: each read waits for its own event
+    """
+
+    def __init__(self, ledger_versions: list[int | None]):
+        self.ledger_versions = ledger_versions
+        self.releases = [asyncio.Event() for _ in ledger_versions]
+        self.reads = 0
+
+    async def fetch(self):
+        read = self.reads
+        self.reads += 1
+        await self.releases[read].wait()
+        return read + 1, self.ledger_versions[read]
+
+
+def late_fetch(ledger_versions: list[int | None]):
+    async def run():
+        cache, node = AsyncTTLCache(ttl=60, maxsize=8), SlowFirstNode(ledger_versions)
+        slow = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=5))
+        await asyncio.sleep(0)
+        fast = asyncio.create_task(cache.get_or_fetch('pool', node.fetch, min_ledger_version=12))
+        await asyncio.sleep(0)
+
+        node.releases[1].set()
+        fast_value = await fast
+        node.releases[0].set()
+        return await slow, fast_value, cache.get('pool')
+
+    return asyncio.run(run())
+
+
+def test_late_fetch_does_not_replace_a_newer_ledger_version():
+    # the slow caller still gets its own read, the cache keeps the version 12 one
+    assert late_fetch([11, 12]) == (1, 2, 2)
+
+
+def test_late_fetch_without_ledger_versions_does_not_replace_a_later_one():
+    assert late_fetch([None, None]) == (1, 2, 2)
+
+
+def test_late_fetch_of_a_newer_ledger_version_is_kept():
+    # the node answering the second read lagged behind
+    assert late_fetch([13, 12]) == (1, 2, 1)
@@ -0,0 +1,46 @@
+import pytest
+
+from contracts.base import coin_sort_key, is_sorted
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+USDT = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDT'
+WH_USDC = '0x5e156f1207d0ebfa19a9eeff00d62a282278fb8719f4fab3a586a0a2c0fffbea::coin::T'
+STAPT = '0xd11107bdf0d6d7040c6c0bfbdecb6545191fdf13e8d8d259952f53e1713f61b5::staked_coin::StakedAptos'
+
+# LiquidityPool<X, Y, Curve> of mainnet Liquidswap pools, X first
+ON_CHAIN_PAIRS = [
+    (USDC, APT),
+    (WH_USDC, APT),
+    (APT, STAPT),
+    (USDC, USDT),
+]
+
+
+@pytest.mark.parametrize('coin_x, coin_y', ON_CHAIN_PAIRS)
+def test_known_pools_are_sorted(coin_x, coin_y):
+    assert is_sorted(coin_x, coin_y)
+    assert not is_sorted(coin_y, coin_x)
+
+
+def test_struct_name_compares_length_first():
+    # BCS prefixes the length, so a shorter name comes first whatever its letters
+    assert is_sorted('0x1::coin::ZZZ', '0x1::coin::AAAA')
+    assert is_sorted('0x1::coin::AAA', '0x1::coin::AAB')
+
+
+def test_module_name_breaks_a_struct_tie():
+    assert is_sorted('0x2::zz::Coin', '0x1::aaa::Coin')
+    assert is_sorted('0x2::aa::Coin', '0x1::ab::Coin')
+
+
+def test_address_breaks_a_struct_and_module_tie():
+    assert is_sorted('0x1::coin::Coin', '0x2::coin::Coin')
+    # addresses compare as 32 bytes, not as strings
+    assert is_sorted('0x2::coin::Coin', '0x10::coin::Coin')
+    assert coin_sort_key('0x01::coin::Coin') == coin_sort_key('0x1::coin::Coin')
+
+
+def test_a_coin_with_itself_is_refused():
+    with pytest.raises(ValueError):
+        is_sorted(APT, '0x01::aptos_coin::AptosCoin')
@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+from aptos_sdk.account import Account
+from aptos_sdk.async_client import ApiError
+from aptos_sdk.bcs import Deserializer
+from aptos_sdk.transactions import SignedTransaction
+
+from aptos_rest_client import CustomRestClient
+from liquidswap.config import POOLS_INFO
+from liquidswap.execution import SequenceManager, TransactionPipeline, swap_template
+from tests.mock_chain import APT, USDC, MockChainTransport
+
+
+class LostAnswerTransport(httpx.AsyncBaseTransport):
+    """
+    Sends the first transaction submit twice and answers with the second response,
+    like a retry after the answer to a submit that landed got lost
+    """
+
+    def __init__(self, chain: MockChainTransport):
+        self.chain = chain
+        self.duplicated = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == 'POST' and not self.duplicated:
+            self.duplicated = True
+            body = await request.aread()
+            await self.chain.handle_async_request(request)
+            retry = httpx.Request(request.method, request.url, headers=request.headers, content=body)
+            return await self.chain.handle_async_request(retry)
+        return await self.chain.handle_async_request(request)
+
+
+class SequenceErrorTransport(httpx.AsyncBaseTransport):
+    """
+    Answers the submit of one sequence number with a sequence error without sending it
+    """
+
+    def __init__(self, chain: MockChainTransport, sequence_number: int):
+        self.chain = chain
+        self.sequence_number = sequence_number
+        self.failed = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == 'POST' and not self.failed:
+            signed = SignedTransaction.deserialize(Deserializer(await request.aread()))
+            if signed.transaction.sequence_number == self.sequence_number:
+                self.failed = True
+                return httpx.Response(400, json={"message": "SEQUENCE_NUMBER_TOO_NEW"})
+        return await self.chain.handle_async_request(request)
+
+
+def payload(amount: int):
+    template = swap_template('v0.5', POOLS_INFO['v0.5']['router_address'], 'swap', APT, USDC, 'Uncorrelated')
+    return template.payload(amount, 1)
+
+
+def test_submit_landed_before_sequence_error_is_not_sent_again():
+    async def run():
+        chain = MockChainTransport(latency=0, block_time=0)
+        url = 'http://lost-answer.invalid/v1'
+        async with CustomRestClient(url, transport=LostAnswerTransport(chain), max_retries=0) as client:
+            pipeline = TransactionPipeline(client, Account.generate(), confirm_interval=0.01)
+            submitted = await pipeline.submit(payload(1000))
+            result = await submitted.result
+            await pipeline.close()
+        return chain, submitted, result, pipeline
+
+    chain, submitted, result, pipeline = asyncio.run(run())
+    assert result.success
+    assert submitted.sequence_number == 0
+    # the duplicate answered SEQUENCE_NUMBER_TOO_OLD, only the first copy committed
+    assert len(chain.committed) == 1
+    assert pipeline.sequence.resyncs == 0
+
+
+def test_resync_keeps_pending_sequence_numbers():
+    async def run():
+        chain = MockChainTransport(latency=0, block_time=60)
+        url = 'http://sequence-error.invalid/v1'
+        async with CustomRestClient(url, transport=SequenceErrorTransport(chain, 3), max_retries=0) as client:
+            pipeline = TransactionPipeline(client, Account.generate(), confirm_interval=60)
+            submitted = [await pipeline.submit(payload(1000 + i)) for i in range(4)]
+            await pipeline.close()
+        return submitted, pipeline
+
+    submitted, pipeline = asyncio.run(run())
+    # nothing committed on chain, yet 0 to 2 are still in the mempool
+    assert [item.sequence_number for item in submitted] == [0, 1, 2, 3]
+    assert pipeline.sequence.resyncs == 1
+
+
+class RefusingTransport(httpx.AsyncBaseTransport):
+    """
+    Refuses the first transaction submit with an error that isn't about its sequence number
+    """
+
+    def __init__(self, chain: MockChainTransport):
+        self.chain = chain
+        self.refused = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == 'POST' and not self.refused:
+            self.refused = True
+            return httpx.Response(400, json={"message": "INSUFFICIENT_BALANCE_FOR_TRANSACTION_FEE"})
+        return await self.chain.handle_async_request(request)
+
+
+def test_refused_submit_leaves_no_sequence_gap():
+    async def run():
+        chain = MockChainTransport(latency=0, block_time=0)
+        url = 'http://refused-submit.invalid/v1'
+        async with CustomRestClient(url, transport=RefusingTransport(chain), max_retries=0) as client:
+            pipeline = TransactionPipeline(client, Account.generate(), confirm_interval=0.01)
+            with pytest.raises(ApiError, match='INSUFFICIENT_BALANCE'):
+                await pipeline.submit(payload(1000))
+            submitted = [await pipeline.submit(payload(1001 + i)) for i in range(2)]
+            # behind a gap they would wait for an expiry instead
+            results = [await asyncio.wait_for(item.result, 5) for item in submitted]
+            await pipeline.close()
+        return submitted, results, pipeline
+
+    submitted, results, pipeline = asyncio.run(run())
+    assert [item.sequence_number for item in submitted] == [0, 1]
+    assert all(result.success for result in results)
+    assert pipeline.sequence.resyncs == 0
+
+
+def test_released_sequence_number_is_reused_first():
+    async def run():
+        chain = MockChainTransport(latency=0, block_time=0)
+        url = 'http://released-sequence.invalid/v1'
+        async with CustomRestClient(url, transport=chain, max_retries=0) as client:
+            sequence = SequenceManager(client, Account.generate().address())
+            handed_out = [await sequence.next() for _ in range(3)]
+            sequence.release(1)
+            reused = await sequence.next()
+            sequence.release(2)
+            last = await sequence.next()
+        return handed_out, reused, last
+
+    assert asyncio.run(run()) == ([0, 1, 2], 1, 2)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from liquidswap.history import HistoryRecorder, ReserveHistory
+from liquidswap.pools import PoolState
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+
+
+def state(ledger_version: int, reserve_in: int, pool_type: str = 'Uncorrelated') -> PoolState:
+    return PoolState('v0', pool_type, reserve_in, 5 * 10 ** 10, 30, ledger_version)
+
+
+def test_reopened_recorder_does_not_repeat_the_last_rows(tmp_path):
+    recorder = HistoryRecorder(tmp_path)
+    assert recorder.record(state(1, 10 ** 12), APT, USDC)
+    assert recorder.record(state(2, 10 ** 12 + 1), APT, USDC)
+    assert recorder.record(state(2, 10 ** 11, 'Stable'), APT, USDC)
+    recorder.close()
+
+    reopened = HistoryRecorder(tmp_path)
+    assert not reopened.record(state(2, 10 ** 12 + 1), APT, USDC)
+    assert not reopened.record(state(2, 10 ** 11, 'Stable'), APT, USDC)
+    assert reopened.record(state(3, 10 ** 12 + 2), APT, USDC)
+    reopened.close()
+
+    assert len(ReserveHistory(tmp_path)) == 4
+
+
+def test_replay_quotes_the_latest_row_of_each_pool(tmp_path):
+    recorder = HistoryRecorder(tmp_path)
+    recorder.record(state(10, 10 ** 12), APT, USDC)
+    recorder.record(state(20, 2 * 10 ** 12), APT, USDC)
+    recorder.close()
+
+    [chunk] = ReserveHistory(tmp_path).replay(APT, USDC, [10 ** 8], 10 ** 8, 10 ** 6)
+    assert chunk.ledger_versions.tolist() == [10, 20]
+    # twice the APT reserve pays about half the USDC
+    first, second = chunk.amounts_in[:, 0, 0]
+    assert np.isclose(first / second, 2, rtol=1e-3)
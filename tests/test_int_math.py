@@ -0,0 +1,104 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from utils import int_math
+from utils import math as decimal_math
+from utils.int_math import U64_MAX, U128_MAX
+
+# fixtures of the utils.math __main__ block
+UNCORRELATED = (1000000000, 574779000000, 33407640000, 30)
+STABLE = (100000000, 33345610000, 575625000000, 10 ** 6, 10 ** 8, 5)
+
+
+def random_pools(seed: int, count: int, max_reserve: int):
+    generator = random.Random(seed)
+    for _ in range(count):
+        reserve_in = generator.randrange(10 ** 8, max_reserve)
+        reserve_out = generator.randrange(10 ** 8, max_reserve)
+        yield (
+            generator.randrange(1, reserve_in // 10),
+            reserve_in,
+            reserve_out,
+            10 ** generator.choice([6, 8]),
+            10 ** generator.choice([6, 8]),
+            generator.randrange(1, 100),
+        )
+
+
+def decimals(*values) -> list[Decimal]:
+    return [Decimal(value) for value in values]
+
+
+def test_uncorrelated_fixture():
+    assert int_math.get_coins_out_with_fees(*UNCORRELATED) == 57847873
+    assert int_math.get_coins_out_with_fees(*UNCORRELATED) == int(
+        decimal_math._get_coins_out_with_fees(*decimals(*UNCORRELATED))
+    )
+
+
+def test_uncorrelated_matches_decimal():
+    for coin_in, reserve_in, reserve_out, _, _, fee in random_pools(0, 2000, 10 ** 16):
+        expected = decimal_math._get_coins_out_with_fees(*decimals(coin_in, reserve_in, reserve_out, fee))
+        assert int_math.get_coins_out_with_fees(coin_in, reserve_in, reserve_out, fee) == int(expected)
+
+
+def test_decimal_uncorrelated_charges_one_extra_basis_point():
+    # utils.math.get_coins_out_with_fees quotes with fee + 1, the contract charges fee as is
+    for coin_in, reserve_in, reserve_out, _, _, fee in random_pools(1, 2000, 10 ** 16):
+        extra = decimal_math.get_coins_out_with_fees(*decimals(coin_in, reserve_in, reserve_out, fee))
+        assert extra == int_math.get_coins_out_with_fees(coin_in, reserve_in, reserve_out, fee + 1)
+        assert extra <= int_math.get_coins_out_with_fees(coin_in, reserve_in, reserve_out, fee)
+
+
+def test_stable_fixture():
+    expected = decimal_math.get_coins_out_with_fees_stable(*decimals(*STABLE))
+    assert int_math.get_coins_out_with_fees_stable(*STABLE) == int(expected) == 4775362831
+
+
+def test_stable_matches_decimal_within_its_precision():
+    # the Decimal get_y runs at 28 digits and truncates differently, it ends at most a few units low
+    for pool in random_pools(2, 2000, 10 ** 12):
+        exact = int_math.get_coins_out_with_fees_stable(*pool)
+        approximate = int(decimal_math.get_coins_out_with_fees_stable(*decimals(*pool)))
+        assert approximate <= exact <= approximate + 2 + exact // 10 ** 6
+
+
+def test_stable_fee_is_rounded_up():
+    coin_in, reserve_in, reserve_out, scale_in, scale_out, fee = STABLE
+    # 100000001 * 9995 / 10000 isn't whole: the contract keeps the rounded-up amount, the Decimal helper the fraction
+    after_fee = -(-(coin_in + 1) * (int_math.FEE_SCALE - fee) // int_math.FEE_SCALE)
+    assert int_math.get_coins_out_with_fees_stable(coin_in + 1, reserve_in, reserve_out, scale_in, scale_out, fee) == \
+        int_math.coin_out(after_fee, scale_in, scale_out, reserve_in, reserve_out)
+
+
+def test_get_y_matches_decimal_to_one_unit():
+    generator = random.Random(3)
+    for _ in range(500):
+        reserve_in, reserve_out = generator.randrange(10 ** 8, 10 ** 12), generator.randrange(10 ** 8, 10 ** 12)
+        xy = int_math.lp_value(reserve_in, 10 ** 8, reserve_out, 10 ** 8)
+        x0 = reserve_in + generator.randrange(1, reserve_in // 10)
+        exact = int_math.get_y(x0, xy, reserve_out)
+        assert exact - 1 <= int(decimal_math.get_y(*decimals(x0, xy, reserve_out))) <= exact
+
+
+def test_u64_reserves_quote():
+    assert int_math.get_coins_out_with_fees(10 ** 8, U64_MAX, U64_MAX, 30) == 99699999
+    assert int_math.get_coins_out_with_fees(U64_MAX // 2, U64_MAX, U64_MAX, 30) < U64_MAX
+
+
+def test_uncorrelated_output_past_u64_overflows():
+    with pytest.raises(OverflowError):
+        int_math.get_coins_out_with_fees(U64_MAX, 1, 2 ** 80, 30)
+
+
+def test_stable_fee_product_past_u128_overflows():
+    coin_in = U128_MAX // (int_math.FEE_SCALE - 5) + 1
+    with pytest.raises(OverflowError):
+        int_math.get_coins_out_with_fees_stable(coin_in, 10 ** 12, 10 ** 12, 10 ** 8, 10 ** 8, 5)
+
+
+def test_lp_value_past_u256_overflows():
+    with pytest.raises(OverflowError):
+        int_math.lp_value(2 ** 64, 1, 2 ** 64, 1)
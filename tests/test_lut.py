@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from utils.int_math import get_amount_out
+from utils.lut import PriceImpactTable, select_best
+
+
+def random_tables(seed: int, count: int):
+    generator = random.Random(seed)
+    for _ in range(count):
+        pool_type = generator.choice(['Stable', 'Uncorrelated'])
+        reserve_in = generator.randrange(10 ** 6, 10 ** 14)
+        reserve_out = generator.randrange(10 ** 6, 10 ** 14)
+        if pool_type == 'Stable':
+            # stable reserves of one order of magnitude in value
+            reserve_out = max(reserve_in * generator.randrange(1, 100) // 10, 10 ** 6)
+        scale_in, scale_out = 10 ** generator.choice([6, 8]), 10 ** generator.choice([6, 8])
+        fee = generator.randrange(1, 100)
+        yield generator, PriceImpactTable(pool_type, reserve_in, reserve_out, scale_in, scale_out, fee)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_exact_quote_is_within_the_error_bound(seed):
+    for generator, table in random_tables(seed, 25):
+        largest = table.sizes[-1]
+        for _ in range(300):
+            amount = generator.randrange(1, largest * 6 // 5 + 2)
+            exact = get_amount_out(table.pool[0], amount, *table.pool[1:])
+            approx = table.approx(amount)
+            assert abs(exact - approx.amount_out) <= approx.error, (table.pool, amount)
+            if approx.exact:
+                assert approx.amount_out == exact
+
+
+def test_quote_keeps_within_the_allowed_error():
+    for generator, table in random_tables(4, 25):
+        for _ in range(100):
+            amount = generator.randrange(1, table.sizes[-1])
+            exact = get_amount_out(table.pool[0], amount, *table.pool[1:])
+            assert abs(table.quote(amount, max_error=10) - exact) <= 10
+
+
+def test_select_best_matches_exact_selection():
+    generator = random.Random(5)
+    for _ in range(200):
+        reserve_in = generator.randrange(10 ** 10, 10 ** 13)
+        price = generator.uniform(0.5, 2)
+        tables = [
+            PriceImpactTable('Uncorrelated', reserve_in, int(reserve_in * price), None, None, 30),
+            PriceImpactTable('Uncorrelated', reserve_in // 3, int(reserve_in * price * 1.002) // 3, None, None, 25),
+            PriceImpactTable('Stable', reserve_in, int(reserve_in * price), 10 ** 8, 10 ** 8, 4),
+        ]
+        amount = generator.randrange(1, reserve_in // 5)
+        exact = [get_amount_out(table.pool[0], amount, *table.pool[1:]) for table in tables]
+
+        best, amount_out, _ = select_best(tables, amount)
+        assert amount_out == exact[best] == max(exact)
@@ -0,0 +1,51 @@
+from contracts.metadata import TokenMetadataStore, get_metadata_store
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+STAPT = '0xd11107bdf0d6d7040c6c0bfbdecb6545191fdf13e8d8d259952f53e1713f61b5::staked_coin::StakedAptos'
+
+
+def test_coin_info_survives_a_reopen(tmp_path):
+    path = str(tmp_path / 'metadata.sqlite3')
+    store = TokenMetadataStore(path)
+    # as returned by the node: decimals as a number, other CoinInfo fields ignored
+    store.put_many({
+        APT: {'name': 'Aptos Coin', 'symbol': 'APT', 'decimals': 8, 'supply': {'vec': []}},
+        USDC: {'name': 'USDC', 'symbol': 'USDC', 'decimals': '6'},
+    })
+    assert store.get(USDC) == {'name': 'USDC', 'symbol': 'USDC', 'decimals': 6}
+    store.close()
+
+    reopened = TokenMetadataStore(path)
+    assert reopened.get(APT) == {'name': 'Aptos Coin', 'symbol': 'APT', 'decimals': 8}
+    assert reopened.get(USDC)['decimals'] == 6
+    assert reopened.get(STAPT) is None
+    reopened.close()
+
+
+def test_missing_keeps_order_without_duplicates(tmp_path):
+    store = TokenMetadataStore(str(tmp_path / 'metadata.sqlite3'))
+    assert store.missing([USDC, APT, USDC]) == [USDC, APT]
+
+    store.put_many({APT: {'name': 'Aptos Coin', 'symbol': 'APT', 'decimals': 8}})
+    assert store.missing([USDC, APT, STAPT, USDC]) == [USDC, STAPT]
+    assert store.missing([APT]) == []
+    store.close()
+
+
+def test_put_replaces_a_stored_coin(tmp_path):
+    path = str(tmp_path / 'metadata.sqlite3')
+    store = TokenMetadataStore(path)
+    store.put_many({STAPT: {'name': 'old', 'symbol': 'stAPT', 'decimals': 8}})
+    store.put_many({STAPT: {'name': 'Staked Aptos', 'symbol': 'stAPT', 'decimals': 8}})
+    store.close()
+
+    reopened = TokenMetadataStore(path)
+    assert reopened.get(STAPT)['name'] == 'Staked Aptos'
+    reopened.close()
+
+
+def test_one_store_per_path(tmp_path):
+    path = str(tmp_path / 'metadata.sqlite3')
+    assert get_metadata_store(path) is get_metadata_store(path)
+    assert get_metadata_store(str(tmp_path / 'other.sqlite3')) is not get_metadata_store(path)
@@ -0,0 +1,111 @@
+import json
+import math
+
+from utils.metrics import MetricsRegistry
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests', ('endpoint',))
+    histogram = registry.histogram('latency_seconds', 'Latency')
+
+    counter.inc('a')
+    histogram.observe(0.1)
+
+    assert counter.values == {} and histogram.values == {}
+    assert registry.to_prometheus() == (
+        '# HELP liquidswap_requests_total Requests\n# TYPE liquidswap_requests_total counter\n'
+        '# HELP liquidswap_latency_seconds Latency\n# TYPE liquidswap_latency_seconds histogram\n'
+    )
+
+
+def test_metrics_are_declared_once():
+    registry = MetricsRegistry()
+    assert registry.counter('hits', 'Hits') is registry.counter('hits', 'Other help')
+    assert registry.histogram('latency', 'Latency') is registry.histogram('latency', 'Latency')
+
+
+def test_counter_per_label_values():
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter('requests_total', 'Requests', ('endpoint', 'status'))
+    counter.inc('a', 'ok')
+    counter.inc('a', 'ok', amount=2)
+    counter.inc('b', 'error')
+
+    assert counter.values == {('a', 'ok'): 3, ('b', 'error'): 1}
+    assert counter.as_dict() == [
+        {'labels': {'endpoint': 'a', 'status': 'ok'}, 'value': 3},
+        {'labels': {'endpoint': 'b', 'status': 'error'}, 'value': 1},
+    ]
+
+
+def test_histogram_buckets_are_upper_bounds():
+    registry = MetricsRegistry(enabled=True)
+    histogram = registry.histogram('iterations', 'Iterations', ('start',), buckets=(1, 2, 5))
+    for value in (1, 2, 2, 3, 100):
+        histogram.observe(value, 'cold')
+
+    counts, total, count = histogram.values[('cold',)]
+    # le=1, le=2, le=5, +Inf
+    assert counts == [1, 2, 1, 1]
+    assert (total, count) == (108, 5)
+    assert histogram.quantile(0.5, 'cold') == 2
+    assert histogram.quantile(0.99, 'cold') == math.inf
+    assert histogram.quantile(0.5, 'warm') is None
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry(enabled=True, namespace='test')
+    registry.counter('requests_total', 'Requests', ('endpoint',)).inc('http://node/"v1"')
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    assert registry.to_prometheus().splitlines() == [
+        '# HELP test_requests_total Requests',
+        '# TYPE test_requests_total counter',
+        'test_requests_total{endpoint="http://node/\\"v1\\""} 1',
+        '# HELP test_latency_seconds Latency',
+        '# TYPE test_latency_seconds histogram',
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1.0"} 2',
+        'test_latency_seconds_bucket{le="+Inf"} 2',
+        'test_latency_seconds_sum 0.55',
+        'test_latency_seconds_count 2',
+    ]
+
+
+def test_json_export_and_write(tmp_path):
+    registry = MetricsRegistry(enabled=True)
+    registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0)).observe(0.5, 'a')
+
+    snapshot = json.loads(registry.to_json())
+    assert snapshot == {
+        'liquidswap_latency_seconds': {
+            'type': 'histogram',
+            'help': 'Latency',
+            'series': [{
+                'labels': {'endpoint': 'a'},
+                'count': 1,
+                'sum': 0.5,
+                'buckets': {'0.1': 0, '1.0': 1, '+Inf': 0},
+                'p50': 1.0,
+                'p99': 1.0,
+            }],
+        },
+    }
+
+    registry.write(str(tmp_path / 'metrics.json'))
+    registry.write(str(tmp_path / 'metrics.prom'))
+    assert json.loads((tmp_path / 'metrics.json').read_text()) == snapshot
+    assert (tmp_path / 'metrics.prom').read_text() == registry.to_prometheus()
+
+
+def test_reset_keeps_the_declarations():
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter('hits', 'Hits')
+    counter.inc()
+    registry.reset()
+
+    assert counter.values == {}
+    assert 'liquidswap_hits' in registry.snapshot()
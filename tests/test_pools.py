@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from liquidswap.config import POOLS_INFO
+from liquidswap.pools import PoolIndex, PoolState, expand_type, load_pool_index, normalize_type, split_type_args
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+STAPT = '0xd11107bdf0d6d7040c6c0bfbdecb6545191fdf13e8d8d259952f53e1713f61b5::staked_coin::StakedAptos'
+V05 = POOLS_INFO['v0.5']
+
+
+def pool_resource(router: str, coin_x: str, coin_y: str, pool_type: str, reserve_x: int, reserve_y: int,
+                  fee: int = 30) -> dict:
+    return {
+        'type': f'{router}::liquidity_pool::LiquidityPool<{coin_x}, {coin_y}, {router}::curves::{pool_type}>',
+        'data': {'coin_x_reserve': {'value': str(reserve_x)}, 'coin_y_reserve': {'value': str(reserve_y)},
+                 'fee': str(fee)},
+    }
+
+
+@pytest.mark.parametrize('type_tag, expected', [
+    ('0x1::aptos_coin::AptosCoin', '0x1::aptos_coin::AptosCoin'),
+    ('0x0000000000000000000000000000000000000000000000000000000000000001::aptos_coin::AptosCoin',
+     '0x1::aptos_coin::AptosCoin'),
+    ('0x0163DF34fccbf003ce219d3f1d9e70d140b60622cb9dd47599c25fb2f797ba6e::m::S',
+     '0x163df34fccbf003ce219d3f1d9e70d140b60622cb9dd47599c25fb2f797ba6e::m::S'),
+    ('0x1::coin::CoinStore< 0x01::aptos_coin::AptosCoin >', '0x1::coin::CoinStore<0x1::aptos_coin::AptosCoin>'),
+    ('0x0::m::S', '0x0::m::S'),
+])
+def test_normalize_type(type_tag, expected):
+    assert normalize_type(type_tag) == expected
+    assert normalize_type(expected) == expected
+
+
+@pytest.mark.parametrize('type_tag, expected', [
+    # special addresses stay short, every other one is padded to 64 hex chars
+    ('0x1::aptos_coin::AptosCoin', '0x1::aptos_coin::AptosCoin'),
+    ('0x10::m::S', '0x' + '0' * 62 + '10::m::S'),
+    ('0x163df34fccbf003ce219d3f1d9e70d140b60622cb9dd47599c25fb2f797ba6e::m::S<0x1::a::B>',
+     '0x0163df34fccbf003ce219d3f1d9e70d140b60622cb9dd47599c25fb2f797ba6e::m::S<0x1::a::B>'),
+])
+def test_expand_type_inverts_normalize_type(type_tag, expected):
+    assert expand_type(type_tag) == expected
+    assert normalize_type(expand_type(type_tag)) == normalize_type(type_tag)
+
+
+def test_split_type_args_keeps_nested_generics():
+    struct, args = split_type_args('0x1::m::Pool<0x1::a::A,0x2::b::B<0x3::c::C,0x4::d::D>,0x5::e::E>')
+    assert struct == '0x1::m::Pool'
+    assert args == ['0x1::a::A', '0x2::b::B<0x3::c::C,0x4::d::D>', '0x5::e::E']
+    assert split_type_args('0x1::m::S') == ('0x1::m::S', [])
+
+
+def test_index_keeps_liquidity_pools_of_the_router_only():
+    router = str(V05['router_address'])
+    resources = [
+        pool_resource(router, USDC, APT, 'Uncorrelated', 3 * 10 ** 10, 5 * 10 ** 11),
+        pool_resource(router, APT, STAPT, 'Stable', 10 ** 12, 9 * 10 ** 11, fee=4),
+        # same struct under another router, and another resource of the account
+        pool_resource(str(POOLS_INFO['v0']['router_address']), USDC, APT, 'Stable', 1, 1),
+        {'type': '0x1::account::Account', 'data': {}},
+    ]
+    index = PoolIndex()
+    added = index.add_resources(V05['resource_address'], V05['router_address'], resources, ledger_version=7)
+
+    assert added == 2 and len(index) == 2
+    assert index.is_loaded(V05['resource_address'])
+    assert not index.is_loaded(POOLS_INFO['v0']['resource_address'])
+
+    state = index.get(V05['resource_address'], USDC, expand_type(APT), 'Uncorrelated')
+    assert state == PoolState('v0.5', 'Uncorrelated', 3 * 10 ** 10, 5 * 10 ** 11, 30, 7)
+    assert index.get(V05['resource_address'], APT, STAPT, 'Stable').fee == 4
+    # stored the other way round, or under another curve
+    assert index.get(V05['resource_address'], APT, USDC, 'Uncorrelated') is None
+    assert index.get(V05['resource_address'], USDC, APT, 'Stable') is None
+
+
+def test_flip_swaps_reserves_and_scales():
+    state = PoolState('v0', 'Stable', 1, 2, 5, 9, scale_in=10 ** 8, scale_out=10 ** 6)
+    flipped = state.flip()
+
+    assert (flipped.reserve_in, flipped.reserve_out, flipped.scale_in, flipped.scale_out) == (2, 1, 10 ** 6, 10 ** 8)
+    assert flipped.flipped and flipped.flip() == state
+
+
+class ResourcesClient:
+    def __init__(self, resources: dict[str, list[dict]]):
+        self.resources = resources
+
+    async def account_resources_all(self, address) -> tuple[list[dict], int]:
+        if str(address) not in self.resources:
+            raise ConnectionError(f'{address} unreachable')
+        return self.resources[str(address)], 42
+
+
+def test_load_pool_index_skips_accounts_that_fail():
+    router = str(V05['router_address'])
+    client = ResourcesClient({
+        str(V05['resource_address']): [pool_resource(router, USDC, APT, 'Uncorrelated', 10, 20)],
+    })
+    index = asyncio.run(load_pool_index(client))
+
+    assert len(index) == 1
+    assert index.ledger_versions == {normalize_type(str(V05['resource_address'])): 42}
+    assert index.get(V05['resource_address'], USDC, APT, 'Uncorrelated').pool_version == 'v0.5'
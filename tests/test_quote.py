@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import quote
+
+
+def records(capsys) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_pairs_path_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    import config
+
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isfile(config.PAIRS_PATH)
+
+
+def test_missing_pairs_file_is_an_error_record(tmp_path, capsys):
+    code = quote.main(['aptos/usdc', '--amount', '100', '--pairs-file', str(tmp_path / 'pairs.json')])
+
+    assert code == 2
+    [record] = records(capsys)
+    assert record['error'].startswith('FileNotFoundError')
+
+
+def test_malformed_order_file_is_an_error_record(tmp_path, capsys):
+    orders = tmp_path / 'orders.jsonl'
+    orders.write_text('{"pair": "aptos/usdc", "amounts": [100]}\n{"pair": "aptos/usdc"}\n')
+    code = quote.main(['--file', str(orders)])
+
+    assert code == 2
+    [record] = records(capsys)
+    assert 'orders.jsonl:2' in record['error']
+
+
+def test_quote_path_leaves_numpy_and_dotenv_unimported(tmp_path):
+    # what quote.py imports once its arguments are parsed, in a fresh interpreter run from a directory
+    # without a .env, as cron does
+    heavy = ['numpy', 'dotenv', 'liquidswap.history', 'utils.executor', 'utils.batch', 'utils.lut', 'utils.split']
+    script = (
+        "import sys\n"
+        "import config, aptos_rest_client, base, contracts.base, liquidswap.pools, liquidswap.swap\n"
+        f"print([name for name in {heavy!r} if name in sys.modules])"
+    )
+    env = {**os.environ, 'PYTHONPATH': str(Path(__file__).parent.parent)}
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from liquidswap.routing import PoolEdge, RouteGraph
+from utils.int_math import get_amount_out
+
+COINS = [f'0x{address:x}::coin::C{address}' for address in range(1, 9)]
+A, B, C, D, E, F, G, H = COINS
+
+
+def pool(coin_x: str, coin_y: str, reserve_x: int, reserve_y: int, fee: int = 30) -> list[PoolEdge]:
+    return [
+        PoolEdge('v0', 'Uncorrelated', coin_x, coin_y, reserve_x, reserve_y, None, None, fee),
+        PoolEdge('v0', 'Uncorrelated', coin_y, coin_x, reserve_y, reserve_x, None, None, fee),
+    ]
+
+
+def exhaustive_best(edges: list[PoolEdge], coin_from: str, coin_to: str, amount: int, max_hops: int = 3,
+                    max_reserve_share: float = 0.3) -> int | None:
+    """
+    Most coin_to over every simple path and every choice of parallel pools, no pruning
+    """
+    best = None
+
+    def walk(coin: str, visited: set[str], value: int, hops: int):
+        nonlocal best
+        if coin == coin_to:
+            best = value if best is None else max(best, value)
+            return
+        if hops == max_hops:
+            return
+        for edge in edges:
+            if edge.coin_in != coin or edge.coin_out in visited or value > edge.reserve_in * max_reserve_share:
+                continue
+            output = get_amount_out(
+                edge.pool_type, value, edge.reserve_in, edge.reserve_out, edge.scale_in, edge.scale_out, edge.fee
+            )
+            if output:
+                walk(edge.coin_out, visited | {edge.coin_out}, output, hops + 1)
+
+    walk(coin_from, {coin_from}, amount, 0)
+    return best
+
+
+# A-B deep; A-C thin but D-C and A-D deep, so A->C goes through D; F only hangs off C; H only off F
+EDGES = [
+    *pool(A, B, 10 ** 12, 2 * 10 ** 12),
+    *pool(A, C, 10 ** 8, 10 ** 8),
+    *pool(A, D, 10 ** 12, 10 ** 12),
+    *pool(D, C, 10 ** 12, 10 ** 12),
+    *pool(C, F, 10 ** 12, 3 * 10 ** 12),
+    *pool(F, H, 10 ** 12, 10 ** 12),
+]
+
+
+@pytest.mark.parametrize('coin_to, path', [
+    (B, (A, B)),
+    (C, (A, D, C)),
+    (F, (A, D, C, F)),
+])
+def test_best_route_is_the_exhaustive_best(coin_to, path):
+    amount = 10 ** 9
+    route = RouteGraph(EDGES).find_best_route(A, coin_to, amount)
+
+    assert route.path == path
+    assert route.amount_out == amount
+    assert route.amount_in == exhaustive_best(EDGES, A, coin_to, amount)
+
+
+def test_no_route_within_the_hop_limit():
+    graph = RouteGraph(EDGES)
+
+    # H is four hops away, G isn't pooled at all
+    assert graph.find_best_route(A, H, 10 ** 9) is None
+    assert exhaustive_best(EDGES, A, H, 10 ** 9) is None
+    assert graph.find_best_route(A, G, 10 ** 9) is None
+    # too large for every pool out of A
+    assert graph.find_best_route(A, B, 10 ** 12) is None
+
+
+def test_random_graphs_match_exhaustive_search():
+    generator = random.Random(3)
+    for _ in range(100):
+        edges = []
+        for _ in range(generator.randrange(4, 12)):
+            coin_x, coin_y = generator.sample(COINS[:6], 2)
+            edges.extend(pool(coin_x, coin_y, generator.randrange(10 ** 6, 10 ** 12),
+                              generator.randrange(10 ** 6, 10 ** 12), generator.choice([5, 30, 100])))
+        coin_from, coin_to = generator.sample(COINS[:6], 2)
+        amount = generator.randrange(1, 10 ** 10)
+
+        route = RouteGraph(edges).find_best_route(coin_from, coin_to, amount)
+        expected = exhaustive_best(edges, coin_from, coin_to, amount)
+        assert (route and route.amount_in) == expected
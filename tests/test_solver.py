@@ -0,0 +1,91 @@
+import random
+
+from liquidswap.pools import PoolState
+from utils import int_math
+from utils import solver as solver_module
+from utils.int_math import lp_value
+from utils.solver import StableCurveSolver
+from utils.split import split_amount
+
+
+def sweep(seed: int):
+    generator = random.Random(seed)
+    reserve_in = generator.randrange(10 ** 8, 10 ** 13)
+    reserve_out = reserve_in * generator.randrange(5, 20) // 10
+    sizes = sorted(generator.randrange(1, reserve_in // 5) for _ in range(50))
+    return reserve_in, reserve_out, sizes
+
+
+def test_cold_solver_is_get_y_whatever_was_solved_before():
+    solver = StableCurveSolver(warm_start=False)
+    for seed in range(20):
+        reserve_in, reserve_out, sizes = sweep(seed)
+        for size in sizes:
+            assert int_math.get_coins_out_with_fees_stable(
+                size, reserve_in, reserve_out, 10 ** 8, 10 ** 6, 5, solver=solver.get_y
+            ) == int_math.get_coins_out_with_fees_stable(size, reserve_in, reserve_out, 10 ** 8, 10 ** 6, 5)
+    assert solver.warm_starts == 0 and solver.solves == 20 * 50
+
+
+def test_warm_start_only_within_one_pool_state():
+    solver = StableCurveSolver()
+    reserve_in, reserve_out, sizes = sweep(0)
+    xy = lp_value(reserve_in, 10 ** 8, reserve_out, 10 ** 8)
+    solver.get_y(reserve_in + sizes[0], xy, reserve_out)
+    solver.get_y(reserve_in + sizes[0] + 1, xy, reserve_out)
+    assert solver.warm_starts == 1
+
+    # same x0, other reserves
+    solver.get_y(reserve_in + sizes[0] + 1, xy + 1, reserve_out)
+    assert solver.warm_starts == 1
+
+
+def test_warm_sweep_saves_iterations():
+    warm, cold = StableCurveSolver(), StableCurveSolver(warm_start=False)
+    for seed in range(20):
+        reserve_in, reserve_out, sizes = sweep(seed)
+        xy = lp_value(reserve_in, 10 ** 8, reserve_out, 10 ** 8)
+        for size in sizes:
+            expected = cold.get_y(reserve_in + size, xy, reserve_out)
+            assert abs(warm.get_y(reserve_in + size, xy, reserve_out) - expected) <= 1
+    assert warm.total_iterations < cold.total_iterations
+
+
+def stable_pools(seed: int):
+    generator = random.Random(seed)
+    pools = []
+    for _ in range(3):
+        reserve_in = generator.randrange(10 ** 10, 10 ** 13)
+        reserve_out = reserve_in * generator.randrange(8, 12) // 10
+        pools.append(PoolState('v0.5', 'Stable', reserve_in, reserve_out, 5, 1, False, 10 ** 8, 10 ** 6))
+    return pools
+
+
+def test_split_search_warm_starts_and_quotes_the_allocation_cold(monkeypatch):
+    iterations = []
+    get_y_iterations = int_math.get_y_iterations
+
+    def counting(x0, xy, y):
+        result = get_y_iterations(x0, xy, y)
+        iterations.append(result[1])
+        return result
+
+    monkeypatch.setattr(int_math, 'get_y_iterations', counting)
+    monkeypatch.setattr(solver_module, 'get_y_iterations', counting)
+
+    for seed in range(10):
+        pools = stable_pools(seed)
+        iterations.clear()
+        cold = split_amount(10 ** 10, pools, warm_start=False)
+        cold_iterations = sum(iterations)
+
+        iterations.clear()
+        warm = split_amount(10 ** 10, pools)
+        assert sum(iterations) < cold_iterations
+
+        for pool, amount_in, amount_out in zip(pools, warm.allocation, warm.amounts_out):
+            assert amount_out == (amount_in and int_math.get_amount_out(
+                'Stable', amount_in, pool.reserve_in, pool.reserve_out, pool.scale_in, pool.scale_out, pool.fee
+            ))
+        # a warm quote a unit off can tip a step of the search, not the result
+        assert abs(warm.total_out - cold.total_out) <= len(pools)
@@ -0,0 +1,46 @@
+import pytest
+
+from liquidswap.pools import PoolState
+from utils.int_math import get_amount_out
+from utils.split import split_amount
+
+TWO_POOLS = [
+    PoolState('v0', 'Uncorrelated', 10 ** 12, 5 * 10 ** 10, 30, scale_in=10 ** 8, scale_out=10 ** 6),
+    PoolState('v0.5', 'Uncorrelated', 6 * 10 ** 11, 3 * 10 ** 10, 25, scale_in=10 ** 8, scale_out=10 ** 6),
+]
+STABLE_POOLS = [
+    PoolState('v0', 'Stable', 10 ** 12, 10 ** 10, 4, scale_in=10 ** 8, scale_out=10 ** 6),
+    PoolState('v0.5', 'Stable', 4 * 10 ** 11, 4 * 10 ** 9, 5, scale_in=10 ** 8, scale_out=10 ** 6),
+]
+
+
+def single_pool_quote(pool: PoolState, amount: int) -> int:
+    return get_amount_out(pool.pool_type, amount, pool.reserve_in, pool.reserve_out, pool.scale_in, pool.scale_out,
+                          pool.fee)
+
+
+@pytest.mark.parametrize('pools', [TWO_POOLS, STABLE_POOLS])
+@pytest.mark.parametrize('approximate', [False, True])
+def test_split_beats_every_single_pool(pools, approximate):
+    amount = 10 ** 11
+    split = split_amount(amount, pools, approximate=approximate)
+
+    assert sum(split.allocation) == amount
+    assert all(split.allocation)
+    assert split.total_out == sum(split.amounts_out)
+    # amounts_out are the exact quotes of the allocation
+    assert split.amounts_out == [single_pool_quote(pool, value) for pool, value in zip(pools, split.allocation)]
+    assert split.total_out > max(single_pool_quote(pool, amount) for pool in pools)
+
+
+@pytest.mark.parametrize('amount', [1, 7, 31, 33, 10 ** 9 + 3])
+def test_split_hands_out_the_whole_amount(amount):
+    split = split_amount(amount, TWO_POOLS)
+    assert sum(split.allocation) == amount
+
+
+def test_one_pool_takes_everything():
+    split = split_amount(10 ** 9, TWO_POOLS[:1])
+    assert split.allocation == [10 ** 9]
+    assert split.total_out == single_pool_quote(TWO_POOLS[0], 10 ** 9)
+
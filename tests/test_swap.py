@@ -0,0 +1,171 @@
+import asyncio
+
+import httpx
+
+from aptos_rest_client import CustomRestClient, HTTP_POOL
+from base import ModuleBase
+from contracts.base import TokenBase
+from liquidswap.config import POOLS_INFO
+from liquidswap.pools import PoolIndex, PoolState, normalize_type
+from liquidswap.swap import LiquidSwapCurve
+from utils.cache import AsyncTTLCache
+from utils.int_math import U64_MAX
+
+APT = '0x1::aptos_coin::AptosCoin'
+USDC = '0xf22bede237a07e121b56d91a491eb7bcdfd1f5907926a9e58338f964a01b17fa::asset::USDC'
+
+
+def make_index(states: dict[tuple[str, str], PoolState]) -> PoolIndex:
+    """
+    Index of APT/USDC pools, keyed by (pool_version, pool_type)
+    """
+    index = PoolIndex()
+    for pool_version, info in POOLS_INFO.items():
+        account = normalize_type(str(info['resource_address']))
+        index.ledger_versions[account] = 1
+        for pool_type in info['types']:
+            state = states.get((pool_version, pool_type))
+            if state is not None:
+                index.pools[(account, normalize_type(APT), normalize_type(USDC), pool_type)] = state
+    return index
+
+
+def curve(index: PoolIndex, **kwargs) -> LiquidSwapCurve:
+    return LiquidSwapCurve(
+        None, 'http://offline.invalid/v1', coin_x=TokenBase('aptos', APT), coin_y=TokenBase('usdc', USDC),
+        pool_index=index, **kwargs
+    )
+
+
+def run(coroutine):
+    async def wrapped():
+        try:
+            return await coroutine
+        finally:
+            await HTTP_POOL.close_all()
+    return asyncio.run(wrapped())
+
+
+def test_overflowing_pool_is_skipped():
+    index = make_index({
+        ('v0', 'Uncorrelated'): PoolState('v0', 'Uncorrelated', 10 ** 12, 5 * 10 ** 10, 30),
+        # receives more than u64 can hold, the contract would abort
+        ('v0.5', 'Uncorrelated'): PoolState('v0.5', 'Uncorrelated', 1, 2 ** 80, 30),
+    })
+    module = curve(index)
+    amount_in = run(module.get_most_profitable_amount_in_and_set_pool_type(U64_MAX // 2, APT, USDC, 8, 6))
+
+    assert (module.pool_version, module.pool_type) == ('v0', 'Uncorrelated')
+    assert amount_in > 0
+
+
+def test_approximate_selection_matches_exact_selection():
+    index = make_index({
+        ('v0', 'Uncorrelated'): PoolState('v0', 'Uncorrelated', 10 ** 12, 5 * 10 ** 10, 30),
+        ('v0.5', 'Uncorrelated'): PoolState('v0.5', 'Uncorrelated', 3 * 10 ** 11, 15 * 10 ** 9 + 10 ** 7, 25),
+        ('v0.5', 'Stable'): PoolState('v0.5', 'Stable', 10 ** 12, 5 * 10 ** 10, 4),
+    })
+    for amount in [10 ** 6, 10 ** 9, 5 * 10 ** 10, 2 * 10 ** 11]:
+        exact, approximate = curve(index), curve(index)
+        amount_in = run(exact.get_most_profitable_amount_in_and_set_pool_type(amount, APT, USDC, 8, 6))
+        approximate_in = run(approximate.get_most_profitable_amount_in_and_set_pool_type(
+            amount, APT, USDC, 8, 6, approximate=True
+        ))
+
+        assert approximate_in == amount_in
+        assert (approximate.pool_version, approximate.pool_type) == (exact.pool_version, exact.pool_type)
+
+
+class PoolNode(httpx.AsyncBaseTransport):
+    """
+    Serves the v0 APT/USDC pool, whose reserves move on the third read, at a new ledger version per request
+    """
+
+    def __init__(self):
+        self.paths: list[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        headers = {'X-Aptos-Ledger-Version': str(len(self.paths))}
+        resource = request.url.path.rpartition('/resource/')[2]
+        if str(POOLS_INFO['v0']['resource_address']) not in request.url.path or 'Uncorrelated' not in resource:
+            return httpx.Response(404, json={'message': 'resource not found'}, headers=headers)
+
+        reads = sum('Uncorrelated' in path and str(POOLS_INFO['v0']['resource_address']) in path for path in self.paths)
+        reserve_y = 5 * 10 ** 10 if reads < 3 else 6 * 10 ** 10
+        # USDC sorts before APT, the pool holds USDC as coin_x
+        data = {'coin_x_reserve': {'value': str(reserve_y)}, 'coin_y_reserve': {'value': str(10 ** 12)}, 'fee': '30'}
+        return httpx.Response(200, json={'type': resource, 'data': data}, headers=headers)
+
+
+def test_watch_polls_only_the_pools():
+    node = PoolNode()
+
+    async def watch():
+        module = curve(None)
+        module.client = CustomRestClient('http://watch.invalid/v1', transport=node, max_retries=0)
+        updates = []
+        async for update in module.watch([10 ** 8], APT, USDC, 8, 6, interval=0):
+            updates.append(update)
+            if len(updates) == 2:
+                return updates
+
+    first, second = run(watch())
+    pools = sum(len(info['types']) for info in POOLS_INFO.values())
+    # no ledger info requests, one read per pool and poll
+    assert all('/resource/' in path for path in node.paths)
+    assert len(node.paths) == 3 * pools
+    assert first.changes[10 ** 8][0] == second.changes[10 ** 8][0] == ('v0', 'Uncorrelated')
+    assert second.changes[10 ** 8][1] > first.changes[10 ** 8][1]
+
+
+def test_exact_out_quotes_pay_at_least_the_target():
+    index = make_index({
+        ('v0', 'Uncorrelated'): PoolState('v0', 'Uncorrelated', 10 ** 12, 5 * 10 ** 10, 30),
+        ('v0.5', 'Stable'): PoolState('v0.5', 'Stable', 10 ** 12, 5 * 10 ** 10, 4),
+    })
+    module = curve(index)
+    info = POOLS_INFO['v0.5']
+    targets = [10 ** 6, 10 ** 8, 10 ** 9]
+    quotes = run(module.get_exact_out_amounts_in(
+        'Stable', info['resource_address'], info['router_address'], targets, APT, USDC, 8, 6
+    ))
+    for target, quote in zip(targets, quotes):
+        assert quote.amount_out >= target
+        assert run(curve(index).get_amount_in(
+            'Stable', info['resource_address'], info['router_address'], quote.amount_in - 1, APT, USDC, 8, 6
+        )) < target
+
+    amount_in = run(module.get_cheapest_exact_out_and_set_pool_type(10 ** 8, APT, USDC, 8, 6))
+    assert amount_in == min(
+        quote.amount_in for quote in [
+            run(curve(index).get_exact_out_amount_in(
+                pool_type, POOLS_INFO[pool_version]['resource_address'], POOLS_INFO[pool_version]['router_address'],
+                10 ** 8, APT, USDC, 8, 6
+            ))
+            for pool_version, pool_type in [('v0', 'Uncorrelated'), ('v0.5', 'Stable')]
+        ]
+    )
+
+
+def test_cached_reserve_reads_are_parsed_per_caller(monkeypatch):
+    monkeypatch.setattr(ModuleBase, 'reserve_cache', AsyncTTLCache(ttl=60, maxsize=8))
+    node = PoolNode()
+    info = POOLS_INFO['v0']
+    payload = f"{info['router_address']}::liquidity_pool::LiquidityPool<{USDC}, {APT}, " \
+              f"{info['router_address']}::curves::Uncorrelated>"
+
+    async def read():
+        module = curve(None)
+        module.client = CustomRestClient('http://parse.invalid/v1', transport=node, max_retries=0)
+        parsed = await module.get_token_reserve(
+            info['resource_address'], payload, parse=lambda resource, version: PoolState.from_resource(
+                resource, 'Uncorrelated', 'v0', version
+            )
+        )
+        raw = await module.get_token_reserve(info['resource_address'], payload)
+        return parsed, raw
+
+    parsed, raw = run(read())
+    assert len(node.paths) == 1
+    assert isinstance(parsed, PoolState) and parsed.reserve_in == int(raw['data']['coin_x_reserve']['value'])
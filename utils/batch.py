@@ -0,0 +1,264 @@
+"""
+Batch quoting over NumPy arrays.
+
+Every argument may be a scalar or an array, they are broadcast together and
+one output is returned per lane. Values are kept as python ints inside
+``object`` arrays whenever they could overflow ``int64``, so results are the
+same as the scalar functions in ``utils.int_math``. Arguments must be
+integers, up to u64 reserves and beyond; floats are refused rather than
+truncated. Lanes are range checked with the bounds of the scalar functions:
+where those raise because the Move contract would abort, the lane is
+ABORTED instead.
+"""
+import numpy as np
+
+from utils.int_math import FEE_SCALE, MAX_GET_Y_ITERATIONS, ONE_E_8, U64_MAX, U128_MAX, U256_MAX
+
+INT64_MAX = 2 ** 63 - 1
+# output of a lane whose swap would abort on chain, real outputs are never negative
+ABORTED = -1
+
+
+def _to_object(value) -> np.ndarray:
+    """
+    Convert scalars or arrays of integers to an object array of python ints.
+    Integer dtypes convert exactly, uint64 included; floats would be truncated and are refused.
+    :param value:
+    :return:
+    """
+    array = np.asarray(value)
+    if array.dtype.kind == 'f' and not isinstance(value, np.ndarray):
+        # numpy turns python ints mixing int64 and uint64 ranges into float64, keep them exact instead
+        array = np.array(value, dtype=object)
+        if not all(isinstance(item, int) for item in array.flat):
+            raise TypeError(f"Expected integers, got {value!r}")
+    if array.dtype == object:
+        return array
+    if array.dtype.kind not in 'iu':
+        raise TypeError(f"Expected integers, got {array.dtype}")
+    return array.astype(object)
+
+
+def _out_of_range(values: np.ndarray, max_value: int) -> np.ndarray:
+    """
+    Lanes outside [0, max_value], like utils.int_math._check
+    :param values:
+    :param max_value:
+    :return:
+    """
+    if values.dtype != object and max_value > INT64_MAX:
+        return values < 0
+    return (values < 0) | (values > max_value)
+
+
+def _abort(values: np.ndarray, aborted: np.ndarray) -> np.ndarray:
+    """
+    values with the aborted lanes set to ABORTED
+    :param values:
+    :param aborted:
+    :return:
+    """
+    if aborted.any():
+        values = np.where(aborted, ABORTED, values)
+    return values
+
+
+def _broadcast(*values) -> list[np.ndarray]:
+    """
+    Broadcast arguments to a common shape as object arrays of python ints
+    :param values:
+    :return:
+    """
+    return [np.array(array) for array in np.broadcast_arrays(*[_to_object(value) for value in values])]
+
+
+def get_coins_out_with_fees_batch(
+        coin_in_val,
+        reserve_in,
+        reserve_out,
+        fee,
+) -> np.ndarray:
+    """
+    Uncorrelated curve output for every lane, ABORTED past u64 or with empty reserves.
+    Runs on int64 when the largest intermediate fits, otherwise on python ints.
+    :param coin_in_val:
+    :param reserve_in:
+    :param reserve_out:
+    :param fee:
+    :return:
+    """
+    coin_in_val, reserve_in, reserve_out, fee = _broadcast(coin_in_val, reserve_in, reserve_out, fee)
+    if coin_in_val.size == 0:
+        return coin_in_val
+
+    bound = max(
+        int(coin_in_val.max()) * FEE_SCALE * int(reserve_out.max()),
+        int(reserve_in.max()) * FEE_SCALE + int(coin_in_val.max()) * FEE_SCALE,
+    )
+    if bound <= INT64_MAX:
+        coin_in_val, reserve_in, reserve_out, fee = (
+            array.astype(np.int64) for array in (coin_in_val, reserve_in, reserve_out, fee)
+        )
+
+    coin_in_val_after_fees = coin_in_val * (FEE_SCALE - fee)
+    new_reserve_in = reserve_in * FEE_SCALE + coin_in_val_after_fees
+    empty = new_reserve_in == 0
+
+    amount_out = coin_in_val_after_fees * reserve_out // np.where(empty, 1, new_reserve_in)
+    return _abort(amount_out, empty | _out_of_range(amount_out, U64_MAX))
+
+
+def lp_value_batch(x_coin, x_scale, y_coin, y_scale) -> np.ndarray:
+    """
+    Liquidity pool value for every lane
+    :param x_coin:
+    :param x_scale:
+    :param y_coin:
+    :param y_scale:
+    :return:
+    """
+    x = x_coin * ONE_E_8 // x_scale
+    y = y_coin * ONE_E_8 // y_scale
+    return x * y * (x * x + y * y)
+
+
+def get_y_batch(x0, xy, y) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Newton's method for y on every lane at once.
+    A lane stops updating as soon as its step is <= 1, exactly like the scalar loop,
+    or as soon as the invariant or its derivative leaves u256, where the scalar loop raises.
+    Returns the solutions, the number of iterations each lane took and the aborted lanes.
+    :param x0:
+    :param xy:
+    :param y:
+    :return:
+    """
+    x0, xy, y = _broadcast(x0, xy, y)
+    iterations = np.zeros(y.shape, dtype=np.int64)
+    aborted = np.zeros(y.shape, dtype=bool)
+    active = np.flatnonzero(np.ones(y.shape, dtype=bool))
+
+    flat_x0, flat_xy, flat_y = x0.ravel(), xy.ravel(), y.ravel()
+    flat_iterations, flat_aborted = iterations.ravel(), aborted.ravel()
+
+    for i in range(MAX_GET_Y_ITERATIONS):
+        if active.size == 0:
+            break
+
+        lane_x0 = flat_x0[active]
+        lane_xy = flat_xy[active]
+        lane_y = flat_y[active]
+
+        k = lane_x0 * lane_y * lane_y * lane_y + lane_x0 * lane_x0 * lane_x0 * lane_y
+        d = 3 * lane_x0 * lane_y * lane_y + lane_x0 * lane_x0 * lane_x0
+
+        overflow = _out_of_range(k, U256_MAX) | _out_of_range(d, U256_MAX) | (d == 0)
+        flat_aborted[active[overflow]] = True
+        d = np.where(overflow, 1, d)
+
+        below = k < lane_xy
+        dy = np.where(below, (lane_xy - k) // d + 1, (k - lane_xy) // d)
+        flat_y[active] = np.where(below, lane_y + dy, lane_y - dy)
+        flat_iterations[active] = i + 1
+
+        active = active[(dy > 1) & ~overflow]
+
+    return y, iterations, aborted
+
+
+def coin_out_batch(coin_in, scale_in, scale_out, reserve_in, reserve_out) -> np.ndarray:
+    """
+    Stable curve output before fees for every lane, ABORTED where utils.int_math.coin_out raises
+    :param coin_in:
+    :param scale_in:
+    :param scale_out:
+    :param reserve_in:
+    :param reserve_out:
+    :return:
+    """
+    coin_in, scale_in, scale_out, reserve_in, reserve_out = _broadcast(
+        coin_in, scale_in, scale_out, reserve_in, reserve_out
+    )
+    xy = lp_value_batch(reserve_in, scale_in, reserve_out, scale_out)
+
+    reserve_in_scaled = reserve_in * ONE_E_8 // scale_in
+    reserve_out_scaled = reserve_out * ONE_E_8 // scale_out
+    amount_in = coin_in * ONE_E_8 // scale_in
+    total_reserve = amount_in + reserve_in_scaled
+    solution, _, aborted = get_y_batch(total_reserve, xy, reserve_out_scaled)
+    y = reserve_out_scaled - solution
+
+    amount_out = y * scale_out // ONE_E_8
+    aborted |= _out_of_range(xy, U256_MAX) | _out_of_range(y, U256_MAX) | _out_of_range(amount_out, U128_MAX)
+    return _abort(amount_out, aborted)
+
+
+def get_coins_out_with_fees_stable_batch(
+        coin_in,
+        reserve_in,
+        reserve_out,
+        scale_in,
+        scale_out,
+        fee,
+) -> np.ndarray:
+    """
+    Stable curve output after fees for every lane, ABORTED where
+    utils.int_math.get_coins_out_with_fees_stable raises
+    :param coin_in:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    coin_in, fee = _broadcast(coin_in, fee)
+    coin_in_val_scaled = coin_in * (FEE_SCALE - fee)
+    coin_in_val_after_fees = coin_in_val_scaled // FEE_SCALE + (coin_in_val_scaled % FEE_SCALE != 0)
+
+    amount_out = coin_out_batch(coin_in_val_after_fees, scale_in, scale_out, reserve_in, reserve_out)
+    fee_aborted = np.broadcast_to(_out_of_range(coin_in_val_scaled, U128_MAX), amount_out.shape)
+    return _abort(amount_out, fee_aborted | _out_of_range(amount_out, U64_MAX))
+
+
+def get_amounts_out(
+        pool_type: str,
+        coin_in,
+        reserve_in,
+        reserve_out,
+        scale_in,
+        scale_out,
+        fee,
+) -> np.ndarray:
+    """
+    Batch counterpart of utils.int_math.get_amount_out, ABORTED on lanes where it raises
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :param coin_in:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    match pool_type:
+        case 'Stable':
+            return get_coins_out_with_fees_stable_batch(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+        case 'Uncorrelated':
+            return get_coins_out_with_fees_batch(coin_in, reserve_in, reserve_out, fee)
+        case _:
+            raise ValueError(f"Unknown pool type: {pool_type}")
+
+
+def get_amounts_out_rows(pool_type: str, rows) -> np.ndarray:
+    """
+    Quote a table of (coin_in, reserve_in, reserve_out, scale_in, scale_out, fee) rows
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :param rows: array-like of shape (n, 6)
+    :return:
+    """
+    columns = _to_object(rows)
+    if columns.ndim != 2 or columns.shape[1] != 6:
+        raise ValueError(f"Expected rows of shape (n, 6), got {columns.shape}")
+
+    return get_amounts_out(pool_type, *columns.T)
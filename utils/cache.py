@@ -0,0 +1,194 @@
+"""
+Async cache for on-chain reads.
+
+Entries expire after ``ttl`` seconds or when a caller asks for a newer ledger
+version than the one they were read at. Concurrent misses on the same key
+share one fetch when it was started for a recent enough ledger version. A
+fetch that finishes late never replaces an entry read at a higher ledger
+version, or, without ledger versions, one from a fetch started after it.
+The least recently used entries are evicted past ``maxsize``. Named caches
+count their hits and misses in utils.metrics.METRICS.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from utils.metrics import METRICS
+
+CACHE_REQUESTS = METRICS.counter('cache_requests_total', 'Cache lookups by outcome', ('cache', 'result'))
+
+
+class _FetchAbandoned(Exception):
+    """
+    The caller fetching for every concurrent caller of a key was cancelled
+    """
+
+
+class AsyncTTLCache:
+    def __init__(self, ttl: float, maxsize: int, name: str = None):
+        """
+        :param ttl: seconds an entry stays fresh
+        :param maxsize: number of entries kept
+        :param name: label of the cache in metrics, not reported when None
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+
+        # key -> (value, fetched_at, ledger_version, generation), generation orders the reads of a key
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int | None, int]] = OrderedDict()
+        self._generations = itertools.count()
+        # key -> (future of the fetch, min_ledger_version it was started for)
+        self._inflight: dict[Hashable, tuple[asyncio.Future, int | None]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, min_ledger_version: int | None = None) -> Any | None:
+        """
+        Fresh cached value or None
+        :param key:
+        :param min_ledger_version: reject entries read at an older ledger version
+        :return:
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, fetched_at, ledger_version, _ = entry
+        if time.monotonic() - fetched_at > self.ttl:
+            del self._entries[key]
+            return None
+        if min_ledger_version is not None and (ledger_version is None or ledger_version < min_ledger_version):
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ledger_version: int | None = None):
+        """
+        Store a value read at ledger_version, unless the key holds a read at a higher one
+        :param key:
+        :param value:
+        :param ledger_version:
+        :return:
+        """
+        self._store(key, value, ledger_version, next(self._generations))
+
+    def _store(self, key: Hashable, value: Any, ledger_version: int | None, generation: int) -> bool:
+        """
+        Stores a read unless the entry of the key is newer: read at a higher ledger version or,
+        when either version is unknown, by a read started after this one
+        :param key:
+        :param value:
+        :param ledger_version:
+        :param generation: taken when the read started
+        :return: whether it was stored
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            _, _, stored_version, stored_generation = entry
+            if ledger_version is not None and stored_version is not None:
+                newer = stored_version > ledger_version
+            else:
+                newer = stored_generation > generation
+            if newer:
+                return False
+
+        self._entries[key] = (value, time.monotonic(), ledger_version, generation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return True
+
+    async def get_or_fetch(
+            self,
+            key: Hashable,
+            fetch: Callable[[], Awaitable[tuple[Any, int | None]]],
+            min_ledger_version: int | None = None
+    ) -> Any:
+        """
+        Cached value, or the result of fetch() shared by every concurrent caller of the same key.
+        fetch returns the value and the ledger version it was read at. Errors are not cached.
+        A caller only joins a fetch started for at least its min_ledger_version, and when the caller
+        fetching for everyone is cancelled the next one waiting fetches instead.
+        :param key:
+        :param fetch:
+        :param min_ledger_version:
+        :return:
+        """
+        while True:
+            value = self.get(key, min_ledger_version)
+            if value is not None:
+                self.hits += 1
+                if METRICS.enabled and self.name:
+                    CACHE_REQUESTS.inc(self.name, 'hit')
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is not None and self._serves(inflight[1], min_ledger_version):
+                self.hits += 1
+                if METRICS.enabled and self.name:
+                    CACHE_REQUESTS.inc(self.name, 'shared')
+                try:
+                    return await asyncio.shield(inflight[0])
+                except _FetchAbandoned:
+                    continue
+
+            self.misses += 1
+            if METRICS.enabled and self.name:
+                CACHE_REQUESTS.inc(self.name, 'miss')
+            return await self._fetch(key, fetch, min_ledger_version)
+
+    @staticmethod
+    def _serves(requested: int | None, min_ledger_version: int | None) -> bool:
+        """
+        Whether a fetch requested for ledger version `requested` satisfies min_ledger_version
+        """
+        return min_ledger_version is None or (requested is not None and requested >= min_ledger_version)
+
+    async def _fetch(
+            self,
+            key: Hashable,
+            fetch: Callable[[], Awaitable[tuple[Any, int | None]]],
+            min_ledger_version: int | None
+    ) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        # a fetch for a newer ledger version takes over the key, callers of the older one keep their future
+        self._inflight[key] = (future, min_ledger_version)
+        generation = next(self._generations)
+        try:
+            value, ledger_version = await fetch()
+        except Exception as e:
+            future.set_exception(e)
+            # mark retrieved so an unobserved error is not reported by the loop
+            future.exception()
+            raise
+        except BaseException:
+            # the callers waiting weren't cancelled, one of them fetches again
+            future.set_exception(_FetchAbandoned())
+            future.exception()
+            raise
+        else:
+            # its callers still get what it read, the cache keeps whichever read is newer
+            self._store(key, value, ledger_version, generation)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key, (None,))[0] is future:
+                del self._inflight[key]
+
+    def invalidate(self, ledger_version: int | None = None):
+        """
+        Drop entries read before ledger_version, or everything when it is None
+        :param ledger_version:
+        :return:
+        """
+        if ledger_version is None:
+            self._entries.clear()
+            return
+
+        for key in [key for key, entry in self._entries.items() if entry[2] is None or entry[2] < ledger_version]:
+            del self._entries[key]
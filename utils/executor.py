@@ -0,0 +1,156 @@
+"""
+Quoting off the event loop.
+
+A QuoteExecutor sends QuoteJobs to a thread or process pool and awaits
+the results, so long get_y iterations of big sweeps don't hold up network
+I/O. Each job is one pool state with every amount to quote on it, priced
+in one batch call of utils.batch, and jobs are grouped ``jobs_per_task``
+at a time so a process pool pays one round trip per group.
+
+The integer math keeps no state between calls and the Decimal math of
+utils.math only changes local contexts, so workers can run side by side.
+Threads keep the loop responsive, processes also use every core. Process
+workers are spawned, so the entry script needs the usual
+``if __name__ == '__main__'`` guard.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+from loguru import logger
+
+from utils.batch import ABORTED, get_amounts_out
+
+if TYPE_CHECKING:
+    from liquidswap.pools import PoolState
+
+
+class QuoteJob(NamedTuple):
+    pool_type: str
+    amounts: tuple[int, ...]  # amounts sent into the pool
+    reserve_in: int
+    reserve_out: int
+    scale_in: int | None
+    scale_out: int | None
+    fee: int
+
+    @classmethod
+    def from_state(cls, state: 'PoolState', amounts: list[int]) -> 'QuoteJob':
+        """
+        :param state: pool state with its scales, see LiquidSwapCurve.get_pool_snapshot
+        :param amounts:
+        :return:
+        """
+        return cls(
+            state.pool_type,
+            tuple(amounts),
+            state.reserve_in,
+            state.reserve_out,
+            state.scale_in,
+            state.scale_out,
+            state.fee
+        )
+
+
+def run_job(job: QuoteJob) -> list[int | None] | None:
+    """
+    Output of every amount of the job, None for amounts whose swap the contract would abort,
+    like utils.int_math raising, and None instead of the list when the pool can't price any
+    :param job:
+    :return:
+    """
+    if not job.amounts:
+        return []
+    try:
+        amounts_out = get_amounts_out(
+            job.pool_type,
+            coin_in=list(job.amounts),
+            reserve_in=job.reserve_in,
+            reserve_out=job.reserve_out,
+            scale_in=job.scale_in,
+            scale_out=job.scale_out,
+            fee=job.fee
+        )
+    except (OverflowError, ZeroDivisionError):
+        return None
+    return [None if amount_out == ABORTED else int(amount_out) for amount_out in amounts_out]
+
+
+def run_jobs(jobs: list[QuoteJob]) -> list[list[int | None] | None]:
+    return [run_job(job) for job in jobs]
+
+
+class QuoteExecutor:
+    def __init__(
+            self,
+            kind: Literal['thread', 'process'] = 'thread',
+            max_workers: int = None,
+            jobs_per_task: int = 8
+    ):
+        """
+        :param kind: 'thread' or 'process'
+        :param max_workers: defaults to the number of cores
+        :param jobs_per_task: jobs sent to a worker at once
+        """
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.jobs_per_task = max(jobs_per_task, 1)
+        self._executor: Executor | None = None
+
+        self.jobs = 0
+        self.tasks = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                # forking a process with a running loop and client threads isn't safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='quote')
+            logger.debug('quote executor: {} x {}', self.kind, self.max_workers)
+        return self._executor
+
+    async def quote(self, job: QuoteJob) -> list[int | None] | None:
+        """
+        run_job in a worker
+        :param job:
+        :return:
+        """
+        return (await self.quote_many([job]))[0]
+
+    async def quote_many(self, jobs: list[QuoteJob]) -> list[list[int | None] | None]:
+        """
+        run_job of every job, in order, spread over the workers
+        :param jobs:
+        :return:
+        """
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+
+        groups = [jobs[start:start + self.jobs_per_task] for start in range(0, len(jobs), self.jobs_per_task)]
+        self.jobs += len(jobs)
+        self.tasks += len(groups)
+
+        results = await asyncio.gather(*[loop.run_in_executor(executor, run_jobs, group) for group in groups])
+        return [result for group in results for result in group]
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            'kind': self.kind,
+            'workers': self.max_workers,
+            'jobs': self.jobs,
+            'tasks': self.tasks,
+        }
+
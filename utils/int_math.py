@@ -0,0 +1,297 @@
+"""
+Integer-only port of the Liquidswap curve math.
+
+Mirrors the Move implementation (``liquidswap::stable_curve`` and the router
+fee handling): every value is a python ``int``, every division truncates and
+intermediate results are checked against the width of the Move type they
+would live in, so quotes match the chain to the last unit.
+"""
+from typing import Callable
+
+from utils.metrics import ITERATION_BUCKETS, METRICS
+
+U64_MAX = 2 ** 64 - 1
+U128_MAX = 2 ** 128 - 1
+U256_MAX = 2 ** 256 - 1
+
+ONE_E_8 = 10 ** 8
+FEE_SCALE = 10000
+MAX_GET_Y_ITERATIONS = 255
+
+GET_Y_ITERATIONS = METRICS.histogram(
+    'get_y_iterations', "Newton iterations of the stable curve's get_y", ('start',), ITERATION_BUCKETS
+)
+
+
+def _check(value: int, max_value: int) -> int:
+    """
+    Abort like Move does when a value leaves its unsigned range
+    :param value:
+    :param max_value:
+    :return:
+    """
+    if value < 0 or value > max_value:
+        raise OverflowError(f"arithmetic error: {value} out of range [0, {max_value}]")
+    return value
+
+
+def lp_value(
+        x_coin: int,
+        x_scale: int,
+        y_coin: int,
+        y_scale: int,
+) -> int:
+    """
+    Calculate the liquidity pool value (u256)
+    :param x_coin:
+    :param x_scale:
+    :param y_coin:
+    :param y_scale:
+    :return:
+    """
+    x = x_coin * ONE_E_8 // x_scale
+    y = y_coin * ONE_E_8 // y_scale
+    a = x * y
+    b = x * x + y * y
+
+    return _check(a * b, U256_MAX)
+
+
+def d_stable(x0: int, y: int) -> int:
+    """
+    Calculate the derivative of f by y (u256)
+    :param x0:
+    :param y:
+    :return:
+    """
+    return _check(3 * x0 * y * y + x0 * x0 * x0, U256_MAX)
+
+
+def f(x0: int, y: int) -> int:
+    """
+    Calculate the curve invariant x0 * y^3 + x0^3 * y (u256)
+    :param x0:
+    :param y:
+    :return:
+    """
+    return _check(x0 * y * y * y + x0 * x0 * x0 * y, U256_MAX)
+
+
+def get_y_iterations(x0: int, xy: int, y: int) -> tuple[int, int]:
+    """
+    Newton's method for y, same loop as the Move contract.
+    Returns the solution together with the number of iterations taken.
+    :param x0:
+    :param xy:
+    :param y:
+    :return:
+    """
+    i = 0
+    while i < MAX_GET_Y_ITERATIONS:
+        k = f(x0, y)
+
+        if k < xy:
+            dy = (xy - k) // d_stable(x0, y) + 1
+            y += dy
+        else:
+            dy = (k - xy) // d_stable(x0, y)
+            y -= dy
+
+        if dy <= 1:
+            return y, i + 1
+
+        i += 1
+
+    return y, i
+
+
+def get_y(x0: int, xy: int, y: int) -> int:
+    """
+    Calculate the y value
+    :param x0:
+    :param xy:
+    :param y:
+    :return:
+    """
+    result, iterations = get_y_iterations(x0, xy, y)
+    if METRICS.enabled:
+        GET_Y_ITERATIONS.observe(iterations, 'cold')
+    return result
+
+
+def coin_out(
+        coin_in: int,
+        scale_in: int,
+        scale_out: int,
+        reserve_in: int,
+        reserve_out: int,
+        solver: Callable[[int, int, int], int] = None,
+) -> int:
+    """
+    Calculate the amount of coin out (u128)
+    :param coin_in:
+    :param scale_in:
+    :param scale_out:
+    :param reserve_in:
+    :param reserve_out:
+    :param solver: get_y replacement, e.g. utils.solver.StableCurveSolver.get_y
+    :return:
+    """
+    xy = lp_value(reserve_in, scale_in, reserve_out, scale_out)
+
+    reserve_in_scaled = reserve_in * ONE_E_8 // scale_in
+    reserve_out_scaled = reserve_out * ONE_E_8 // scale_out
+    amount_in = coin_in * ONE_E_8 // scale_in
+    total_reserve = amount_in + reserve_in_scaled
+    y = _check(reserve_out_scaled - (solver or get_y)(total_reserve, xy, reserve_out_scaled), U256_MAX)
+
+    return _check(y * scale_out // ONE_E_8, U128_MAX)
+
+
+def coin_in(
+        coin_out: int,
+        scale_out: int,
+        scale_in: int,
+        reserve_out: int,
+        reserve_in: int,
+) -> int:
+    """
+    Calculate the amount of coin in (u128)
+    :param coin_out:
+    :param scale_out:
+    :param scale_in:
+    :param reserve_out:
+    :param reserve_in:
+    :return:
+    """
+    xy = lp_value(reserve_in, scale_in, reserve_out, scale_out)
+
+    reserve_in_scaled = reserve_in * ONE_E_8 // scale_in
+    reserve_out_scaled = reserve_out * ONE_E_8 // scale_out
+    amount_out_scaled = coin_out * ONE_E_8 // scale_out
+
+    total_reserve = _check(reserve_out_scaled - amount_out_scaled, U256_MAX)
+    x = _check(get_y(total_reserve, xy, reserve_in_scaled) - reserve_in_scaled, U256_MAX)
+
+    return _check(x * scale_in // ONE_E_8, U128_MAX)
+
+
+def get_coins_out_with_fees_stable(
+        coin_in: int,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+        solver: Callable[[int, int, int], int] = None,
+) -> int:
+    """
+    Stable curve output for coin_in after the pool fee, rounding the fee in favour of the pool
+    :param coin_in:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :param solver: get_y replacement passed on to coin_out
+    :return:
+    """
+    coin_in_val_scaled = _check(coin_in * (FEE_SCALE - fee), U128_MAX)
+
+    if coin_in_val_scaled % FEE_SCALE != 0:
+        coin_in_val_after_fees = coin_in_val_scaled // FEE_SCALE + 1
+    else:
+        coin_in_val_after_fees = coin_in_val_scaled // FEE_SCALE
+
+    return _check(coin_out(coin_in_val_after_fees, scale_in, scale_out, reserve_in, reserve_out, solver), U64_MAX)
+
+
+def get_coins_out_with_fees(
+        coin_in_val: int,
+        reserve_in: int,
+        reserve_out: int,
+        fee: int,
+) -> int:
+    """
+    Uncorrelated (x * y = k) curve output for coin_in_val after the pool fee
+    :param coin_in_val:
+    :param reserve_in:
+    :param reserve_out:
+    :param fee:
+    :return:
+    """
+    fee_multiplier = FEE_SCALE - fee
+
+    coin_in_val_after_fees = coin_in_val * fee_multiplier
+    new_reserve_in = reserve_in * FEE_SCALE + coin_in_val_after_fees
+
+    return _check(coin_in_val_after_fees * reserve_out // new_reserve_in, U64_MAX)
+
+
+def get_coins_in_with_fees_stable(
+        coin_out: int,
+        reserve_out: int,
+        reserve_in: int,
+        scale_out: int,
+        scale_in: int,
+        fee: int,
+) -> int:
+    """
+    Stable curve input required to receive coin_out, fee included
+    :param coin_out:
+    :param reserve_out:
+    :param reserve_in:
+    :param scale_out:
+    :param scale_in:
+    :param fee:
+    :return:
+    """
+    r = _check(coin_in(coin_out, scale_out, scale_in, reserve_out, reserve_in) + 1, U64_MAX)
+    return _check(r * FEE_SCALE // (FEE_SCALE - fee) + 1, U64_MAX)
+
+
+def get_coins_in_with_fees(
+        coin_out: int,
+        reserve_out: int,
+        reserve_in: int,
+        fee: int,
+) -> int:
+    """
+    Uncorrelated curve input required to receive coin_out, fee included
+    :param coin_out:
+    :param reserve_out:
+    :param reserve_in:
+    :param fee:
+    :return:
+    """
+    new_reserve_out = (reserve_out - coin_out) * (FEE_SCALE - fee)
+    return _check(coin_out * reserve_in * FEE_SCALE // new_reserve_out + 1, U64_MAX)
+
+
+def get_amount_out(
+        pool_type: str,
+        coin_in: int,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+) -> int:
+    """
+    Dispatch a forward quote to the curve of the pool
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :param coin_in:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    match pool_type:
+        case 'Stable':
+            return get_coins_out_with_fees_stable(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+        case 'Uncorrelated':
+            return get_coins_out_with_fees(coin_in, reserve_in, reserve_out, fee)
+        case _:
+            raise ValueError(f"Unknown pool type: {pool_type}")
@@ -0,0 +1,193 @@
+"""
+Exact-out quoting: the smallest input whose forward quote reaches a target output.
+
+Uncorrelated pools have a closed form. The stable curve is inverted with a
+bracketed search on the forward quote of ``utils.int_math``, mixing
+interpolation steps with bisection so it always terminates.
+"""
+from typing import NamedTuple
+
+from utils.int_math import (
+    FEE_SCALE,
+    U64_MAX,
+    get_coins_in_with_fees_stable,
+    get_coins_out_with_fees,
+    get_coins_out_with_fees_stable,
+)
+
+
+class InverseQuote(NamedTuple):
+    amount_in: int | None  # None when the target can't be reached
+    amount_out: int  # forward quote of amount_in
+    iterations: int  # forward quotes evaluated
+
+
+def get_amount_in_uncorrelated(
+        coin_out: int,
+        reserve_in: int,
+        reserve_out: int,
+        fee: int,
+) -> InverseQuote:
+    """
+    Minimal input for an uncorrelated pool.
+    Solves floor(x * m * reserve_out / (reserve_in * FEE_SCALE + x * m)) >= coin_out for x.
+    :param coin_out:
+    :param reserve_in:
+    :param reserve_out:
+    :param fee:
+    :return:
+    """
+    if coin_out <= 0:
+        return InverseQuote(0, 0, 0)
+    if coin_out >= reserve_out:
+        return InverseQuote(None, 0, 0)
+
+    fee_multiplier = FEE_SCALE - fee
+    numerator = coin_out * reserve_in * FEE_SCALE
+    denominator = fee_multiplier * (reserve_out - coin_out)
+    amount_in = -(-numerator // denominator)
+
+    return InverseQuote(amount_in, get_coins_out_with_fees(amount_in, reserve_in, reserve_out, fee), 1)
+
+
+def get_amount_in_stable(
+        coin_out: int,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+) -> InverseQuote:
+    """
+    Minimal input for a stable pool.
+    Starts from the contract's own coin_in estimate, brackets the target and narrows
+    the bracket until it is one unit wide.
+    :param coin_out:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    if coin_out <= 0:
+        return InverseQuote(0, 0, 0)
+    if coin_out >= reserve_out:
+        return InverseQuote(None, 0, 0)
+
+    iterations = 0
+
+    def quote(amount: int) -> int:
+        nonlocal iterations
+        iterations += 1
+        try:
+            return get_coins_out_with_fees_stable(amount, reserve_in, reserve_out, scale_in, scale_out, fee)
+        except OverflowError:
+            return reserve_out
+
+    try:
+        guess = min(get_coins_in_with_fees_stable(coin_out, reserve_out, reserve_in, scale_out, scale_in, fee), U64_MAX)
+    except OverflowError:
+        guess = U64_MAX
+
+    # bracket: quote(lo) < coin_out <= quote(hi)
+    guess_out = quote(guess)
+    if guess_out >= coin_out:
+        hi, hi_out = guess, guess_out
+        step = 1
+        lo = max(hi - step, 0)
+        lo_out = quote(lo) if lo else 0
+        while lo and lo_out >= coin_out:
+            hi, hi_out = lo, lo_out
+            step *= 2
+            lo = max(hi - step, 0)
+            lo_out = quote(lo) if lo else 0
+    else:
+        if guess == U64_MAX:
+            return InverseQuote(None, guess_out, iterations)
+        lo, lo_out = guess, guess_out
+        step = max(guess // 1000, 1)
+        hi = min(lo + step, U64_MAX)
+        hi_out = quote(hi)
+        while hi_out < coin_out:
+            if hi == U64_MAX:
+                return InverseQuote(None, hi_out, iterations)
+            lo, lo_out = hi, hi_out
+            step *= 2
+            hi = min(lo + step, U64_MAX)
+            hi_out = quote(hi)
+
+    bisect = False
+    while hi - lo > 1:
+        if bisect or hi_out == lo_out:
+            mid = (lo + hi) // 2
+        else:
+            mid = lo + (coin_out - lo_out) * (hi - lo) // (hi_out - lo_out)
+            mid = min(max(mid, lo + 1), hi - 1)
+
+        width = hi - lo
+        mid_out = quote(mid)
+        if mid_out >= coin_out:
+            hi, hi_out = mid, mid_out
+        else:
+            lo, lo_out = mid, mid_out
+
+        # fall back to bisection for one step whenever interpolation barely shrinks the bracket
+        bisect = not bisect and hi - lo > width // 2
+
+    return InverseQuote(hi, hi_out, iterations)
+
+
+def get_amount_in(
+        pool_type: str,
+        coin_out: int,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+) -> InverseQuote:
+    """
+    Dispatch an exact-out quote to the curve of the pool
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :param coin_out:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    match pool_type:
+        case 'Stable':
+            return get_amount_in_stable(coin_out, reserve_in, reserve_out, scale_in, scale_out, fee)
+        case 'Uncorrelated':
+            return get_amount_in_uncorrelated(coin_out, reserve_in, reserve_out, fee)
+        case _:
+            raise ValueError(f"Unknown pool type: {pool_type}")
+
+
+def get_amounts_in(
+        pool_type: str,
+        coins_out: list[int],
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+) -> list[InverseQuote]:
+    """
+    Exact-out quotes for many targets against one pool snapshot
+    :param pool_type: 'Stable' or 'Uncorrelated'
+    :param coins_out:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    return [
+        get_amount_in(pool_type, int(coin_out), reserve_in, reserve_out, scale_in, scale_out, fee)
+        for coin_out in coins_out
+    ]
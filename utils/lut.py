@@ -0,0 +1,216 @@
+"""
+Price-impact tables: approximate quotes of one pool state by interpolation.
+
+Output is concave and increasing in the input for both curves. Between two
+sampled sizes the chord lies below the curve, and the curve lies below the
+extensions of the neighbouring chords. Every interpolated quote is
+therefore bracketed by an error bound. A rounding slack covers the
+truncations of the integer math: input scaling, fee rounding and get_y
+convergence.
+
+Sizes are log-spaced from ``min_amount`` to ``max_amount``. Outside of that
+range, and wherever the bound is above the allowed error, quotes are
+computed exactly. Tables describe one set of reserves: build a new one when
+they change, see table_for.
+"""
+import math
+from bisect import bisect_right
+from functools import lru_cache
+from typing import NamedTuple
+
+from utils.int_math import ONE_E_8, get_amount_out
+
+
+class ApproxQuote(NamedTuple):
+    amount_out: int
+    error: int  # the exact quote is within amount_out ± error
+    exact: bool
+
+
+class PriceImpactTable:
+    def __init__(
+            self,
+            pool_type: str,
+            reserve_in: int,
+            reserve_out: int,
+            scale_in: int | None,
+            scale_out: int | None,
+            fee: int,
+            points: int = 128,
+            max_reserve_share: float = 0.3,
+            min_amount: int = None,
+            max_relative_error: float = 1e-4
+    ):
+        """
+        :param pool_type: 'Stable' or 'Uncorrelated'
+        :param reserve_in:
+        :param reserve_out:
+        :param scale_in: 10 ** decimals, only needed by stable pools
+        :param scale_out:
+        :param fee:
+        :param points: sampled sizes
+        :param max_reserve_share: largest size sampled, as a share of reserve_in
+        :param min_amount: smallest size sampled, a millionth of the largest by default
+        :param max_relative_error: default error allowed by quote, relative to the output
+        """
+        self.pool = (pool_type, reserve_in, reserve_out, scale_in, scale_out, fee)
+        self.max_relative_error = max_relative_error
+        self.exact_quotes = 0
+
+        max_amount = max(int(reserve_in * max_reserve_share), 1)
+        min_amount = max(min_amount or max_amount // 10 ** 6, 1)
+        sizes = {0, min_amount, max_amount}
+        if max_amount > min_amount:
+            ratio = math.log(max_amount / min_amount)
+            sizes.update(round(min_amount * math.exp(ratio * i / (points - 1))) for i in range(1, points - 1))
+
+        self.sizes: list[int] = []
+        self.outputs: list[int] = []
+        for size in sorted(sizes):
+            try:
+                output = get_amount_out(pool_type, size, reserve_in, reserve_out, scale_in, scale_out, fee)
+            except (OverflowError, ZeroDivisionError):
+                break
+            self.sizes.append(size)
+            self.outputs.append(output)
+
+        self._build_intervals()
+
+    def _build_intervals(self):
+        """
+        Chord slope, bounding slopes and rounding slack of every interval between two sizes
+        """
+        pool_type, _, _, scale_in, scale_out, _ = self.pool
+        if pool_type == 'Stable':
+            # the fee is rounded up, inputs past 8 decimals are truncated, get_y stops within a unit or two
+            input_noise = 1 + (-(-scale_in // ONE_E_8) if scale_in > ONE_E_8 else 0)
+            output_noise = 2 * -(-scale_out // ONE_E_8) + 1
+        else:
+            input_noise = 0
+            output_noise = 1
+
+        sizes, outputs = self.sizes, self.outputs
+        count = len(sizes) - 1
+        slopes = [(outputs[i + 1] - outputs[i]) / (sizes[i + 1] - sizes[i]) for i in range(count)]
+
+        # interval i: (start, output at start, end, chord slope, upper - chord slope, chord - lower slope, slack),
+        # the first one has no left neighbour
+        self.intervals: list[tuple[int, int, int, float, float, float, int] | None] = [None]
+        for i in range(1, count):
+            slope, width = slopes[i], sizes[i + 1] - sizes[i]
+            left = slopes[i - 1]
+            right = slopes[i + 1] if i + 1 < count else 0.0
+
+            noise = math.ceil(left * input_noise) + output_noise
+            tolerance = 2 * noise / (sizes[i] - sizes[i - 1]) + 2 * noise / width
+            if left + tolerance < slope or (i + 1 < count and right - tolerance > slope):
+                # not concave beyond rounding, quotes here stay exact
+                self.intervals.append(None)
+                continue
+
+            self.intervals.append((
+                sizes[i], outputs[i], sizes[i + 1], slope, max(left - slope, 0.0), max(slope - right, 0.0), 2 * noise + 1
+            ))
+
+    def exact(self, amount: int) -> int:
+        self.exact_quotes += 1
+        return get_amount_out(self.pool[0], amount, *self.pool[1:])
+
+    def approx(self, amount: int) -> ApproxQuote:
+        """
+        Interpolated output of amount with its error bound, exact outside the sampled sizes
+        :param amount:
+        :return:
+        """
+        interval = self._interval(amount)
+        if interval is None:
+            index = bisect_right(self.sizes, amount) - 1
+            if self.sizes[index] == amount:
+                return ApproxQuote(self.outputs[index], 0, True)
+            return ApproxQuote(self.exact(amount), 0, True)
+
+        start, output, end, slope, above, below, slack = interval
+        offset = amount - start
+        # the curve is between the chord and the lower of the two neighbouring chord extensions
+        half_gap = min(above * offset, below * (end - amount)) / 2
+        return ApproxQuote(output + int(slope * offset + half_gap), int(half_gap) + 1 + slack, False)
+
+    def quote(self, amount: int, max_error: int = None) -> int:
+        """
+        Interpolated output, or the exact one when the bound is above max_error
+        :param amount:
+        :param max_error: absolute, defaults to max_relative_error of the output
+        :return:
+        """
+        # approx inlined without the ApproxQuote, this is the hot path of pool selection and splits
+        index = bisect_right(self.sizes, amount) - 1
+        interval = self.intervals[index] if index < len(self.intervals) else None
+        if interval is None or interval[0] == amount:
+            return self.approx(amount).amount_out
+
+        start, output, end, slope, above, below, slack = interval
+        offset = amount - start
+        half_gap = min(above * offset, below * (end - amount)) / 2
+        estimate = output + int(slope * offset + half_gap)
+        if half_gap + 1 + slack > (estimate * self.max_relative_error if max_error is None else max_error):
+            return self.exact(amount)
+        return estimate
+
+    def _interval(self, amount: int) -> tuple | None:
+        index = bisect_right(self.sizes, amount) - 1
+        if index >= len(self.intervals):
+            return None
+        interval = self.intervals[index]
+        if interval is None or interval[0] == amount:
+            return None
+        return interval
+
+    def stats(self) -> dict:
+        return {
+            'sizes': len(self.sizes),
+            'exact_intervals': sum(interval is None for interval in self.intervals),
+            'exact_quotes': self.exact_quotes,
+        }
+
+
+@lru_cache(maxsize=256)
+def table_for(
+        pool_type: str,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int | None,
+        scale_out: int | None,
+        fee: int
+) -> PriceImpactTable:
+    """
+    Shared table of one pool state, rebuilt only when the reserves or fee change
+    :param pool_type:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :return:
+    """
+    return PriceImpactTable(pool_type, reserve_in, reserve_out, scale_in, scale_out, fee)
+
+
+def select_best(tables: list[PriceImpactTable], amount: int) -> tuple[int, int, int]:
+    """
+    Table giving the most output for amount. Only tables whose error bounds overlap the best one are quoted exactly.
+    :param tables:
+    :param amount:
+    :return: index of the table, its exact output and the number of exact quotes computed
+    """
+    approximations = [table.approx(amount) for table in tables]
+    floor = max(approx.amount_out - approx.error for approx in approximations)
+    contenders = [
+        index for index, approx in enumerate(approximations) if approx.amount_out + approx.error >= floor
+    ]
+
+    outputs = {
+        index: approximations[index].amount_out if approximations[index].exact else tables[index].exact(amount)
+        for index in contenders
+    }
+    best = max(outputs, key=outputs.get)
+    return best, outputs[best], sum(not approximations[index].exact for index in contenders)
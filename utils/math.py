@@ -1,6 +1,6 @@
 from math import pow
 
-from decimal import Decimal, getcontext
+from decimal import Decimal, localcontext
 
 
 def lp_value(
@@ -73,19 +73,20 @@ def coin_out(
     :param reserve_out:
     :return:
     """
-    getcontext().prec = 30
+    with localcontext() as ctx:
+        ctx.prec = 30
 
-    e8 = Decimal(10) ** 8
+        e8 = Decimal(10) ** 8
 
-    xy = lp_value(reserve_in, scale_in, reserve_out, scale_out)
+        xy = lp_value(reserve_in, scale_in, reserve_out, scale_out)
 
-    reserve_in = reserve_in * e8 // scale_in
-    reserve_out = reserve_out * e8 // scale_out
-    amount_in = coin_in * e8 // scale_in
-    total_reserve = amount_in + reserve_in
-    y = reserve_out - get_y(total_reserve, xy, reserve_out)  # Implement get_y() function if required
+        reserve_in = reserve_in * e8 // scale_in
+        reserve_out = reserve_out * e8 // scale_out
+        amount_in = coin_in * e8 // scale_in
+        total_reserve = amount_in + reserve_in
+        y = reserve_out - get_y(total_reserve, xy, reserve_out)  # Implement get_y() function if required
 
-    return y * scale_out // e8
+        return y * scale_out // e8
 
 
 def d_stable(
@@ -135,27 +136,28 @@ def get_y(
     :param y:
     :return:
     """
-    # Set the precision for Decimal calculations
-    getcontext().prec = 28  # You can adjust this value based on your requirements
+    # Set the precision for Decimal calculations, local so callers and other threads keep theirs
+    with localcontext() as ctx:
+        ctx.prec = 28  # You can adjust this value based on your requirements
 
-    i = 0
-    while i < 255:
-        k = f(x0, y)
+        i = 0
+        while i < 255:
+            k = f(x0, y)
 
-        dy = Decimal(0)
-        if k < xy:
-            dy = xy - k / d_stable(x0, y) + 1
-            y += dy
-        else:
-            dy = (k - xy) / d_stable(x0, y)
-            y -= dy
+            dy = Decimal(0)
+            if k < xy:
+                dy = xy - k / d_stable(x0, y) + 1
+                y += dy
+            else:
+                dy = (k - xy) / d_stable(x0, y)
+                y -= dy
 
-        if dy <= 1:
-            return y
+            if dy <= 1:
+                return y
 
-        i += 1
+            i += 1
 
-    return y
+        return y
 
 
 def d(value=None) -> Decimal:
@@ -192,20 +194,21 @@ def get_coins_out_with_fees_stable(
         fee: Decimal,
 ) -> Decimal:
     # Set the precision for Decimal calculations
-    getcontext().prec = 28  # You can adjust this value based on your requirements
+    with localcontext() as ctx:
+        ctx.prec = 28  # You can adjust this value based on your requirements
 
-    # Define the denominator constant
-    DENOMINATOR = Decimal(10000)
+        # Define the denominator constant
+        DENOMINATOR = Decimal(10000)
 
-    coin_in_val_after_fees = Decimal(0)
-    coin_in_val_scaled = coin_in * DENOMINATOR
+        coin_in_val_after_fees = Decimal(0)
+        coin_in_val_scaled = coin_in * DENOMINATOR
 
-    if coin_in_val_scaled % DENOMINATOR != 0:
-        coin_in_val_after_fees = (coin_in_val_scaled // DENOMINATOR + 1) - (coin_in_val_scaled // DENOMINATOR + 1) * fee / 10000
-    else:
-        coin_in_val_after_fees = (coin_in_val_scaled // DENOMINATOR) - (coin_in_val_scaled // DENOMINATOR) * fee / 10000
+        if coin_in_val_scaled % DENOMINATOR != 0:
+            coin_in_val_after_fees = (coin_in_val_scaled // DENOMINATOR + 1) - (coin_in_val_scaled // DENOMINATOR + 1) * fee / 10000
+        else:
+            coin_in_val_after_fees = (coin_in_val_scaled // DENOMINATOR) - (coin_in_val_scaled // DENOMINATOR) * fee / 10000
 
-    return coin_out(coin_in_val_after_fees, scale_in, scale_out, reserve_in, reserve_out)
+        return coin_out(coin_in_val_after_fees, scale_in, scale_out, reserve_in, reserve_out)
 
 
 def get_optimal_liquidity_amount(x_desired: Decimal,
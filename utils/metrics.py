@@ -0,0 +1,201 @@
+"""
+In-process counters and histograms for the hot paths.
+
+Metrics are declared once at import time and labelled by position:
+
+    RPC_LATENCY = METRICS.histogram('rpc_latency_seconds', 'RPC latency', ('endpoint', 'resource'))
+    ...
+    if METRICS.enabled:
+        RPC_LATENCY.observe(elapsed, endpoint, resource)
+
+Recording is off until METRICS.enabled is set. Callers check the flag before
+taking timestamps, so a disabled registry costs one attribute read per site.
+Snapshots export as Prometheus text or JSON.
+"""
+import json
+import math
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100, 255)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, help: str, labels: tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        if not self.registry.enabled:
+            return
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        return [(self.name, label_values, value) for label_values, value in self.values.items()]
+
+    def as_dict(self) -> list[dict]:
+        return [
+            {'labels': dict(zip(self.labels, label_values)), 'value': value}
+            for label_values, value in self.values.items()
+        ]
+
+    def reset(self):
+        self.values.clear()
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(
+            self,
+            registry: 'MetricsRegistry',
+            name: str,
+            help: str,
+            labels: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per bucket counts (last one is +Inf), sum, count]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        if not self.registry.enabled:
+            return
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, q: float, *label_values) -> float | None:
+        """
+        Upper bound of the bucket holding the q-th observation, +Inf past the last bucket
+        :param q:
+        :param label_values:
+        :return:
+        """
+        series = self.values.get(label_values)
+        if series is None or not series[2]:
+            return None
+        rank = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        samples = []
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', label_values + (_format_bound(bound),), cumulative))
+            samples.append((f'{self.name}_sum', label_values, total))
+            samples.append((f'{self.name}_count', label_values, count))
+        return samples
+
+    def as_dict(self) -> list[dict]:
+        return [
+            {
+                'labels': dict(zip(self.labels, label_values)),
+                'count': count,
+                'sum': total,
+                'buckets': dict(zip(map(_format_bound, self.buckets + (math.inf,)), counts)),
+                'p50': self.quantile(0.5, *label_values),
+                'p99': self.quantile(0.99, *label_values),
+            }
+            for label_values, (counts, total, count) in self.values.items()
+        ]
+
+    def reset(self):
+        self.values.clear()
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False, namespace: str = 'liquidswap'):
+        """
+        :param enabled: record observations, everything is a no-op otherwise
+        :param namespace: prefix of every exported metric name
+        """
+        self.enabled = enabled
+        self.namespace = namespace
+        self.metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        if name not in self.metrics:
+            self.metrics[name] = Counter(self, name, help, labels)
+        return self.metrics[name]
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            labels: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(self, name, help, labels, buckets)
+        return self.metrics[name]
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> dict:
+        return {
+            f'{self.namespace}_{name}': {'type': metric.kind, 'help': metric.help, 'series': metric.as_dict()}
+            for name, metric in self.metrics.items()
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition format
+        :return:
+        """
+        lines = []
+        for name, metric in self.metrics.items():
+            full_name = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {full_name} {metric.help}')
+            lines.append(f'# TYPE {full_name} {metric.kind}')
+            label_names = metric.labels
+            for sample_name, label_values, value in metric.samples():
+                names = label_names + ('le',) if sample_name.endswith('_bucket') else label_names
+                labels = ','.join(f'{label}="{_escape(str(label_value))}"' for label, label_value in zip(names, label_values))
+                lines.append(f'{self.namespace}_{sample_name}{{{labels}}} {value}' if labels
+                             else f'{self.namespace}_{sample_name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Writes a snapshot, Prometheus text for *.prom files and JSON otherwise
+        :param path:
+        :return:
+        """
+        with open(path, 'w') as file:
+            file.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == math.inf else repr(bound)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = MetricsRegistry()
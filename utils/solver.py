@@ -0,0 +1,97 @@
+"""
+Stateful stable-curve solver for one pool.
+
+Keeps per-solve iteration counts and can seed Newton's method for ``get_y``
+with the previous solution when the new problem is close to the last one,
+which is the common case when sweeping sizes on one pool state. A
+warm-started solve stops under the contract's dy <= 1 rule from a different
+point than the contract, so quotes that must match it exactly solve cold.
+"""
+from collections import deque
+
+from utils.int_math import GET_Y_ITERATIONS, get_y_iterations
+from utils.metrics import METRICS
+
+
+class StableCurveSolver:
+    def __init__(
+            self,
+            warm_start: bool = True,
+            max_relative_distance: float = 0.05,
+            history_size: int = 1024
+    ):
+        """
+        :param warm_start: seed solves with the previous solution, for size sweeps only, see get_y
+        :param max_relative_distance: warm start only when x0 moved by at most this fraction
+            on the same pool state
+        :param history_size: number of per-solve iteration counts to keep
+        """
+        self.warm_start = warm_start
+        self.max_relative_distance = max_relative_distance
+
+        self._last_x0 = None
+        self._last_xy = None
+        self._last_y = None
+
+        self.solves = 0
+        self.warm_starts = 0
+        self.total_iterations = 0
+        self.max_iterations = 0
+        self.iterations = deque(maxlen=history_size)
+
+    def get_y(self, x0: int, xy: int, y: int) -> int:
+        """
+        Drop-in for utils.int_math.get_y.
+        A cold solve is the contract's. A warm-started one can land one unit of the scaled
+        reserve away from it and depends on the previous solve.
+        :param x0:
+        :param xy:
+        :param y:
+        :return:
+        """
+        seed = y
+        start = 'cold'
+        if (
+                self.warm_start
+                and self._last_xy == xy
+                and abs(x0 - self._last_x0) <= self._last_x0 * self.max_relative_distance
+        ):
+            seed = self._last_y
+            start = 'warm'
+            self.warm_starts += 1
+
+        result, iterations = get_y_iterations(x0, xy, seed)
+
+        self._last_x0 = x0
+        self._last_xy = xy
+        self._last_y = result
+
+        self.solves += 1
+        self.total_iterations += iterations
+        self.max_iterations = max(self.max_iterations, iterations)
+        self.iterations.append(iterations)
+        if METRICS.enabled:
+            GET_Y_ITERATIONS.observe(iterations, start)
+
+        return result
+
+    def reset(self):
+        """
+        Forget the warm-start seed
+        """
+        self._last_x0 = None
+        self._last_xy = None
+        self._last_y = None
+
+    def stats(self) -> dict:
+        """
+        Iteration telemetry since creation
+        :return:
+        """
+        return {
+            'solves': self.solves,
+            'warm_starts': self.warm_starts,
+            'mean_iterations': self.total_iterations / self.solves if self.solves else 0.0,
+            'max_iterations': self.max_iterations,
+            'recent_iterations': list(self.iterations),
+        }
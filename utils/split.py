@@ -0,0 +1,176 @@
+"""
+Split one order across several pools of the same pair.
+
+Output of every curve is concave in the input, so handing out the order in
+equal chunks, each to the pool with the best marginal output, approaches the
+allocation where marginal prices are equal. A short refinement pass then
+moves shrinking steps between pools while that improves the total. The
+number of forward quotes is bounded by ``max_evaluations``.
+
+With ``approximate`` the search prices pools from price-impact tables
+(utils.lut) and only the final allocation is quoted exactly. Otherwise the
+search quotes each stable pool at nearby sizes of one state, so it
+warm-starts their ``get_y`` (utils.solver) and quotes the final allocation
+of those pools cold, like the contract.
+"""
+import heapq
+from typing import TYPE_CHECKING, NamedTuple
+
+from utils.int_math import get_amount_out, get_coins_out_with_fees_stable
+from utils.lut import PriceImpactTable, table_for
+from utils.solver import StableCurveSolver
+
+if TYPE_CHECKING:
+    from liquidswap.pools import PoolState
+
+
+class SplitQuote(NamedTuple):
+    allocation: list[int]  # input per pool, same order as the pools argument
+    amounts_out: list[int]  # output per pool
+    total_out: int
+    evaluations: int  # forward quotes evaluated
+
+
+def _quote_pool(
+        pool: 'PoolState',
+        amount: int,
+        table: PriceImpactTable = None,
+        solver: StableCurveSolver = None
+) -> int | None:
+    """
+    Forward quote of one pool snapshot, None when the pool can't fill it
+    :param pool:
+    :param amount:
+    :param table: price-impact table of the pool to approximate with
+    :param solver: warm-started get_y of a stable pool
+    :return:
+    """
+    if amount <= 0:
+        return 0
+    try:
+        if table is not None:
+            return table.quote(amount)
+        if solver is not None:
+            return get_coins_out_with_fees_stable(
+                amount, pool.reserve_in, pool.reserve_out, pool.scale_in, pool.scale_out, pool.fee, solver=solver.get_y
+            )
+        return get_amount_out(
+            pool.pool_type,
+            amount,
+            pool.reserve_in,
+            pool.reserve_out,
+            pool.scale_in,
+            pool.scale_out,
+            pool.fee,
+        )
+    except (OverflowError, ZeroDivisionError):
+        return None
+
+
+def split_amount(
+        amount: int,
+        pools: list['PoolState'],
+        chunks: int = 32,
+        max_evaluations: int = 256,
+        approximate: bool = False,
+        warm_start: bool = True
+) -> SplitQuote:
+    """
+    Best allocation of amount over pools
+    :param amount: total input
+    :param pools: pool states with their scales, see LiquidSwapCurve.get_pool_snapshot
+    :param chunks: number of greedy steps
+    :param max_evaluations: upper bound on forward quotes, refinement stops when reached
+    :param approximate: search with price-impact tables, amounts_out of the result stay exact
+    :param warm_start: search stable pools with warm-started solvers when not approximating
+    :return:
+    """
+    evaluations = 0
+    cache = {}
+    tables = [
+        table_for(pool.pool_type, pool.reserve_in, pool.reserve_out, pool.scale_in, pool.scale_out, pool.fee)
+        if approximate else None
+        for pool in pools
+    ]
+    solvers = [
+        StableCurveSolver() if pool.pool_type == 'Stable' and warm_start and not approximate else None
+        for pool in pools
+    ]
+
+    def quote(index: int, value: int) -> int | None:
+        nonlocal evaluations
+        key = (index, value)
+        if key not in cache:
+            evaluations += 1
+            cache[key] = _quote_pool(pools[index], value, tables[index], solvers[index])
+        return cache[key]
+
+    allocation = [0] * len(pools)
+    amounts_out = [0] * len(pools)
+    if not pools or amount <= 0:
+        return SplitQuote(allocation, amounts_out, 0, 0)
+
+    chunks = max(min(chunks, amount), 1)
+    chunk, remainder = divmod(amount, chunks)
+
+    # max-heap of (-marginal output of the next chunk, pool index)
+    heap = []
+    for index in range(len(pools)):
+        out = quote(index, chunk)
+        if out is not None:
+            heap.append((-out, index))
+    heapq.heapify(heap)
+    if not heap:
+        return SplitQuote(allocation, amounts_out, 0, evaluations)
+
+    for step in range(chunks):
+        size = chunk + remainder if step == chunks - 1 else chunk
+        while heap:
+            _, index = heapq.heappop(heap)
+            out = quote(index, allocation[index] + size)
+            if out is not None:
+                break
+        else:
+            # no pool can take more, the rest stays unallocated
+            break
+
+        allocation[index] += size
+        amounts_out[index] = out
+
+        next_out = quote(index, allocation[index] + chunk)
+        if next_out is not None:
+            heapq.heappush(heap, (-(next_out - out), index))
+
+    step = chunk // 2
+    while step > 0 and evaluations + 2 * len(pools) <= max_evaluations:
+        best_gain, best_move = 0, None
+        for source in range(len(pools)):
+            if allocation[source] < step:
+                continue
+            source_out = quote(source, allocation[source] - step)
+            for target in range(len(pools)):
+                if target == source:
+                    continue
+                target_out = quote(target, allocation[target] + step)
+                if source_out is None or target_out is None:
+                    continue
+                gain = source_out - amounts_out[source] + target_out - amounts_out[target]
+                if gain > best_gain:
+                    best_gain, best_move = gain, (source, target, source_out, target_out)
+
+        if best_move is None:
+            step //= 2
+            continue
+
+        source, target, source_out, target_out = best_move
+        allocation[source] -= step
+        allocation[target] += step
+        amounts_out[source] = source_out
+        amounts_out[target] = target_out
+
+    for index, value in enumerate(allocation):
+        if value and (tables[index] is not None or solvers[index] is not None):
+            evaluations += 1
+            amounts_out[index] = _quote_pool(pools[index], value) or 0
+
+    return SplitQuote(allocation, amounts_out, sum(amounts_out), evaluations)